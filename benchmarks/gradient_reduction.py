@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+r"""
+Compares the time of IntegratedGradients on large batches when the gradients of
+all bsz * n_steps scaled examples are computed with a single backward pass of
+their summed outputs (as done by `compute_gradients`) and when they are
+computed with one graph root per example via `torch.unbind`.
+
+Usage:
+
+    python benchmarks/gradient_reduction.py
+    python benchmarks/gradient_reduction.py --batch-size 100 --n-steps 200
+"""
+import argparse
+import statistics
+import time
+
+import torch
+
+from captum.attr import IntegratedGradients
+from captum.attr._utils.common import _run_forward
+from captum.attr._utils.gradient import compute_gradients
+
+from models import MODELS
+
+
+def compute_gradients_unbind(
+    forward_fn, inputs, target_ind=None, additional_forward_args=None
+):
+    with torch.autograd.set_grad_enabled(True):
+        outputs = _run_forward(forward_fn, inputs, target_ind, additional_forward_args)
+        return torch.autograd.grad(torch.unbind(outputs), inputs)
+
+
+def _time(attribute, repeats):
+    # warm-up call, which is not timed
+    attribute()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        attribute()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--models", nargs="+", default=["mlp-small", "conv-small"])
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--n-steps", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--num-threads", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.num_threads)
+    torch.manual_seed(0)
+    for model_name in args.models:
+        model_cls, model_kwargs, example_shape = MODELS[model_name]
+        model = model_cls(**model_kwargs).eval()
+        inputs = torch.randn((args.batch_size,) + example_shape)
+        ig = IntegratedGradients(model)
+
+        def attribute():
+            ig.attribute(inputs, target=0, n_steps=args.n_steps)
+
+        times = {}
+        for name, gradient_func in [
+            ("unbind", compute_gradients_unbind),
+            ("sum", compute_gradients),
+        ]:
+            ig.gradient_func = gradient_func
+            times[name] = _time(attribute, args.repeats)
+        print(
+            "%-12s bsz * n_steps = %6d  unbind: %8.3fs  sum: %8.3fs  speedup: %5.2fx"
+            % (
+                model_name,
+                args.batch_size * args.n_steps,
+                times["unbind"],
+                times["sum"],
+                times["unbind"] / times["sum"],
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
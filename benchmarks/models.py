@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import torch.nn as nn
+
+
+class MLP(nn.Module):
+    r"""
+    Multi-layer perceptron with separate ReLU modules, as required by DeepLift,
+    taking inputs of shape N x in_features and returning N x num_classes.
+    """
+
+    def __init__(self, in_features, hidden_features, num_layers, num_classes=10):
+        super().__init__()
+        layers = []
+        for i in range(num_layers):
+            layers.append(
+                nn.Linear(in_features if i == 0 else hidden_features, hidden_features)
+            )
+            layers.append(nn.ReLU())
+        self.hidden = nn.Sequential(*layers)
+        self.fc = nn.Linear(hidden_features, num_classes)
+
+    def forward(self, x):
+        return self.fc(self.hidden(x))
+
+
+class ConvNet(nn.Module):
+    r"""
+    Small convolutional network taking images of shape N x 3 x size x size and
+    returning N x num_classes.
+    """
+
+    def __init__(self, size, channels, num_classes=10):
+        super().__init__()
+        self.conv1 = nn.Conv2d(3, channels, 3, padding=1)
+        self.relu1 = nn.ReLU()
+        self.pool1 = nn.MaxPool2d(2)
+        self.conv2 = nn.Conv2d(channels, channels, 3, padding=1)
+        self.relu2 = nn.ReLU()
+        self.pool2 = nn.MaxPool2d(2)
+        self.fc = nn.Linear(channels * (size // 4) ** 2, num_classes)
+
+    def forward(self, x):
+        x = self.pool1(self.relu1(self.conv1(x)))
+        x = self.pool2(self.relu2(self.conv2(x)))
+        return self.fc(x.flatten(1))
+
+
+# Model configurations, keyed by name, given as (model class, constructor
+# kwargs, shape of a single input example).
+MODELS = {
+    "mlp-small": (MLP, dict(in_features=64, hidden_features=64, num_layers=2), (64,)),
+    "mlp-large": (
+        MLP,
+        dict(in_features=256, hidden_features=1024, num_layers=4),
+        (256,),
+    ),
+    "conv-small": (ConvNet, dict(size=16, channels=8), (3, 16, 16)),
+    "conv-large": (ConvNet, dict(size=32, channels=32), (3, 32, 32)),
+}
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+r"""
+Benchmarks the throughput and memory usage of the attribution algorithms on CPU.
+
+Each benchmark case runs an attribution algorithm on one model configuration
+from `models.py` for a given batch size and algorithm parameters (e.g. n_steps)
+in a fresh subprocess, so that its peak resident set size (RSS) is not affected
+by other cases. After a warm-up call, the attribution is timed over a number of
+repeats and the throughput is reported in samples (input examples) per second,
+based on the median time.
+
+Usage:
+
+    # run all cases and print the results
+    python benchmarks/run_benchmarks.py
+    # only run cases whose name contains the given string
+    python benchmarks/run_benchmarks.py --filter IntegratedGradients/mlp-large
+    # store the results as the baselines for subsequent comparisons
+    python benchmarks/run_benchmarks.py --save-baseline
+    # compare against the stored baselines and exit with status 1 if the
+    # throughput or peak RSS of any case regressed by more than the tolerance
+    python benchmarks/run_benchmarks.py --compare
+
+Baselines are only comparable when measured on the same machine with the same
+number of threads, so they should be regenerated on the machine used for
+comparisons.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import warnings
+
+import torch
+
+from captum.attr import (
+    DeepLift,
+    DeepLiftShap,
+    FeatureAblation,
+    GradientShap,
+    IntegratedGradients,
+    LayerConductance,
+    LayerIntegratedGradients,
+    NeuronConductance,
+    NoiseTunnel,
+    Occlusion,
+)
+
+from models import MODELS, MLP
+
+BASELINES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baselines.json"
+)
+BATCH_SIZES = [1, 16]
+
+
+def _layer(model):
+    return model.hidden[0] if isinstance(model, MLP) else model.conv1
+
+
+def _neuron_index(model):
+    return (0,) if isinstance(model, MLP) else (0, 0, 0)
+
+
+def _baselines(inputs):
+    return torch.randn((10,) + inputs.shape[1:])
+
+
+def integrated_gradients(model, inputs, n_steps):
+    ig = IntegratedGradients(model)
+    return lambda: ig.attribute(inputs, target=0, n_steps=n_steps)
+
+
+def deep_lift(model, inputs):
+    dl = DeepLift(model)
+    return lambda: dl.attribute(inputs, target=0)
+
+
+def deep_lift_shap(model, inputs):
+    dls = DeepLiftShap(model)
+    baselines = _baselines(inputs)
+    return lambda: dls.attribute(inputs, baselines, target=0)
+
+
+def gradient_shap(model, inputs, n_samples):
+    gs = GradientShap(model)
+    baselines = _baselines(inputs)
+    return lambda: gs.attribute(
+        inputs, baselines, n_samples=n_samples, stdevs=0.1, target=0
+    )
+
+
+def noise_tunnel(model, inputs, n_samples):
+    nt = NoiseTunnel(IntegratedGradients(model))
+    return lambda: nt.attribute(
+        inputs, n_samples=n_samples, stdevs=0.1, target=0, n_steps=25
+    )
+
+
+def feature_ablation(model, inputs):
+    fa = FeatureAblation(model)
+    return lambda: fa.attribute(inputs, target=0, ablations_per_eval=16)
+
+
+def occlusion(model, inputs):
+    occ = Occlusion(model)
+    return lambda: occ.attribute(
+        inputs,
+        sliding_window_shapes=(3, 4, 4),
+        strides=(3, 2, 2),
+        target=0,
+        ablations_per_eval=16,
+    )
+
+
+def layer_conductance(model, inputs, n_steps):
+    lc = LayerConductance(model, _layer(model))
+    return lambda: lc.attribute(inputs, target=0, n_steps=n_steps)
+
+
+def neuron_conductance(model, inputs, n_steps):
+    nc = NeuronConductance(model, _layer(model))
+    return lambda: nc.attribute(inputs, _neuron_index(model), target=0, n_steps=n_steps)
+
+
+def layer_integrated_gradients(model, inputs, n_steps):
+    lig = LayerIntegratedGradients(model, _layer(model))
+    return lambda: lig.attribute(inputs, target=0, n_steps=n_steps)
+
+
+GRADIENT_MODELS = ["mlp-small", "mlp-large", "conv-small"]
+
+# Benchmarked algorithms, keyed by name, given as (function constructing the
+# attribution call from model, inputs and parameters, model names, grid of
+# parameters).
+ALGORITHMS = {
+    "IntegratedGradients": (
+        integrated_gradients,
+        GRADIENT_MODELS,
+        {"n_steps": [25, 100]},
+    ),
+    "DeepLift": (deep_lift, GRADIENT_MODELS, {}),
+    "DeepLiftShap": (deep_lift_shap, GRADIENT_MODELS, {}),
+    "GradientShap": (gradient_shap, GRADIENT_MODELS, {"n_samples": [5, 20]}),
+    "NoiseTunnel": (noise_tunnel, GRADIENT_MODELS, {"n_samples": [5]}),
+    "FeatureAblation": (
+        feature_ablation,
+        ["mlp-small", "mlp-large", "conv-small"],
+        {},
+    ),
+    "Occlusion": (occlusion, ["conv-small", "conv-large"], {}),
+    "LayerConductance": (layer_conductance, GRADIENT_MODELS, {"n_steps": [25, 100]}),
+    "NeuronConductance": (neuron_conductance, GRADIENT_MODELS, {"n_steps": [25, 100]}),
+    "LayerIntegratedGradients": (
+        layer_integrated_gradients,
+        GRADIENT_MODELS,
+        {"n_steps": [25, 100]},
+    ),
+}
+
+
+def _cases():
+    r"""
+    Yields the name and specification of each benchmark case.
+    """
+    for algorithm, (_, model_names, param_grid) in ALGORITHMS.items():
+        param_combinations = [{}]
+        for param, values in param_grid.items():
+            param_combinations = [
+                dict(params, **{param: value})
+                for params in param_combinations
+                for value in values
+            ]
+        for model_name in model_names:
+            for batch_size in BATCH_SIZES:
+                for params in param_combinations:
+                    name = "/".join(
+                        [algorithm, model_name, "bsz=%d" % batch_size]
+                        + ["%s=%s" % item for item in sorted(params.items())]
+                    )
+                    yield name, (algorithm, model_name, batch_size, params)
+
+
+def _peak_rss_mb():
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is given in bytes on macOS and in kilobytes otherwise
+    return peak_rss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+
+def _run_case(spec, repeats, num_threads):
+    algorithm, model_name, batch_size, params = spec
+    # e.g. DeepLift warns about the hooks it sets on every call
+    warnings.simplefilter("ignore")
+    torch.set_num_threads(num_threads)
+    torch.manual_seed(0)
+
+    model_cls, model_kwargs, example_shape = MODELS[model_name]
+    model = model_cls(**model_kwargs).eval()
+    inputs = torch.randn((batch_size,) + example_shape)
+    attribute = ALGORITHMS[algorithm][0](model, inputs, **params)
+
+    # warm-up call, which is not timed
+    attribute()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        attribute()
+        times.append(time.perf_counter() - start)
+    return {
+        "samples_per_sec": batch_size / statistics.median(times),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run(name_filter=None, repeats=5, num_threads=1):
+    results = {}
+    # A fresh process for each case keeps the peak RSS of cases independent.
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for name, spec in _cases():
+            if name_filter is not None and name_filter not in name:
+                continue
+            results[name] = pool.apply(_run_case, (spec, repeats, num_threads))
+            print(
+                "%-70s %12.1f samples/sec %8.1f MB"
+                % (name, results[name]["samples_per_sec"], results[name]["peak_rss_mb"])
+            )
+    return results
+
+
+def compare(results, baselines, tolerance):
+    r"""
+    Returns the descriptions of all cases whose throughput is lower or whose
+    peak RSS is higher than the baseline by more than the relative tolerance.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baselines:
+            continue
+        baseline = baselines[name]
+        if result["samples_per_sec"] < baseline["samples_per_sec"] * (1 - tolerance):
+            regressions.append(
+                "%s: %.1f samples/sec, baseline %.1f samples/sec"
+                % (name, result["samples_per_sec"], baseline["samples_per_sec"])
+            )
+        if result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                "%s: peak RSS %.1f MB, baseline %.1f MB"
+                % (name, result["peak_rss_mb"], baseline["peak_rss_mb"])
+            )
+    return regressions
+
+
+def _environment(num_threads):
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "num_threads": num_threads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--filter", help="Only run cases containing this string.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--num-threads", type=int, default=1)
+    parser.add_argument("--output", help="Path of a JSON file to write results to.")
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results in the baselines file, keeping other cases.",
+    )
+    parser.add_argument(
+        "--compare", action="store_true", help="Compare results to the baselines."
+    )
+    parser.add_argument(
+        "--baselines", default=BASELINES_PATH, help="Path of the baselines file."
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Relative slowdown or RSS increase reported as a regression.",
+    )
+    args = parser.parse_args()
+
+    results = run(args.filter, args.repeats, args.num_threads)
+    report = {"environment": _environment(args.num_threads), "results": results}
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    stored = {"environment": report["environment"], "results": {}}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            stored = json.load(f)
+
+    if args.compare:
+        if stored["environment"] != report["environment"]:
+            print("Warning: baselines were measured in a different environment.")
+        regressions = compare(results, stored["results"], args.tolerance)
+        for regression in regressions:
+            print("Regression: " + regression)
+        if regressions:
+            sys.exit(1)
+
+    if args.save_baseline:
+        stored["environment"] = report["environment"]
+        stored["results"].update(results)
+        with open(args.baselines, "w") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,7 @@ from ._models.base import (
     configure_interpretable_embedding_layer,
     remove_interpretable_embedding_layer,
 )  # noqa
+from ._utils.activation_cache import ActivationCache  # noqa
 from ._utils.attribution import Attribution  # noqa
 from ._utils.attribution import GradientAttribution  # noqa
 from ._utils.attribution import PerturbationAttribution  # noqa
@@ -48,6 +49,7 @@ from ._utils.stat import Mean, StdDev, MSE, Var, Min, Max, Sum, Count
 
 __all__ = [
     "Attribution",
+    "ActivationCache",
     "GradientAttribution",
     "PerturbationAttribution",
     "NeuronAttribution",
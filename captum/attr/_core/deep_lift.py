@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 import warnings
+from contextlib import contextmanager
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -20,10 +22,12 @@ from .._utils.common import (
     _tensorize_baseline,
     _call_custom_attribution_func,
     _compute_conv_delta_and_format_attrs,
+    _autocast_forward_func,
     ExpansionTypes,
 )
 from .._utils.attribution import GradientAttribution
 from .._utils.gradient import apply_gradient_requirements, undo_gradient_requirements
+from .._utils.hooks import _attribution_call, _call_scoped
 
 
 # Check if module backward hook can safely be used for the module that produced
@@ -54,6 +58,173 @@ def _check_valid_module(inputs_grad_fn, outputs):
         return False
 
 
+class _ModuleState:
+    r"""
+    Input and output of a non-linear module saved by the forward hooks during a
+    DeepLift call, which are used to compute its multipliers in the backward
+    pass.
+    """
+
+    __slots__ = (
+        "input",
+        "input_version",
+        "input_grad_fn",
+        "input_hook",
+        "output",
+        "is_invalid",
+        "saved_grad",
+    )
+
+    def __init__(self, input, input_version, input_grad_fn):
+        self.input = input
+        # version of the input if it is not cloned, see `inputs_modified`
+        self.input_version = input_version
+        self.input_grad_fn = input_grad_fn
+        self.input_hook = None
+        self.output = None
+        self.is_invalid = False
+        self.saved_grad = None
+
+
+class _DeepLiftContext:
+    r"""
+    State of a single DeepLift call: the saved activations of each non-linear
+    module and the handles of the tensor hooks which are removed after the call.
+    Its forward hooks, which save the activations, are registered on the
+    non-linear modules for the duration of the call.
+
+    The inputs of modules which are not in-place are saved without a copy,
+    unless `clone_inputs` is set. If the forward pass modifies such an input
+    in place after the module was evaluated, which is detected by
+    `inputs_modified`, the forward pass needs to be repeated after `reset`.
+    """
+
+    __slots__ = ("module_states", "tensor_hook_handles", "clone_inputs")
+
+    def __init__(self):
+        self.module_states = {}
+        self.tensor_hook_handles = []
+        self.clone_inputs = False
+
+    def inputs_modified(self):
+        r"""
+        Returns whether any input saved without a copy was modified in place
+        since its module was evaluated.
+        """
+        return any(
+            state.input_version is not None
+            and state.input._version != state.input_version
+            for state in self.module_states.values()
+        )
+
+    def reset(self, clone_inputs):
+        r"""
+        Discards the activations saved by the previous forward pass, such
+        that the forward pass can be repeated.
+        """
+        for state in self.module_states.values():
+            if state.input_hook is not None:
+                state.input_hook.remove()
+        for handle in self.tensor_hook_handles:
+            handle.remove()
+        self.module_states = {}
+        self.tensor_hook_handles = []
+        self.clone_inputs = clone_inputs
+
+    def forward_pre_hook(self, module, inputs):
+        """
+        For the modules that perform in-place operations such as ReLUs, we cannot
+        use inputs from forward hooks. This is because in that case inputs
+        and outputs are the same. We need access the inputs in pre-hooks and
+        set necessary hooks on inputs there.
+        """
+        if module in self.module_states:
+            raise RuntimeError(
+                "A Module {} was detected that is used more than once in the "
+                "network, which is not supported by DeepLift computations. "
+                "Please, ensure that module is being used only once in the "
+                "network.".format(module)
+            )
+        inputs = _format_tensor_into_tuples(inputs)
+        input = inputs[0].detach()
+        # in-place modules always overwrite their input, which then needs to be
+        # cloned, while the inputs of other modules are only cloned if the
+        # forward pass is repeated because it modified them, see `reset`
+        if self.clone_inputs or getattr(module, "inplace", False):
+            state = _ModuleState(input.clone(), None, inputs[0].grad_fn)
+        else:
+            state = _ModuleState(input, input._version, inputs[0].grad_fn)
+
+        def tensor_backward_hook(grad):
+            if state.saved_grad is None:
+                raise RuntimeError(
+                    """Module {} was detected as not supporting correctly module
+                        backward hook. You should modify your hook to ignore the
+                        given grad_inputs (recompute them by hand if needed) and
+                        save the newly computed grad_inputs in state.saved_grad.
+                        See MaxPool1d as an example.""".format(
+                        module
+                    )
+                )
+            return state.saved_grad
+
+        # the hook is set by default but it will be used only for
+        # failure cases and will be removed otherwise
+        state.input_hook = inputs[0].register_hook(tensor_backward_hook)
+        self.module_states[module] = state
+
+    def forward_hook(self, module, inputs, outputs):
+        r"""
+        we need forward hook to access and detach the outputs of a neuron and
+        to register the backward hook on its gradient function
+        """
+        if module not in self.module_states:
+            return
+        state = self.module_states[module]
+        outputs = _format_tensor_into_tuples(outputs)
+        if outputs[0].grad_fn is None:
+            return
+        state.output = outputs[0].clone().detach()
+        if not _check_valid_module(state.input_grad_fn, outputs[0]):
+            warnings.warn(
+                """An invalid module {} is detected. Saved gradients will
+                be used as the gradients of the module's input tensor.
+                See MaxPool1d as an example.""".format(
+                    module
+                )
+            )
+            state.is_invalid = True
+            self.tensor_hook_handles.append(state.input_hook)
+        else:
+            # removing the hook if there is no failure case
+            state.input_hook.remove()
+        state.input_hook = None
+        state.input_grad_fn = None
+        # This is how module backward hooks are attached to the graph, but
+        # binding the state saved in this call instead of reading it from
+        # the module.
+        outputs[0].grad_fn.register_hook(
+            lambda grad_input, grad_output: _backward_hook(
+                module, state, grad_input, grad_output
+            )
+        )
+
+
+def _backward_hook(module, state, grad_input, grad_output, eps=1e-10):
+    r"""
+     `grad_input` is the gradient of the neuron with respect to its input
+     `grad_output` is the gradient of the neuron with respect to its output
+      we can override `grad_input` according to chain rule with.
+     `grad_output` * delta_out / delta_in.
+
+     """
+    return tuple(
+        SUPPORTED_NON_LINEAR[type(module)](
+            module, state, grad_input, grad_output, eps=eps
+        )
+    )
+
+
 class DeepLift(GradientAttribution):
     def __init__(self, model):
         r"""
@@ -63,8 +234,6 @@ class DeepLift(GradientAttribution):
         """
         GradientAttribution.__init__(self, model)
         self.model = model
-        self.forward_handles = []
-        self.backward_handles = []
 
     def attribute(
         self,
@@ -74,6 +243,7 @@ class DeepLift(GradientAttribution):
         additional_forward_args=None,
         return_convergence_delta=False,
         custom_attribution_func=None,
+        autocast_dtype=None,
     ):
         r""""
         Implements DeepLIFT algorithm based on the following paper:
@@ -203,6 +373,16 @@ class DeepLift(GradientAttribution):
                         `inputs`.
 
                         Default: None
+            autocast_dtype (torch.dtype, optional): If provided, the forward and
+                        backward passes through the model are run in mixed
+                        precision under `torch.autocast` with the given dtype,
+                        i.e. torch.bfloat16 on CPU and torch.float16 or
+                        torch.bfloat16 on CUDA devices. The multipliers with
+                        respect to the inputs are returned in float32 and the
+                        convergence delta is computed with a separate float32
+                        forward pass, such that it shows the error due to the
+                        reduced precision.
+                        Default: None
 
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
@@ -249,17 +429,7 @@ class DeepLift(GradientAttribution):
 
         _validate_input(inputs, baselines)
 
-        # set hooks for baselines
-        warnings.warn(
-            """Setting forward, backward hooks and attributes on non-linear
-               activations. The hooks and attributes will be removed
-            after the attribution is finished"""
-        )
-
         baselines = _tensorize_baseline(inputs, baselines)
-        main_model_pre_hook = self._pre_hook_main_model()
-
-        self.model.apply(self._register_hooks)
 
         additional_forward_args = _format_additional_forward_args(
             additional_forward_args
@@ -271,10 +441,18 @@ class DeepLift(GradientAttribution):
             target, 2, expansion_type=ExpansionTypes.repeat
         )
 
+        # outputs evaluated in reduced precision are not reused for the
+        # convergence delta
+        forward_outputs = []
         wrapped_forward_func = self._construct_forward_func(
-            self.model, (inputs, baselines), expanded_target, input_base_additional_args
+            _autocast_forward_func(self.model, autocast_dtype, inputs[0].device.type),
+            (inputs, baselines),
+            expanded_target,
+            input_base_additional_args,
+            forward_outputs if autocast_dtype is None else None,
         )
-        gradients = self.gradient_func(wrapped_forward_func, inputs,)
+        with self._hooks_enabled(wrapped_forward_func):
+            gradients = self.gradient_func(wrapped_forward_func, inputs,)
         if custom_attribution_func is None:
             attributions = tuple(
                 (input - baseline) * gradient
@@ -284,11 +462,10 @@ class DeepLift(GradientAttribution):
             attributions = _call_custom_attribution_func(
                 custom_attribution_func, gradients, inputs, baselines
             )
-        # remove hooks from all activations
-        main_model_pre_hook.remove()
-        self._remove_hooks()
-
         undo_gradient_requirements(inputs, gradient_mask)
+        start_point_output, end_point_output = self._endpoint_outputs(
+            forward_outputs, inputs[0].shape[0]
+        )
         return _compute_conv_delta_and_format_attrs(
             self,
             return_convergence_delta,
@@ -298,113 +475,54 @@ class DeepLift(GradientAttribution):
             additional_forward_args,
             target,
             is_inputs_tuple,
+            start_point_output,
+            end_point_output,
         )
 
     def _construct_forward_func(
-        self, forward_func, inputs, target=None, additional_forward_args=None
+        self,
+        forward_func,
+        inputs,
+        target=None,
+        additional_forward_args=None,
+        forward_outputs=None,
     ):
         def forward_fn():
-            return _run_forward(forward_func, inputs, target, additional_forward_args)
+            output = _run_forward(forward_func, inputs, target, additional_forward_args)
+            context = forward_fn.context
+            if context is not None and context.inputs_modified():
+                # the forward pass modified inputs of non-linear modules in
+                # place, so it is repeated with copies of all their inputs
+                context.reset(clone_inputs=True)
+                output = _run_forward(
+                    forward_func, inputs, target, additional_forward_args
+                )
+            if forward_outputs is not None:
+                forward_outputs.append(output.detach())
+            return output
 
+        # the context of the call, set while the hooks are enabled
+        forward_fn.context = None
         if hasattr(forward_func, "device_ids"):
             forward_fn.device_ids = forward_func.device_ids
         return forward_fn
 
-    def _is_non_linear(self, module):
-        return type(module) in SUPPORTED_NON_LINEAR.keys()
-
-    def _forward_pre_hook_ref(self, module, inputs):
-        inputs = _format_tensor_into_tuples(inputs)
-        module.input_ref = tuple(input.clone().detach() for input in inputs)
-
-    def _forward_pre_hook(self, module, inputs):
-        """
-        For the modules that perform in-place operations such as ReLUs, we cannot
-        use inputs from forward hooks. This is because in that case inputs
-        and outputs are the same. We need access the inputs in pre-hooks and
-        set necessary hooks on inputs there.
-        """
-        inputs = _format_tensor_into_tuples(inputs)
-        module.input = inputs[0].clone().detach()
-        module.input_grad_fns = inputs[0].grad_fn
-
-        def tensor_backward_hook(grad):
-            if module.saved_grad is None:
-                raise RuntimeError(
-                    """Module {} was detected as not supporting correctly module
-                        backward hook. You should modify your hook to ignore the given
-                        grad_inputs (recompute them by hand if needed) and save the
-                        newly computed grad_inputs in module.saved_grad. See MaxPool1d
-                        as an example.""".format(
-                        module
-                    )
-                )
-            return module.saved_grad
-
-        # the hook is set by default but it will be used only for
-        # failure cases and will be removed otherwise
-        handle = inputs[0].register_hook(tensor_backward_hook)
-        module.input_hook = handle
-
-    def _forward_hook(self, module, inputs, outputs):
+    def _endpoint_outputs(self, forward_outputs, num_examples):
         r"""
-        we need forward hook to access and detach the inputs and
-        outputs of a neuron
+        Splits the output of the forward pass on the concatenated inputs and
+        baselines, recorded in `forward_outputs`, into the outputs at the
+        baselines and at the inputs, which are reused for the convergence
+        delta. Returns None for both if they cannot be separated.
         """
-        outputs = _format_tensor_into_tuples(outputs)
-        module.output = outputs[0].clone().detach()
-        if not _check_valid_module(module.input_grad_fns, outputs[0]):
-            warnings.warn(
-                """An invalid module {} is detected. Saved gradients will
-                be used as the gradients of the module's input tensor.
-                See MaxPool1d as an example.""".format(
-                    module
-                )
-            )
-            module.is_invalid = True
-            module.saved_grad = None
-            self.forward_handles.append(module.input_hook)
-        else:
-            module.is_invalid = False
-            # removing the hook if there is no failure case
-            module.input_hook.remove()
-        del module.input_hook
-        del module.input_grad_fns
-
-    def _backward_hook(self, module, grad_input, grad_output, eps=1e-10):
-        r"""
-         `grad_input` is the gradient of the neuron with respect to its input
-         `grad_output` is the gradient of the neuron with respect to its output
-          we can override `grad_input` according to chain rule with.
-         `grad_output` * delta_out / delta_in.
-
-         """
-        # before accessing the attributes from the module we want
-        # to ensure that the properties exist, if not, then it is
-        # likely that the module is being reused.
-        attr_criteria = self.satisfies_attribute_criteria(module)
-        if not attr_criteria:
-            raise RuntimeError(
-                "A Module {} was detected that does not contain some of "
-                "the input/output attributes that are required for DeepLift "
-                "computations. This can occur, for example, if "
-                "your module is being used more than once in the network."
-                "Please, ensure that module is being used only once in the "
-                "network.".format(module)
-            )
-        multipliers = tuple(
-            SUPPORTED_NON_LINEAR[type(module)](
-                module, module.input, module.output, grad_input, grad_output, eps=eps
-            )
-        )
-        # remove all the properies that we set for the inputs and output
-        del module.input
-        del module.output
-
-        return multipliers
+        if len(forward_outputs) != 1:
+            return None, None
+        output = forward_outputs[0]
+        if output.dim() == 0 or output.shape[0] != 2 * num_examples:
+            return None, None
+        return output[num_examples:], output[:num_examples]
 
-    def satisfies_attribute_criteria(self, module):
-        return hasattr(module, "input") and hasattr(module, "output")
+    def _is_non_linear(self, module):
+        return type(module) in SUPPORTED_NON_LINEAR.keys()
 
     def _can_register_hook(self, module):
         # TODO find a better way of checking if a module is a container or not
@@ -416,22 +534,53 @@ class DeepLift(GradientAttribution):
             or not self._is_non_linear(module)
         )
 
-    def _register_hooks(self, module):
-        if not self._can_register_hook(module):
-            return
-        # adds forward hook to leaf nodes that are non-linear
-        forward_handle = module.register_forward_hook(self._forward_hook)
-        pre_forward_handle = module.register_forward_pre_hook(self._forward_pre_hook)
-        backward_handle = module.register_backward_hook(self._backward_hook)
-        self.forward_handles.append(forward_handle)
-        self.forward_handles.append(pre_forward_handle)
-        self.backward_handles.append(backward_handle)
-
-    def _remove_hooks(self):
-        for forward_handle in self.forward_handles:
-            forward_handle.remove()
-        for backward_handle in self.backward_handles:
-            backward_handle.remove()
+    @contextmanager
+    def _hooks_enabled(self, forward_fn):
+        r"""
+        Registers the forward hooks of a new attribution call on the non-linear
+        modules of the model, together with the pre-hook concatenating the
+        inputs and baselines of the model, and removes them on exit. The hooks
+        are scoped to the call, so that forward passes of other calls, which
+        may run concurrently on other threads, are not affected by them.
+        The context of the call is set on `forward_fn`, which is constructed by
+        `_construct_forward_func`.
+
+        The hooks are registered anew for each call rather than once for the
+        model and switched on and off, since hooks which stay registered would
+        be saved with the model, e.g. by `torch.save`, and would be called by
+        its plain forward passes. The cost of registering them is small
+        compared to the forward and backward passes of a call.
+        """
+        warnings.warn(
+            """Setting forward hooks on non-linear activations. The hooks will
+            be removed after the attribution is finished"""
+        )
+        context = _DeepLiftContext()
+        handles = []
+        forward_fn.context = context
+        with _attribution_call():
+            try:
+                for module in self.model.modules():
+                    if not self._can_register_hook(module):
+                        continue
+                    handles.append(
+                        module.register_forward_pre_hook(
+                            _call_scoped(context.forward_pre_hook, module)
+                        )
+                    )
+                    handles.append(
+                        module.register_forward_hook(
+                            _call_scoped(context.forward_hook, module)
+                        )
+                    )
+                handles.append(self._pre_hook_main_model())
+                yield
+            finally:
+                forward_fn.context = None
+                for handle in handles:
+                    handle.remove()
+                for handle in context.tensor_hook_handles:
+                    handle.remove()
 
     def _pre_hook_main_model(self):
         def pre_hook(module, baseline_inputs_add_args):
@@ -450,9 +599,10 @@ class DeepLift(GradientAttribution):
             return baseline_input_tsr
 
         if isinstance(self.model, nn.DataParallel):
-            return self.model.module.register_forward_pre_hook(pre_hook)
+            module = self.model.module
         else:
-            return self.model.register_forward_pre_hook(pre_hook)
+            module = self.model
+        return module.register_forward_pre_hook(_call_scoped(pre_hook, module))
 
     def has_convergence_delta(self):
         return True
@@ -475,6 +625,7 @@ class DeepLiftShap(DeepLift):
         additional_forward_args=None,
         return_convergence_delta=False,
         custom_attribution_func=None,
+        internal_batch_size=None,
     ):
         r"""
         Extends DeepLift algorithm and approximates SHAP values using Deeplift.
@@ -583,6 +734,19 @@ class DeepLiftShap(DeepLift):
                         attribution tensors that have the same length as the
                         `inputs`.
                         Default: None
+            internal_batch_size (int, optional): Maximum number of input and
+                        baseline pairs evaluated in a single forward and
+                        backward pass. If provided, the baselines are split into
+                        chunks of internal_batch_size // #examples baselines,
+                        but at least one, which are evaluated one after another
+                        for all inputs, and the mean of the attributions across
+                        baselines is accumulated incrementally. This bounds the
+                        memory used for the expanded inputs and baselines and
+                        for the model's activations, which otherwise grows with
+                        #examples * #baselines.
+                        If internal_batch_size is None, all pairs are evaluated
+                        at once.
+                        Default: None
 
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
@@ -638,32 +802,24 @@ class DeepLiftShap(DeepLift):
 
         inputs = _format_input(inputs)
 
-        # batch sizes
-        inp_bsz = inputs[0].shape[0]
-        base_bsz = baselines[0].shape[0]
-
-        (
-            exp_inp,
-            exp_base,
-            exp_tgt,
-            exp_addit_args,
-        ) = self._expand_inputs_baselines_targets(
-            baselines, inputs, target, additional_forward_args
-        )
-        attributions = super().attribute(
-            exp_inp,
-            exp_base,
-            target=exp_tgt,
-            additional_forward_args=exp_addit_args,
-            return_convergence_delta=return_convergence_delta,
-            custom_attribution_func=custom_attribution_func,
-        )
-        if return_convergence_delta:
-            attributions, delta = attributions
+        def attribute_pairs(exp_inp, exp_base, exp_tgt, exp_addit_args):
+            return super(DeepLiftShap, self).attribute(
+                exp_inp,
+                exp_base,
+                target=exp_tgt,
+                additional_forward_args=exp_addit_args,
+                return_convergence_delta=return_convergence_delta,
+                custom_attribution_func=custom_attribution_func,
+            )
 
-        attributions = tuple(
-            self._compute_mean_across_baselines(inp_bsz, base_bsz, attribution)
-            for attribution in attributions
+        attributions, delta = self._attribute_in_baseline_chunks(
+            attribute_pairs,
+            inputs,
+            baselines,
+            target,
+            additional_forward_args,
+            return_convergence_delta,
+            internal_batch_size,
         )
 
         if return_convergence_delta:
@@ -677,9 +833,14 @@ class DeepLiftShap(DeepLift):
         inp_bsz = inputs[0].shape[0]
         base_bsz = baselines[0].shape[0]
 
+        # Each input is repeated base_bsz times in a row. Copying an expanded
+        # view is cheaper than repeat_interleave, which gathers by index.
         expanded_inputs = tuple(
             [
-                input.repeat_interleave(base_bsz, dim=0).requires_grad_()
+                input.unsqueeze(1)
+                .expand((inp_bsz, base_bsz) + input.shape[1:])
+                .reshape((inp_bsz * base_bsz,) + input.shape[1:])
+                .requires_grad_()
                 for input in inputs
             ]
         )
@@ -706,6 +867,69 @@ class DeepLiftShap(DeepLift):
             input_additional_args,
         )
 
+    def _attribute_in_baseline_chunks(
+        self,
+        attribute_fn,
+        inputs,
+        baselines,
+        target,
+        additional_forward_args,
+        return_convergence_delta,
+        internal_batch_size,
+    ):
+        r"""
+        Computes the mean across baselines of the attributions which
+        `attribute_fn` returns for the expanded inputs, baselines, target and
+        additional forward args of all input and baseline pairs. If
+        `internal_batch_size` is provided, the baselines are evaluated in
+        chunks of at most `internal_batch_size` pairs, but at least one baseline
+        per input, and the mean is updated with each chunk. Returns the
+        attributions, in the format returned by `attribute_fn`, and the deltas
+        of all pairs ordered by input example and then baseline if
+        `return_convergence_delta` is True, or None otherwise.
+        """
+        inp_bsz = inputs[0].shape[0]
+        base_bsz = baselines[0].shape[0]
+        chunk_size = (
+            base_bsz
+            if internal_batch_size is None
+            else max(1, min(base_bsz, internal_batch_size // inp_bsz))
+        )
+
+        mean_attributions = None
+        deltas = []
+        for start in range(0, base_bsz, chunk_size):
+            chunk_baselines = tuple(
+                baseline[start : start + chunk_size] for baseline in baselines
+            )
+            chunk_bsz = chunk_baselines[0].shape[0]
+            attributions = attribute_fn(
+                *self._expand_inputs_baselines_targets(
+                    chunk_baselines, inputs, target, additional_forward_args
+                )
+            )
+            if return_convergence_delta:
+                attributions, delta = attributions
+                deltas.append(delta.reshape(inp_bsz, chunk_bsz))
+            is_attrib_tuple = isinstance(attributions, tuple)
+            chunk_means = tuple(
+                self._compute_mean_across_baselines(inp_bsz, chunk_bsz, attribution)
+                for attribution in _format_tensor_into_tuples(attributions)
+            )
+            if mean_attributions is None:
+                mean_attributions = chunk_means
+            else:
+                # running mean, weighting each chunk by its number of baselines
+                weight = chunk_bsz / (start + chunk_bsz)
+                mean_attributions = tuple(
+                    mean + (chunk_mean - mean) * weight
+                    for mean, chunk_mean in zip(mean_attributions, chunk_means)
+                )
+
+        attributions = _format_attributions(is_attrib_tuple, mean_attributions)
+        delta = torch.cat(deltas, dim=1).reshape(-1) if deltas else None
+        return attributions, delta
+
     def _compute_mean_across_baselines(self, inp_bsz, base_bsz, attribution):
         # Average for multiple references
         attr_shape = (inp_bsz, base_bsz)
@@ -714,13 +938,13 @@ class DeepLiftShap(DeepLift):
         return torch.mean(attribution.view(attr_shape), axis=1, keepdim=False)
 
 
-def nonlinear(module, inputs, outputs, grad_input, grad_output, eps=1e-10):
+def nonlinear(module, state, grad_input, grad_output, eps=1e-10):
     r"""
     grad_input: (dLoss / dprev_layer_out, dLoss / wij, dLoss / bij)
     grad_output: (dLoss / dlayer_out)
     https://github.com/pytorch/pytorch/issues/12331
     """
-    delta_in, delta_out = _compute_diffs(inputs, outputs)
+    delta_in, delta_out = _compute_diffs(state.input, state.output)
 
     new_grad_inp = list(grad_input)
 
@@ -732,13 +956,13 @@ def nonlinear(module, inputs, outputs, grad_input, grad_output, eps=1e-10):
 
     # If the module is invalid, save the newly computed gradients
     # The original_grad_input will be overridden later in the Tensor hook
-    if module.is_invalid:
-        module.saved_grad = new_grad_inp[0]
+    if state.is_invalid:
+        state.saved_grad = new_grad_inp[0]
     return new_grad_inp
 
 
-def softmax(module, inputs, outputs, grad_input, grad_output, eps=1e-10):
-    delta_in, delta_out = _compute_diffs(inputs, outputs)
+def softmax(module, state, grad_input, grad_output, eps=1e-10):
+    delta_in, delta_out = _compute_diffs(state.input, state.output)
 
     new_grad_inp = list(grad_input)
     grad_input_unnorm = torch.where(
@@ -752,51 +976,30 @@ def softmax(module, inputs, outputs, grad_input, grad_output, eps=1e-10):
     return new_grad_inp
 
 
-def maxpool1d(module, inputs, outputs, grad_input, grad_output, eps=1e-10):
+def maxpool1d(module, state, grad_input, grad_output, eps=1e-10):
     return maxpool(
-        module,
-        F.max_pool1d,
-        F.max_unpool1d,
-        inputs,
-        outputs,
-        grad_input,
-        grad_output,
-        eps=eps,
+        module, state, F.max_pool1d, F.max_unpool1d, grad_input, grad_output, eps=eps,
     )
 
 
-def maxpool2d(module, inputs, outputs, grad_input, grad_output, eps=1e-10):
+def maxpool2d(module, state, grad_input, grad_output, eps=1e-10):
     return maxpool(
-        module,
-        F.max_pool2d,
-        F.max_unpool2d,
-        inputs,
-        outputs,
-        grad_input,
-        grad_output,
-        eps=eps,
+        module, state, F.max_pool2d, F.max_unpool2d, grad_input, grad_output, eps=eps,
     )
 
 
-def maxpool3d(module, inputs, outputs, grad_input, grad_output, eps=1e-10):
+def maxpool3d(module, state, grad_input, grad_output, eps=1e-10):
     return maxpool(
-        module,
-        F.max_pool3d,
-        F.max_unpool3d,
-        inputs,
-        outputs,
-        grad_input,
-        grad_output,
-        eps=eps,
+        module, state, F.max_pool3d, F.max_unpool3d, grad_input, grad_output, eps=eps,
     )
 
 
 def maxpool(
-    module, pool_func, unpool_func, inputs, outputs, grad_input, grad_output, eps=1e-10,
+    module, state, pool_func, unpool_func, grad_input, grad_output, eps=1e-10,
 ):
     with torch.no_grad():
-        input, input_ref = inputs.chunk(2)
-        output, output_ref = outputs.chunk(2)
+        input, input_ref = state.input.chunk(2)
+        output, output_ref = state.output.chunk(2)
 
         delta_in = input - input_ref
         delta_in = torch.cat(2 * [delta_in])
@@ -808,7 +1011,7 @@ def maxpool(
         delta_out = torch.cat([delta_out_xmax - output_ref, output - delta_out_xmax])
 
         _, indices = pool_func(
-            module.input,
+            state.input,
             module.kernel_size,
             module.stride,
             module.padding,
@@ -824,7 +1027,7 @@ def maxpool(
                 module.kernel_size,
                 module.stride,
                 module.padding,
-                list(module.input.shape),
+                list(state.input.shape),
             ),
             2,
         )
@@ -833,7 +1036,7 @@ def maxpool(
     unpool_grad_out_delta = torch.cat(2 * [unpool_grad_out_delta])
 
     # If the module is invalid, we need to recompute the grad_input
-    if module.is_invalid:
+    if state.is_invalid:
         original_grad_input = grad_input
         grad_input = (
             unpool_func(
@@ -842,7 +1045,7 @@ def maxpool(
                 module.kernel_size,
                 module.stride,
                 module.padding,
-                list(module.input.shape),
+                list(state.input.shape),
             ),
         )
 
@@ -851,8 +1054,8 @@ def maxpool(
     )
     # If the module is invalid, save the newly computed gradients
     # The original_grad_input will be overridden later in the Tensor hook
-    if module.is_invalid:
-        module.saved_grad = new_grad_inp
+    if state.is_invalid:
+        state.saved_grad = new_grad_inp
         return original_grad_input
     else:
         return (new_grad_inp,)
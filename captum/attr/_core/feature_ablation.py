@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
+import heapq
+import threading
+from contextlib import contextmanager
 
 import torch
 
 from torch import Tensor, dtype
 
-from typing import Callable, List, Optional, Tuple, Union, Any, cast
+from typing import Callable, Dict, List, Optional, Tuple, Union, Any, cast
 
 from .._utils.common import (
     _format_attributions,
@@ -14,8 +17,10 @@ from .._utils.common import (
     _expand_additional_forward_args,
     _expand_target,
     _format_additional_forward_args,
+    _MultiTarget,
 )
 from .._utils.attribution import PerturbationAttribution
+from .._utils.batching import _prefetched, _tune_batch_size
 from .._utils.typing import TensorOrTupleOfTensors
 
 
@@ -28,6 +33,10 @@ class FeatureAblation(PerturbationAttribution):
                         any modification of it
         """
         PerturbationAttribution.__init__(self, forward_func)
+        # Idle buffers holding inputs repeated for ablations_per_eval, one per
+        # input index, which are reused across calls, see
+        # `_ablation_buffers_acquired`.
+        self._ablation_buffers: Dict[int, Tensor] = {}
         self.use_weights = False
 
     def attribute(
@@ -43,6 +52,15 @@ class FeatureAblation(PerturbationAttribution):
         additional_forward_args: Any = None,
         feature_mask: Optional[TensorOrTupleOfTensors] = None,
         ablations_per_eval: int = 1,
+        sparse_ablation: bool = False,
+        memory_budget: Optional[int] = None,
+        top_k: Optional[int] = None,
+        hierarchy_branching: int = 4,
+        num_workers: int = 0,
+        prefetch_batches: int = 0,
+        targets: Optional[
+            List[Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]]
+        ] = None,
         **kwargs: Any
     ) -> TensorOrTupleOfTensors:
         r""""
@@ -167,6 +185,91 @@ class FeatureAblation(PerturbationAttribution):
                             If the forward function returns a single scalar per batch,
                             ablations_per_eval must be set to 1.
                             Default: 1
+                sparse_ablation (bool, optional): If True, the input positions
+                            of each feature are computed once from the feature
+                            mask, and ablations only write the baselines into
+                            the positions of the ablated features and scatter
+                            the output differences back to those positions,
+                            rather than applying a dense mask to the full
+                            input. This is much faster when each feature group
+                            is small relative to the input, e.g. single tokens
+                            or pixels of a large input.
+                            Only supported by FeatureAblation itself and not
+                            by child classes with custom ablations.
+                            Default: False
+                memory_budget (int, optional): If provided, ablations_per_eval
+                            is ignored and instead chosen automatically as the
+                            largest number of ablations per forward pass whose
+                            evaluation stays within memory_budget bytes of peak
+                            memory. This is determined by probing the forward
+                            function with increasing numbers of ablations, and
+                            the choice is cached for subsequent calls with the
+                            same model and input shapes. Peak memory is measured
+                            exactly on CUDA devices and estimated from the size
+                            of the module outputs of the forward function
+                            otherwise.
+                            Default: None
+                top_k (int, optional): If provided, only the top_k features
+                            of each input tensor with the largest output
+                            differences are attributed exactly. The features are
+                            organized in a hierarchy of contiguous ranges of
+                            feature ids, so related features should be given
+                            adjacent ids in the feature mask. The range of all
+                            features is recursively split into
+                            hierarchy_branching ranges, and each range is
+                            ablated as a whole. Ranges are split further in order
+                            of decreasing absolute output difference, summed
+                            across examples, until top_k single features have
+                            been reached. Features in ranges which were not split
+                            further are attributed the output difference of
+                            their range, which bounds their individual
+                            attributions for models that are additive in these
+                            features with attributions of the same sign.
+                            This requires far fewer forward passes than ablating
+                            every feature when top_k is small.
+                            Only supported by FeatureAblation itself and not
+                            by child classes with custom ablations.
+                            Default: None
+                hierarchy_branching (int, optional): Number of ranges each range
+                            of feature ids is split into when top_k is provided.
+                            Default: 4
+                num_workers (int, optional): If larger than 0, the features of
+                            each input are split into contiguous ranges, which
+                            are ablated in parallel by num_workers forked worker
+                            processes. The workers inherit the forward function
+                            from the calling process, so the model is not copied
+                            unless modified, and each worker uses
+                            torch.get_num_threads() // num_workers threads to
+                            avoid oversubscribing the CPU cores. The partial
+                            attributions of all workers are summed by the
+                            calling process.
+                            This requires the fork start method and is only
+                            supported for inputs on CPU, and not in combination
+                            with sparse_ablation or top_k.
+                            Default: 0
+                prefetch_batches (int, optional): If larger than 0, the ablated
+                            batches are constructed by a background thread,
+                            which stays up to prefetch_batches batches ahead of
+                            the evaluation of the forward function, so that
+                            constructing the next batch overlaps with evaluating
+                            the current one. This mostly helps when
+                            constructing the ablations is expensive compared to
+                            the forward function, e.g. for large inputs with
+                            many ablations per evaluation, and increases memory
+                            usage by up to prefetch_batches + 1 ablated batches.
+                            Not supported in combination with sparse_ablation
+                            or top_k.
+                            Default: 0
+                targets (list, optional): List of targets, each given in any of
+                            the forms described for `target`, for which
+                            attributions are computed from the same forward
+                            evaluations, e.g. the top-k predicted classes of
+                            each example given as k tensors. The attributions
+                            for all targets are stacked along a new first
+                            dimension. This cannot be combined with `target`,
+                            sparse_ablation or top_k, and each target must
+                            identify a single output per example.
+                            Default: None
                 **kwargs (Any, optional): Any additional arguments used by child
                             classes of FeatureAblation (such as Occlusion) to construct
                             ablations. These arguments are ignored when using
@@ -184,6 +287,8 @@ class FeatureAblation(PerturbationAttribution):
                             If the forward function returns a scalar per batch, then
                             attribution tensor(s) will have first dimension 1 and
                             the remaining dimensions will match the input.
+                            If `targets` is provided, the attributions for each
+                            target are stacked along a new first dimension.
                             If a single tensor is provided as inputs, a single tensor is
                             returned. If a tuple is provided for inputs, a tuple of
                             corresponding sized tensors is returned.
@@ -236,7 +341,29 @@ class FeatureAblation(PerturbationAttribution):
         assert (
             isinstance(ablations_per_eval, int) and ablations_per_eval >= 1
         ), "Ablations per evaluation must be at least 1."
-        with torch.no_grad():
+        if num_workers > 0:
+            assert not sparse_ablation and top_k is None, (
+                "Parallel ablation is not supported in combination with sparse "
+                "or top-k ablation."
+            )
+            assert all(
+                input.device.type == "cpu" for input in inputs
+            ), "Parallel ablation is only supported for inputs on CPU."
+        assert prefetch_batches == 0 or (not sparse_ablation and top_k is None), (
+            "Prefetching ablated batches is not supported in combination with "
+            "sparse or top-k ablation."
+        )
+        if targets is not None:
+            assert target is None, "Only one of target and targets can be provided."
+            assert not sparse_ablation and top_k is None, (
+                "Multiple targets are not supported in combination with sparse "
+                "or top-k ablation."
+            )
+            target = _MultiTarget(targets)
+        # (input index, feature range, accumulate_weights) of the ablations
+        # which are evaluated by worker processes if num_workers > 0
+        parallel_tasks: List[Tuple[int, Tuple[int, int], bool]] = []
+        with torch.no_grad(), self._ablation_buffers_acquired() as buffers:
             # Computes initial evaluation with all features, which is compared
             # to each ablated result.
             initial_eval = _run_forward(
@@ -261,11 +388,22 @@ class FeatureAblation(PerturbationAttribution):
                         )
             else:
                 single_output_mode = False
-                assert (
-                    isinstance(initial_eval, torch.Tensor)
-                    and initial_eval[0].numel() == 1
+                assert isinstance(initial_eval, torch.Tensor) and (
+                    isinstance(target, _MultiTarget) or initial_eval[0].numel() == 1
                 ), "Target should identify a single element in the model output."
-                initial_eval = initial_eval.reshape(1, num_examples)
+                # initial_eval has an additional first dimension of #targets if
+                # multiple targets are provided
+                initial_eval = initial_eval.reshape(
+                    _target_shape(target) + (1, num_examples)
+                )
+                if memory_budget is not None:
+                    ablations_per_eval = self._tune_ablations_per_eval(
+                        inputs,
+                        additional_forward_args,
+                        target,
+                        feature_mask,
+                        memory_budget,
+                    )
 
             # Initialize attribution totals and counts
             attrib_type = cast(
@@ -275,8 +413,11 @@ class FeatureAblation(PerturbationAttribution):
                 else type(initial_eval),
             )
             total_attrib = [
-                torch.zeros_like(
-                    input[0:1] if single_output_mode else input, dtype=attrib_type
+                torch.zeros(
+                    _target_shape(target)
+                    + (input[0:1] if single_output_mode else input).shape,
+                    dtype=attrib_type,
+                    device=input.device,
                 )
                 for input in inputs
             ]
@@ -295,12 +436,104 @@ class FeatureAblation(PerturbationAttribution):
                 # Skip any empty input tensors
                 if torch.numel(inputs[i]) == 0:
                     continue
-                for (
-                    current_inputs,
-                    current_add_args,
-                    current_target,
-                    current_mask,
-                ) in self._ablation_generator(
+                if top_k is not None:
+                    assert (
+                        not self.use_weights
+                    ), "Top-k ablation is not supported for overlapping ablations."
+                    total_attrib[i] += self._attribute_top_k(
+                        i,
+                        inputs,
+                        additional_forward_args,
+                        target,
+                        baselines,
+                        feature_mask,
+                        ablations_per_eval,
+                        initial_eval,
+                        single_output_mode,
+                        top_k,
+                        hierarchy_branching,
+                        buffers,
+                    ).to(attrib_type)
+                    continue
+                # Ablation counts per position are accumulated from the masks
+                # of the ablations if they are not known in advance.
+                accumulate_weights = False
+                if self.use_weights:
+                    input_weights = self._ablation_weights(
+                        inputs[i], **_select_input_kwargs(kwargs, i)
+                    )
+                    if input_weights is not None:
+                        weights[i] += input_weights
+                    else:
+                        accumulate_weights = True
+                if sparse_ablation:
+                    assert (
+                        not self.use_weights
+                    ), "Sparse ablation is not supported for overlapping ablations."
+                    for (
+                        current_inputs,
+                        current_add_args,
+                        current_target,
+                        feature_rows,
+                        positions,
+                    ) in self._sparse_ablation_generator(
+                        i,
+                        inputs,
+                        additional_forward_args,
+                        target,
+                        baselines,
+                        feature_mask,
+                        ablations_per_eval,
+                        buffers,
+                    ):
+                        modified_eval = _run_forward(
+                            self.forward_func,
+                            current_inputs,
+                            current_target,
+                            current_add_args,
+                        )
+                        # eval_diff dimensions: (#features in batch, #num_examples)
+                        # or (1, 1) if the function returns a scalar per batch.
+                        if single_output_mode:
+                            eval_diff = torch.as_tensor(
+                                initial_eval - modified_eval
+                            ).reshape(1, 1)
+                        else:
+                            eval_diff = initial_eval - modified_eval.reshape(
+                                -1, num_examples
+                            )
+                        # Scatter the differences of each feature to its input
+                        # positions. Shared masks index the flattened features
+                        # of each example, per-example masks index the
+                        # flattened input.
+                        if positions.dim() == 2:
+                            eval_diff = eval_diff[
+                                feature_rows[0],
+                                0 if single_output_mode else feature_rows[1],
+                            ].reshape(1, -1)
+                            total_attrib[i].view(1, -1).index_add_(
+                                1, positions[0], eval_diff.to(attrib_type)
+                            )
+                        else:
+                            eval_diff = eval_diff[feature_rows].t()
+                            total_attrib[i].view(eval_diff.shape[0], -1).index_add_(
+                                1, positions, eval_diff.to(attrib_type)
+                            )
+                    continue
+                if num_workers > 0:
+                    parallel_tasks.extend(
+                        (i, feature_range, accumulate_weights)
+                        for feature_range in self._feature_range_shards(
+                            i,
+                            inputs,
+                            feature_mask,
+                            ablations_per_eval,
+                            num_workers,
+                            **kwargs
+                        )
+                    )
+                    continue
+                input_attrib, input_weights = self._ablate_feature_range(
                     i,
                     inputs,
                     additional_forward_args,
@@ -308,33 +541,43 @@ class FeatureAblation(PerturbationAttribution):
                     baselines,
                     feature_mask,
                     ablations_per_eval,
+                    initial_eval,
+                    single_output_mode,
+                    attrib_type,
+                    accumulate_weights,
+                    prefetch_batches=prefetch_batches,
+                    buffers=buffers,
                     **kwargs
+                )
+                total_attrib[i] += input_attrib
+                if accumulate_weights:
+                    weights[i] += input_weights
+
+            if parallel_tasks:
+                shared_args = (
+                    inputs,
+                    additional_forward_args,
+                    target,
+                    baselines,
+                    feature_mask,
+                    ablations_per_eval,
+                    initial_eval,
+                    single_output_mode,
+                    attrib_type,
+                )
+                results = _parallel_ablate(
+                    self,
+                    num_workers,
+                    parallel_tasks,
+                    shared_args,
+                    dict(kwargs, prefetch_batches=prefetch_batches),
+                )
+                for (i, _, accumulate_weights), (input_attrib, input_weights) in zip(
+                    parallel_tasks, results
                 ):
-                    # modified_eval dimensions: 1D tensor with length
-                    # equal to #num_examples * #features in batch
-                    modified_eval = _run_forward(
-                        self.forward_func,
-                        current_inputs,
-                        current_target,
-                        current_add_args,
-                    )
-                    # eval_diff dimensions: (#features in batch, #num_examples, 1,.. 1)
-                    # (contains 1 more dimension than inputs). This adds extra
-                    # dimensions of 1 to make the tensor broadcastable with the inputs
-                    # tensor.
-                    if single_output_mode:
-                        eval_diff = initial_eval - modified_eval
-                    else:
-                        eval_diff = (
-                            initial_eval - modified_eval.reshape(-1, num_examples)
-                        ).reshape(
-                            (-1, num_examples) + (len(inputs[i].shape) - 1) * (1,)
-                        )
-                    if self.use_weights:
-                        weights[i] += current_mask.float().sum(dim=0)
-                    total_attrib[i] += (eval_diff * current_mask.to(attrib_type)).sum(
-                        dim=0
-                    )
+                    total_attrib[i] += input_attrib
+                    if accumulate_weights:
+                        weights[i] += input_weights
 
             # Divide total attributions by counts and return formatted attributions
             if self.use_weights:
@@ -347,7 +590,7 @@ class FeatureAblation(PerturbationAttribution):
             _result = _format_attributions(is_inputs_tuple, attrib)
         return _result
 
-    def _ablation_generator(
+    def _attribute_top_k(
         self,
         i,
         inputs,
@@ -356,31 +599,273 @@ class FeatureAblation(PerturbationAttribution):
         baselines,
         input_mask,
         ablations_per_eval,
+        initial_eval,
+        single_output_mode,
+        top_k,
+        hierarchy_branching,
+        buffers,
+    ):
+        r"""
+        Attributes input i by best-first descent through a hierarchy of ranges of
+        feature ids. A heap holds the evaluated ranges ordered by their absolute
+        output difference summed across examples. The range with the largest
+        difference is repeatedly popped and, unless it is a single feature,
+        split into hierarchy_branching ranges which are evaluated and pushed,
+        until top_k single features have been popped. Every feature is then
+        attributed the output difference of the smallest evaluated range
+        containing it, which is exact for the popped single features.
+        """
+        assert top_k >= 1, "top_k must be at least 1."
+        assert hierarchy_branching >= 2, "hierarchy_branching must be at least 2."
+        input = inputs[i]
+        input_mask = input_mask[i] if input_mask is not None else None
+        min_feature, num_features, input_mask = self._get_feature_range_and_mask(
+            input, input_mask
+        )
+        baseline = baselines[i] if isinstance(baselines, tuple) else baselines
+        if isinstance(baseline, torch.Tensor):
+            baseline = baseline.reshape((1,) + baseline.shape)
+
+        def split(start, end):
+            step = -(-(end - start) // hierarchy_branching)
+            return [(s, min(s + step, end)) for s in range(start, end, step)]
+
+        def evaluate(ranges):
+            # eval diffs of ablating each range as a whole, each with dimension
+            # (#num_examples,) or (1,) if the function returns a scalar per batch
+            eval_diffs = []
+            for batch_start in range(0, len(ranges), ablations_per_eval):
+                batch = ranges[batch_start : batch_start + ablations_per_eval]
+                current_inputs = self._repeat_inputs(
+                    inputs, len(batch), buffers, skip_index=i
+                )
+                current_inputs[i] = _ablate_with_mask(
+                    input.expand((len(batch),) + input.shape),
+                    _feature_ranges_mask(input_mask, batch),
+                    baseline,
+                ).reshape((-1,) + input.shape[1:])
+                modified_eval = _run_forward(
+                    self.forward_func,
+                    tuple(current_inputs),
+                    _expand_target(target, len(batch)),
+                    _expand_additional_forward_args(additional_args, len(batch))
+                    if additional_args is not None
+                    else None,
+                )
+                if single_output_mode:
+                    eval_diff = torch.as_tensor(initial_eval - modified_eval).reshape(
+                        1, 1
+                    )
+                else:
+                    eval_diff = initial_eval - modified_eval.reshape(len(batch), -1)
+                eval_diffs.extend(eval_diff)
+            return eval_diffs
+
+        heap = []
+        num_evaluated = 0
+
+        def push(ranges):
+            nonlocal num_evaluated
+            for (start, end), eval_diff in zip(ranges, evaluate(ranges)):
+                # num_evaluated breaks ties in insertion order
+                heapq.heappush(
+                    heap,
+                    (
+                        -eval_diff.abs().sum().item(),
+                        num_evaluated,
+                        start,
+                        end,
+                        eval_diff,
+                    ),
+                )
+                num_evaluated += 1
+
+        push(split(min_feature, num_features))
+        attributed = []
+        num_exact = 0
+        while heap and num_exact < top_k:
+            entry = heapq.heappop(heap)
+            start, end = entry[2], entry[3]
+            if end - start == 1:
+                attributed.append(entry)
+                num_exact += 1
+            else:
+                push(split(start, end))
+
+        attributed.extend(heap)
+        ranges = [(entry[2], entry[3]) for entry in attributed]
+        # eval_diffs dimensions: (#ranges, #num_examples, 1,.. 1)
+        eval_diffs = torch.stack([entry[4] for entry in attributed]).reshape(
+            (len(ranges), -1) + (input.dim() - 1) * (1,)
+        )
+        return (eval_diffs * _feature_ranges_mask(input_mask, ranges)).sum(dim=0)
+
+    def _ablate_feature_range(
+        self,
+        i,
+        inputs,
+        additional_forward_args,
+        target,
+        baselines,
+        feature_mask,
+        ablations_per_eval,
+        initial_eval,
+        single_output_mode,
+        attrib_type,
+        accumulate_weights,
+        feature_range=None,
+        prefetch_batches=0,
+        buffers=None,
         **kwargs
     ):
-        extra_args = {}
-        for key, value in kwargs.items():
-            # For any tuple argument in kwargs, we choose index i of the tuple.
-            if isinstance(value, tuple):
-                extra_args[key] = value[i]
+        r"""
+        Ablates the features of input i, or only the features with ids in
+        `feature_range` if provided, and returns their summed attributions
+        together with the number of ablations containing each position if
+        `accumulate_weights` is True, or None otherwise. If prefetch_batches is
+        larger than 0, the ablated batches are constructed by a background
+        thread, see `_prefetched`.
+        """
+        num_examples = inputs[0].shape[0]
+        input = inputs[i][0:1] if single_output_mode else inputs[i]
+        total_attrib = torch.zeros(
+            _target_shape(target) + input.shape, dtype=attrib_type, device=input.device
+        )
+        weights = torch.zeros_like(input).float() if accumulate_weights else None
+        ablated_batches = self._ablation_generator(
+            i,
+            inputs,
+            additional_forward_args,
+            target,
+            baselines,
+            feature_mask,
+            ablations_per_eval,
+            feature_range=feature_range,
+            buffers=buffers,
+            **kwargs
+        )
+        if prefetch_batches > 0:
+            ablated_batches = _prefetched(ablated_batches, prefetch_batches)
+        for (
+            current_inputs,
+            current_add_args,
+            current_target,
+            current_mask,
+        ) in ablated_batches:
+            # modified_eval dimensions: 1D tensor with length
+            # equal to #num_examples * #features in batch
+            modified_eval = _run_forward(
+                self.forward_func, current_inputs, current_target, current_add_args,
+            )
+            # eval_diff dimensions: (#features in batch, #num_examples, 1,.. 1)
+            # (contains 1 more dimension than inputs), preceded by #targets if
+            # multiple targets are provided. This adds extra dimensions of 1 to
+            # make the tensor broadcastable with the inputs tensor.
+            if single_output_mode:
+                eval_diff = initial_eval - modified_eval
             else:
-                extra_args[key] = value
+                batch_shape = _target_shape(target) + (-1, num_examples)
+                eval_diff = (initial_eval - modified_eval.reshape(batch_shape)).reshape(
+                    batch_shape + (len(inputs[i].shape) - 1) * (1,)
+                )
+            if accumulate_weights:
+                weights += current_mask.float().sum(dim=0)
+            self._add_ablation_attributions(
+                total_attrib, eval_diff, current_mask, len(inputs[i].shape)
+            )
+        return total_attrib, weights
 
+    def _feature_range_shards(
+        self, i, inputs, feature_mask, ablations_per_eval, num_workers, **kwargs
+    ):
+        r"""
+        Splits the range of feature ids of input i into contiguous ranges, given
+        as (start, end) pairs with exclusive end, which are ablated in parallel.
+        Each worker is given about 4 ranges for load balancing, and each range
+        contains a multiple of ablations_per_eval features, so that the
+        forward passes have the same batch sizes as in serial ablation.
+        """
+        min_feature, num_features, _ = self._get_feature_range_and_mask(
+            inputs[i],
+            feature_mask[i] if feature_mask is not None else None,
+            **_select_input_kwargs(kwargs, i)
+        )
+        num_batches = -(-(num_features - min_feature) // ablations_per_eval)
+        shard_size = ablations_per_eval * max(1, -(-num_batches // (4 * num_workers)))
+        return [
+            (start, min(start + shard_size, num_features))
+            for start in range(min_feature, num_features, shard_size)
+        ]
+
+    def _tune_ablations_per_eval(
+        self, inputs, additional_forward_args, target, feature_mask, memory_budget
+    ):
+        r"""
+        Chooses ablations_per_eval from the given memory budget by evaluating the
+        forward function on the inputs repeated for increasing numbers of
+        ablations, see `_tune_batch_size`. The number of features of each input
+        bounds the useful number of ablations per evaluation.
+        """
+        num_features = max(
+            int(mask.max() - mask.min()) + 1
+            if feature_mask is not None
+            else input[0].numel()
+            for input, mask in zip(
+                inputs, feature_mask if feature_mask is not None else inputs
+            )
+            if input.numel() > 0
+        )
+
+        def probe(batch_size):
+            _run_forward(
+                self.forward_func,
+                tuple(torch.cat([input] * batch_size, dim=0) for input in inputs),
+                _expand_target(target, batch_size),
+                _expand_additional_forward_args(additional_forward_args, batch_size)
+                if additional_forward_args is not None
+                else None,
+            )
+
+        return _tune_batch_size(
+            self.forward_func,
+            (type(self).__name__,) + tuple(input.shape for input in inputs),
+            probe,
+            num_features,
+            memory_budget,
+            inputs[0].device,
+        )
+
+    def _ablation_generator(
+        self,
+        i,
+        inputs,
+        additional_args,
+        target,
+        baselines,
+        input_mask,
+        ablations_per_eval,
+        feature_range=None,
+        buffers=None,
+        **kwargs
+    ):
+        extra_args = _select_input_kwargs(kwargs, i)
         input_mask = input_mask[i] if input_mask is not None else None
         min_feature, num_features, input_mask = self._get_feature_range_and_mask(
             inputs[i], input_mask, **extra_args
         )
+        if feature_range is not None:
+            min_feature, num_features = feature_range
         num_examples = inputs[0].shape[0]
         ablations_per_eval = min(ablations_per_eval, num_features)
         baseline = baselines[i] if isinstance(baselines, tuple) else baselines
         if isinstance(baseline, torch.Tensor):
             baseline = baseline.reshape((1,) + baseline.shape)
 
-        # Repeat features and additional args for batch size.
-        all_features_repeated = [
-            torch.cat([inputs[j]] * ablations_per_eval, dim=0)
-            for j in range(len(inputs))
-        ]
+        # Repeat features and additional args for batch size. The ablated input
+        # is constructed from an expanded view of the original input instead.
+        all_features_repeated = self._repeat_inputs(
+            inputs, ablations_per_eval, buffers, skip_index=i
+        )
         additional_args_repeated = (
             _expand_additional_forward_args(additional_args, ablations_per_eval)
             if additional_args is not None
@@ -398,6 +883,8 @@ class FeatureAblation(PerturbationAttribution):
             if current_num_ablated_features != ablations_per_eval:
                 current_features = [
                     feature_repeated[0 : current_num_ablated_features * num_examples]
+                    if feature_repeated is not None
+                    else None
                     for feature_repeated in all_features_repeated
                 ]
                 current_additional_args = (
@@ -413,8 +900,6 @@ class FeatureAblation(PerturbationAttribution):
                 current_additional_args = additional_args_repeated
                 current_target = target_repeated
 
-            # Store existing tensor before modifying
-            original_tensor = current_features[i]
             # Construct ablated batch for features in range num_features_processed
             # to num_features_processed + current_num_ablated_features and return
             # mask with same size as ablated batch. ablated_features has dimension
@@ -422,8 +907,8 @@ class FeatureAblation(PerturbationAttribution):
             # Note that in the case of sparse tensors, the second dimension
             # may not necessarilly be num_examples and will match the first
             # dimension of this tensor.
-            current_reshaped = current_features[i].reshape(
-                (current_num_ablated_features, -1) + current_features[i].shape[1:]
+            current_reshaped = inputs[i].expand(
+                (current_num_ablated_features,) + inputs[i].shape
             )
 
             ablated_features, current_mask = self._construct_ablated_input(
@@ -444,10 +929,209 @@ class FeatureAblation(PerturbationAttribution):
             yield tuple(
                 current_features
             ), current_additional_args, current_target, current_mask
-            # Replace existing tensor at index i.
-            current_features[i] = original_tensor
             num_features_processed += current_num_ablated_features
 
+    def _sparse_ablation_generator(
+        self,
+        i,
+        inputs,
+        additional_args,
+        target,
+        baselines,
+        input_mask,
+        ablations_per_eval,
+        buffers=None,
+    ):
+        r"""
+        Sparse counterpart of `_ablation_generator`. The input positions of each
+        feature are obtained once by sorting the flattened feature mask. The
+        baselines are written in place into the positions of the ablated
+        features of a repeated copy of the input, which is restored after each
+        evaluation, so that the cost of each ablation is proportional to the
+        size of the ablated features rather than to the size of the input.
+
+        Besides the inputs, additional args and targets for the forward pass,
+        this yields `feature_rows` and `positions`, identifying the ablated
+        positions. If the feature mask is shared by all examples, `positions`
+        contains indices into the flattened features of an example and
+        `feature_rows` the corresponding ablated feature within the batch.
+        If the feature mask is provided per example, `positions` has an extra
+        first dimension of size 1 and contains indices into the flattened input
+        tensor, and `feature_rows` stacks the ablated feature within the batch
+        and the example of each position.
+        """
+        input = inputs[i]
+        input_mask = input_mask[i] if input_mask is not None else None
+        min_feature, num_features, input_mask = self._get_feature_range_and_mask(
+            input, input_mask
+        )
+        num_examples = input.shape[0]
+        num_input_features = input[0].numel()
+        ablations_per_eval = min(ablations_per_eval, num_features - min_feature)
+
+        per_example_mask = input_mask.dim() == input.dim() and input_mask.shape[0] != 1
+        flat_mask = input_mask.expand(
+            input.shape if per_example_mask else (1,) + input.shape[1:]
+        ).reshape(-1)
+        # Sorting the flattened mask groups the positions of each feature,
+        # positions of feature j are sorted_positions[offsets[j]:offsets[j + 1]]
+        # (shifted by min_feature).
+        sorted_features, sorted_positions = torch.sort(flat_mask)
+        offsets = [0] + torch.cumsum(
+            torch.bincount(
+                (flat_mask - min_feature).long(), minlength=num_features - min_feature
+            ),
+            dim=0,
+        ).tolist()
+
+        baseline = baselines[i] if isinstance(baselines, tuple) else baselines
+        if isinstance(baseline, torch.Tensor):
+            baseline = baseline.to(input.dtype).expand(input.shape)
+            baseline = baseline.reshape(1 if per_example_mask else num_examples, -1)
+
+        # Repeat features and additional args for batch size. The repeated
+        # input i is ablated in place, so it must not be an expanded view.
+        all_features_repeated = self._repeat_inputs(
+            inputs, ablations_per_eval, buffers, writable_index=i
+        )
+        additional_args_repeated = (
+            _expand_additional_forward_args(additional_args, ablations_per_eval)
+            if additional_args is not None
+            else None
+        )
+        target_repeated = _expand_target(target, ablations_per_eval)
+        original_values = input.reshape(1 if per_example_mask else num_examples, -1)
+
+        num_features_processed = min_feature
+        while num_features_processed < num_features:
+            current_num_ablated_features = min(
+                ablations_per_eval, num_features - num_features_processed
+            )
+            if current_num_ablated_features != ablations_per_eval:
+                current_features = [
+                    feature_repeated[0 : current_num_ablated_features * num_examples]
+                    for feature_repeated in all_features_repeated
+                ]
+                current_additional_args = (
+                    _expand_additional_forward_args(
+                        additional_args, current_num_ablated_features
+                    )
+                    if additional_args is not None
+                    else None
+                )
+                current_target = _expand_target(target, current_num_ablated_features)
+            else:
+                current_features = list(all_features_repeated)
+                current_additional_args = additional_args_repeated
+                current_target = target_repeated
+
+            start = offsets[num_features_processed - min_feature]
+            end = offsets[
+                num_features_processed + current_num_ablated_features - min_feature
+            ]
+            positions = sorted_positions[start:end]
+            feature_rows = sorted_features[start:end].long() - num_features_processed
+
+            if per_example_mask:
+                # ablated dim -> (#features in batch, #num_examples * #features)
+                ablated = current_features[i].view(current_num_ablated_features, -1)
+                example_rows = positions // num_input_features
+                ablated[feature_rows, positions] = (
+                    baseline[0, positions]
+                    if isinstance(baseline, torch.Tensor)
+                    else torch.tensor(baseline, dtype=input.dtype)
+                )
+                yield tuple(current_features), current_additional_args, (
+                    current_target
+                ), torch.stack([feature_rows, example_rows]), positions.view(1, -1)
+                ablated[feature_rows, positions] = original_values[0, positions]
+            else:
+                # ablated dim -> (#features in batch, #num_examples, #features)
+                ablated = current_features[i].view(
+                    current_num_ablated_features, num_examples, -1
+                )
+                ablated[feature_rows, :, positions] = (
+                    baseline[:, positions].t()
+                    if isinstance(baseline, torch.Tensor)
+                    else torch.tensor(baseline, dtype=input.dtype)
+                )
+                yield tuple(
+                    current_features
+                ), current_additional_args, current_target, feature_rows, positions
+                ablated[feature_rows, :, positions] = original_values[:, positions].t()
+            num_features_processed += current_num_ablated_features
+
+    @contextmanager
+    def _ablation_buffers_acquired(self):
+        r"""
+        Yields the buffers of repeated inputs for a single attribution call, see
+        `_repeat_inputs`. The idle buffers of this instance are handed over to
+        the call and returned to the instance on exit, so that serving many
+        calls with similar shapes only allocates the repeated batches once,
+        while concurrent calls on this instance each use their own buffers.
+        At most one buffer per input index is kept.
+        """
+        with _ablation_buffers_lock:
+            buffers = self._ablation_buffers
+            self._ablation_buffers = {}
+        try:
+            yield buffers
+        finally:
+            with _ablation_buffers_lock:
+                # keeps the larger buffer if a concurrent call returned a buffer
+                # for the same inputs in the meantime
+                for key, buffer in self._ablation_buffers.items():
+                    if key not in buffers or buffers[key].numel() < buffer.numel():
+                        buffers[key] = buffer
+                self._ablation_buffers = buffers
+
+    def _repeat_inputs(
+        self,
+        inputs,
+        ablations_per_eval,
+        buffers=None,
+        skip_index=None,
+        writable_index=None,
+    ):
+        r"""
+        Returns a list containing each input repeated ablations_per_eval times
+        along the first dimension, with None at `skip_index`.
+        Inputs containing a single example are returned as expanded views,
+        unless their index is `writable_index`. Otherwise, the repeated input
+        is copied into the buffer of its index in `buffers`, which are owned by
+        the current call, or a new dict if None. Buffers are flat and reused
+        for any repeated input of the same dtype and device with at most as
+        many elements, whose leading part is viewed in its shape. Larger
+        repeated inputs replace the buffer of their index.
+        """
+        if buffers is None:
+            buffers = {}
+        all_features_repeated = []
+        for j, input in enumerate(inputs):
+            if j == skip_index:
+                all_features_repeated.append(None)
+                continue
+            if input.shape[0] == 1 and j != writable_index:
+                all_features_repeated.append(
+                    input.expand((ablations_per_eval,) + input.shape[1:])
+                )
+                continue
+            shape = (ablations_per_eval,) + input.shape
+            numel = ablations_per_eval * input.numel()
+            buffer = buffers.get(j)
+            if (
+                buffer is None
+                or buffer.numel() < numel
+                or buffer.dtype != input.dtype
+                or buffer.device != input.device
+            ):
+                buffer = torch.empty(numel, dtype=input.dtype, device=input.device)
+                buffers[j] = buffer
+            repeated = buffer[:numel].view(shape)
+            repeated.copy_(input.expand(shape))
+            all_features_repeated.append(repeated.reshape((-1,) + input.shape[1:]))
+        return all_features_repeated
+
     def _construct_ablated_input(
         self, expanded_input, input_mask, baseline, start_feature, end_feature, **kwargs
     ):
@@ -462,19 +1146,37 @@ class FeatureAblation(PerturbationAttribution):
         be broadcastable to match `expanded_input`.
 
         This method returns the ablated input tensor, which has the same
-        dimensionality as `expanded_input` as well as the corresponding mask with
-        either the same dimensionality as `expanded_input` or second dimension
-        being 1. This mask contains 1s in locations which have been ablated (and
-        thus counted towards ablations for that feature) and 0s otherwise.
+        dimensionality as `expanded_input` as well as the corresponding boolean
+        mask with either the same dimensionality as `expanded_input` or second
+        dimension being 1. This mask is True in locations which have been ablated
+        (and thus counted towards ablations for that feature) and False otherwise.
         """
-        current_mask = torch.stack(
-            [input_mask == j for j in range(start_feature, end_feature)], dim=0
-        ).long()
-        ablated_tensor = (
-            expanded_input * (1 - current_mask).to(expanded_input.dtype)
-        ) + (baseline * current_mask.to(expanded_input.dtype))
+        current_mask = _feature_range_mask(input_mask, start_feature, end_feature)
+        ablated_tensor = _ablate_with_mask(expanded_input, current_mask, baseline)
         return ablated_tensor, current_mask
 
+    def _add_ablation_attributions(
+        self, total_attrib, eval_diff, current_mask, input_dim
+    ):
+        r"""
+        Adds the output differences `eval_diff` of a batch of ablations of an
+        input with `input_dim` dimensions to `total_attrib` in the locations
+        which have been ablated, as given by `current_mask` returned from
+        `_construct_ablated_input`, summing over the ablations of the batch.
+        """
+        total_attrib += (eval_diff * current_mask.to(total_attrib.dtype)).sum(
+            dim=-input_dim - 1
+        )
+
+    def _ablation_weights(self, input, **kwargs):
+        r"""
+        For ablations which may be overlapping, returns the number of ablations
+        containing each position of the given input, if it is known without
+        constructing the ablations. Otherwise, None is returned and the number
+        is accumulated from the masks of the constructed ablations.
+        """
+        return None
+
     def _get_feature_range_and_mask(self, input, input_mask, **kwargs):
         if input_mask is None:
             # Obtain feature mask for selected input tensor, matches size of
@@ -488,3 +1190,113 @@ class FeatureAblation(PerturbationAttribution):
             torch.max(input_mask).item() + 1,
             input_mask,
         )
+
+
+# Guards the handover of the idle ablation buffers of FeatureAblation instances.
+_ablation_buffers_lock = threading.Lock()
+
+# Ablator and arguments of the parallel ablation of a worker process. They are
+# only set in the workers by _init_ablation_worker, and reach them by forking
+# rather than pickling.
+_parallel_ablation_state: Optional[Tuple[FeatureAblation, Tuple, Dict]] = None
+
+
+def _init_ablation_worker(
+    num_threads: int, state: Tuple[FeatureAblation, Tuple, Dict]
+) -> None:
+    global _parallel_ablation_state
+    torch.set_num_threads(num_threads)
+    _parallel_ablation_state = state
+
+
+def _ablate_in_worker(task):
+    ablator, shared_args, kwargs = cast(
+        Tuple[FeatureAblation, Tuple, Dict], _parallel_ablation_state
+    )
+    i, feature_range, accumulate_weights = task
+    with torch.no_grad():
+        # each worker process reuses the buffers of its copy of the ablator
+        return ablator._ablate_feature_range(
+            i,
+            *shared_args,
+            accumulate_weights,
+            feature_range=feature_range,
+            buffers=ablator._ablation_buffers,
+            **kwargs
+        )
+
+
+def _parallel_ablate(ablator, num_workers, tasks, shared_args, kwargs):
+    r"""
+    Evaluates the ablation tasks, each given as (input index, feature range,
+    accumulate_weights), in a pool of num_workers forked processes, and returns
+    the partial attributions and weights of each task. Each worker uses an
+    equal share of the threads of the calling process. The ablator and the
+    arguments are handed to the workers of this pool only, so that concurrent
+    parallel ablations do not interfere.
+    """
+    num_threads = max(1, torch.get_num_threads() // num_workers)
+    context = torch.multiprocessing.get_context("fork")
+    with context.Pool(
+        num_workers,
+        initializer=_init_ablation_worker,
+        initargs=(num_threads, (ablator, shared_args, kwargs)),
+    ) as pool:
+        return pool.map(_ablate_in_worker, tasks, chunksize=1)
+
+
+def _target_shape(target):
+    r"""
+    Returns the additional leading dimension of evaluations and attributions for
+    multiple targets, or an empty shape for a single target.
+    """
+    return (len(target),) if isinstance(target, _MultiTarget) else ()
+
+
+def _select_input_kwargs(kwargs, i):
+    r"""
+    Selects the arguments for input i from the kwargs of child classes. For any
+    tuple argument in kwargs, index i of the tuple is chosen.
+    """
+    return {
+        key: value[i] if isinstance(value, tuple) else value
+        for key, value in kwargs.items()
+    }
+
+
+def _feature_range_mask(input_mask, start_feature, end_feature):
+    r"""
+    Compares `input_mask` with each feature id in the range `start_feature`
+    (inclusive) to `end_feature` (exclusive) in a single broadcasted comparison.
+    Returns a boolean tensor with dimensions
+    (`end_feature` - `start_feature`, *input_mask.shape).
+    """
+    feature_ids = torch.arange(
+        start_feature, end_feature, device=input_mask.device, dtype=input_mask.dtype
+    ).reshape((-1,) + (1,) * len(input_mask.shape))
+    return input_mask.unsqueeze(0) == feature_ids
+
+
+def _feature_ranges_mask(input_mask, ranges):
+    r"""
+    Returns a boolean mask with dimension (len(ranges), *input_mask.shape), which
+    is True where `input_mask` lies within the corresponding range of feature
+    ids, given as (start, end) pairs with exclusive end.
+    """
+    starts, ends = torch.tensor(ranges, device=input_mask.device).t()
+    starts = starts.reshape((-1,) + input_mask.dim() * (1,))
+    ends = ends.reshape((-1,) + input_mask.dim() * (1,))
+    return (input_mask.unsqueeze(0) >= starts) & (input_mask.unsqueeze(0) < ends)
+
+
+def _ablate_with_mask(expanded_input, mask, baseline):
+    r"""
+    Replaces the values of `expanded_input` by `baseline` in all locations where
+    the boolean `mask` is True. `mask` and `baseline` must be broadcastable to
+    `expanded_input`.
+    """
+    if not isinstance(baseline, torch.Tensor):
+        baseline = torch.tensor(
+            baseline, dtype=expanded_input.dtype, device=expanded_input.device
+        )
+    return torch.where(mask, baseline.to(expanded_input.dtype), expanded_input)
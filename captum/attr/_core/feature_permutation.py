@@ -4,7 +4,7 @@ from typing import Any, Callable, List, Optional, Tuple, Union
 import torch
 from torch import Tensor
 
-from .feature_ablation import FeatureAblation
+from .feature_ablation import FeatureAblation, _feature_range_mask
 from .._utils.typing import TensorOrTupleOfTensors
 
 
@@ -40,6 +40,9 @@ class FeaturePermutation(FeatureAblation):
         additional_forward_args: Any = None,
         feature_mask: Optional[TensorOrTupleOfTensors] = None,
         ablations_per_eval: int = 1,
+        targets: Optional[
+            List[Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]]
+        ] = None,
         **kwargs: Any
     ) -> TensorOrTupleOfTensors:
         return FeatureAblation.attribute(
@@ -50,6 +53,7 @@ class FeaturePermutation(FeatureAblation):
             additional_forward_args=additional_forward_args,
             feature_mask=feature_mask,
             ablations_per_eval=ablations_per_eval,
+            targets=targets,
         )
 
     def _construct_ablated_input(
@@ -65,9 +69,7 @@ class FeaturePermutation(FeatureAblation):
             "input_mask.shape[0] != 1: pass in one mask in order to permute"
             "the same features for each input"
         )
-        current_mask = torch.stack(
-            [input_mask == j for j in range(start_feature, end_feature)], dim=0
-        ).bool()
+        current_mask = _feature_range_mask(input_mask, start_feature, end_feature)
 
         output = torch.stack(
             [
@@ -5,10 +5,12 @@ import numpy as np
 
 from .._utils.attribution import GradientAttribution
 from .._utils.common import (
+    _autocast_forward_func,
     _format_input_baseline,
     _format_callable_baseline,
     _compute_conv_delta_and_format_attrs,
 )
+from .._utils.sampling import _Sampler
 
 from .noise_tunnel import NoiseTunnel
 
@@ -32,6 +34,9 @@ class GradientShap(GradientAttribution):
         target=None,
         additional_forward_args=None,
         return_convergence_delta=False,
+        autocast_dtype=None,
+        sampling="random",
+        generator=None,
     ):
         r"""
         Implements gradient SHAP based on the implementation from SHAP's primary
@@ -155,6 +160,30 @@ class GradientShap(GradientAttribution):
                         is set to True convergence delta will be returned in
                         a tuple following attributions.
                         Default: False
+            autocast_dtype (torch.dtype, optional): If provided, the forward and
+                        backward passes at the randomly scaled inputs are run in
+                        mixed precision under `torch.autocast` with the given
+                        dtype, i.e. torch.bfloat16 on CPU and torch.float16 or
+                        torch.bfloat16 on CUDA devices. Gradients and their
+                        average across samples, as well as the convergence
+                        delta, are computed in float32.
+                        Default: None
+            sampling (string, optional): How the baselines and the random
+                        points between each input and its baseline are
+                        sampled, as well as the noise if `stdevs` is nonzero:
+                        `random` draws independent samples, while `sobol`
+                        draws scrambled Sobol (quasi-random) points, which
+                        cover the distributions more evenly and reduce the
+                        variance of the attributions for a given `n_samples`,
+                        especially if it is a power of 2.
+                        Default: `random`
+            generator (torch.Generator, optional): If provided, the baselines,
+                        the random points and the noise are drawn from this
+                        generator directly on its device, which must be the
+                        device of the inputs, rather than from the global
+                        random state. Calls with generators seeded alike
+                        return the same attributions.
+                        Default: None
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
             - **attributions** (*tensor* or tuple of *tensors*):
@@ -215,6 +244,11 @@ class GradientShap(GradientAttribution):
             target=target,
             additional_forward_args=additional_forward_args,
             return_convergence_delta=return_convergence_delta,
+            autocast_dtype=autocast_dtype,
+            sampling=sampling,
+            coefficient_sampling=sampling,
+            generator=generator,
+            coefficient_generator=generator,
         )
 
         return attributions
@@ -240,16 +274,17 @@ class InputBaselineXGradient(GradientAttribution):
         target=None,
         additional_forward_args=None,
         return_convergence_delta=False,
+        autocast_dtype=None,
+        coefficient_sampling="random",
+        coefficient_generator=None,
     ):
         # Keeps track whether original input is a tuple or not before
         # converting it into a tuple.
         is_inputs_tuple = isinstance(inputs, tuple)
         inputs, baselines = _format_input_baseline(inputs, baselines)
 
-        rand_coefficient = torch.tensor(
-            np.random.uniform(0.0, 1.0, inputs[0].shape[0]),
-            device=inputs[0].device,
-            dtype=inputs[0].dtype,
+        rand_coefficient = self._rand_coefficient(
+            inputs, coefficient_sampling, coefficient_generator
         )
 
         input_baseline_scaled = tuple(
@@ -257,7 +292,12 @@ class InputBaselineXGradient(GradientAttribution):
             for input, baseline in zip(inputs, baselines)
         )
         grads = self.gradient_func(
-            self.forward_func, input_baseline_scaled, target, additional_forward_args
+            _autocast_forward_func(
+                self.forward_func, autocast_dtype, inputs[0].device.type
+            ),
+            input_baseline_scaled,
+            target,
+            additional_forward_args,
         )
 
         input_baseline_diffs = tuple(
@@ -282,6 +322,22 @@ class InputBaselineXGradient(GradientAttribution):
     def has_convergence_delta(self):
         return True
 
+    def _rand_coefficient(self, inputs, coefficient_sampling, coefficient_generator):
+        r"""
+        Draws the position of the scaled input between the baseline and the
+        input uniformly at random for each example.
+        """
+        if coefficient_sampling == "random" and coefficient_generator is None:
+            return torch.tensor(
+                np.random.uniform(0.0, 1.0, inputs[0].shape[0]),
+                device=inputs[0].device,
+                dtype=inputs[0].dtype,
+            )
+        sampler = _Sampler(coefficient_sampling, coefficient_generator)
+        return sampler.uniform(
+            "coefficient", inputs[0].shape[0], 1, inputs[0].device, inputs[0].dtype
+        ).view(-1)
+
     def _scale_input(self, input, baseline, rand_coefficient):
         # batch size
         bsz = input.shape[0]
@@ -11,6 +11,7 @@ from torch.utils.hooks import RemovableHandle
 from .._utils.attribution import GradientAttribution
 from .._utils.common import _format_input, _format_attributions
 from .._utils.gradient import apply_gradient_requirements, undo_gradient_requirements
+from .._utils.hooks import _attribution_call, _call_scoped
 from .._utils.typing import TensorOrTupleOfTensors
 
 
@@ -23,7 +24,6 @@ class ModifiedReluGradientAttribution(GradientAttribution):
         """
         GradientAttribution.__init__(self, model)
         self.model = model
-        self.backward_hooks: List[RemovableHandle] = []
         self.use_relu_grad_output = use_relu_grad_output
         assert isinstance(self.model, torch.nn.Module), (
             "Given model must be an instance of torch.nn.Module to properly hook"
@@ -59,22 +59,39 @@ class ModifiedReluGradientAttribution(GradientAttribution):
             "The hooks will be removed after the attribution is finished"
         )
 
-        self.model.apply(self._register_hooks)
-
-        gradients = self.gradient_func(
-            self.forward_func, inputs, target, additional_forward_args
-        )
-
-        # remove set hooks
-        self._remove_hooks()
+        # the hooks only act on the forward pass of this call, so that the
+        # model can be attributed concurrently from multiple threads
+        with _attribution_call():
+            hooks = self._register_hooks()
+            try:
+                gradients = self.gradient_func(
+                    self.forward_func, inputs, target, additional_forward_args
+                )
+            finally:
+                # remove set hooks
+                self._remove_hooks(hooks)
 
         undo_gradient_requirements(inputs, gradient_mask)
         return _format_attributions(is_inputs_tuple, gradients)
 
-    def _register_hooks(self, module: Module):
-        if isinstance(module, torch.nn.ReLU):
-            hook = module.register_backward_hook(self._backward_hook)
-            self.backward_hooks.append(hook)
+    def _register_hooks(self) -> List[RemovableHandle]:
+        return [
+            module.register_forward_hook(_call_scoped(self._forward_hook, module))
+            for module in self.model.modules()
+            if isinstance(module, torch.nn.ReLU)
+        ]
+
+    def _forward_hook(self, module: Module, inputs: Tuple[Tensor, ...], outputs):
+        # Attaches the backward hook to the gradient function of the output, as
+        # done by module backward hooks, but only for the graph of this call.
+        if isinstance(outputs, tuple):
+            outputs = outputs[0]
+        if outputs.grad_fn is not None:
+            outputs.grad_fn.register_hook(
+                lambda grad_input, grad_output: self._backward_hook(
+                    module, grad_input, grad_output
+                )
+            )
 
     def _backward_hook(
         self,
@@ -90,8 +107,8 @@ class ModifiedReluGradientAttribution(GradientAttribution):
         else:
             return F.relu(to_override_grads)
 
-    def _remove_hooks(self):
-        for hook in self.backward_hooks:
+    def _remove_hooks(self, hooks: List[RemovableHandle]):
+        for hook in hooks:
             hook.remove()
 
 
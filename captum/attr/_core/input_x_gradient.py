@@ -2,7 +2,7 @@
 from typing import Callable, List, Optional, Tuple, Union, Any
 from torch import Tensor
 
-from .._utils.common import _format_input, _format_attributions
+from .._utils.common import _format_input, _format_attributions, _MultiTarget
 from .._utils.attribution import GradientAttribution
 from .._utils.gradient import apply_gradient_requirements, undo_gradient_requirements
 from .._utils.typing import TensorOrTupleOfTensors
@@ -25,6 +25,9 @@ class InputXGradient(GradientAttribution):
             Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]
         ] = None,
         additional_forward_args: Any = None,
+        targets: Optional[
+            List[Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]]
+        ] = None,
     ) -> TensorOrTupleOfTensors:
         r""""
         A baseline approach for computing the attribution. It multiplies input with
@@ -78,6 +81,13 @@ class InputXGradient(GradientAttribution):
                         Note that attributions are not computed with respect
                         to these arguments.
                         Default: None
+            targets (list, optional): List of targets, each given in any of
+                        the forms described for `target`, for which gradients
+                        are computed from a single forward pass, with one
+                        batched backward pass over all targets. The
+                        attributions for all targets are stacked along a new
+                        first dimension. This cannot be combined with `target`.
+                        Default: None
 
         Returns:
                 *tensor* or tuple of *tensors* of **attributions**:
@@ -110,6 +120,9 @@ class InputXGradient(GradientAttribution):
         inputs = _format_input(inputs)
         gradient_mask = apply_gradient_requirements(inputs)
 
+        if targets is not None:
+            assert target is None, "Only one of target and targets can be provided."
+            target = _MultiTarget(targets)
         gradients = self.gradient_func(
             self.forward_func, inputs, target, additional_forward_args
         )
@@ -1,18 +1,25 @@
 #!/usr/bin/env python3
 import typing
-from typing import Callable, List, Optional, Tuple, Union, Any
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union, Any
 
 import torch
 from torch import Tensor
 
-from .._utils.approximation_methods import approximation_parameters
-from .._utils.batching import _batched_operator
+from .._utils.approximation_methods import (
+    NESTED_METHODS,
+    approximation_parameters,
+    refined_n_steps,
+)
+from .._utils.batching import _batch_attribution, _tune_batch_size
 from .._utils.common import (
     _validate_input,
     _format_additional_forward_args,
     _format_attributions,
     _format_input_baseline,
+    _refine_attributions_until_converged,
     _reshape_and_sum,
+    _select_targets,
+    _autocast_forward_func,
     _expand_additional_forward_args,
     _expand_target,
 )
@@ -70,6 +77,10 @@ class IntegratedGradients(GradientAttribution):
         n_steps: int = 50,
         method: str = "gausslegendre",
         internal_batch_size: Optional[int] = None,
+        convergence_tolerance: Optional[float] = None,
+        max_n_steps: int = 512,
+        memory_budget: Optional[int] = None,
+        autocast_dtype: Optional[torch.dtype] = None,
     ) -> TensorOrTupleOfTensors:
         ...
 
@@ -88,6 +99,10 @@ class IntegratedGradients(GradientAttribution):
         method: str = "gausslegendre",
         internal_batch_size: Optional[int] = None,
         return_convergence_delta: bool = False,
+        convergence_tolerance: Optional[float] = None,
+        max_n_steps: int = 512,
+        memory_budget: Optional[int] = None,
+        autocast_dtype: Optional[torch.dtype] = None,
     ) -> Union[TensorOrTupleOfTensors, Tuple[TensorOrTupleOfTensors, Tensor]]:
         ...
 
@@ -101,6 +116,10 @@ class IntegratedGradients(GradientAttribution):
         method="gausslegendre",
         internal_batch_size=None,
         return_convergence_delta=False,
+        convergence_tolerance=None,
+        max_n_steps=512,
+        memory_budget=None,
+        autocast_dtype=None,
     ):
         r"""
         This method attributes the output of the model with given target index
@@ -194,12 +213,19 @@ class IntegratedGradients(GradientAttribution):
                         method. Default: 50.
             method (string, optional): Method for approximating the integral,
                         one of `riemann_right`, `riemann_left`, `riemann_middle`,
-                        `riemann_trapezoid` or `gausslegendre`.
+                        `riemann_trapezoid`, `gausslegendre` or `clenshawcurtis`.
                         Default: `gausslegendre` if no method is provided.
             internal_batch_size (int, optional): Divides total #steps * #examples
-                        data points into chunks of size internal_batch_size,
+                        data points into chunks of size at most internal_batch_size,
                         which are computed (forward / backward passes)
-                        sequentially.
+                        sequentially. Each chunk contains
+                        internal_batch_size // #examples steps of the integral
+                        approximation, and the scaled inputs are only
+                        constructed for the steps of the current chunk, so that
+                        memory usage is bounded by internal_batch_size rather
+                        than n_steps. internal_batch_size must be at least
+                        equal to #examples, otherwise a single step is
+                        evaluated per chunk.
                         For DataParallel models, each batch is split among the
                         available devices, so evaluations on each available
                         device contain internal_batch_size / num_devices examples.
@@ -211,6 +237,50 @@ class IntegratedGradients(GradientAttribution):
                         is set to True convergence delta will be returned in
                         a tuple following attributions.
                         Default: False
+            convergence_tolerance (float, optional): If provided, `n_steps` is
+                        used as the initial number of steps and the approximation
+                        is refined, up to `max_n_steps`, only for the examples
+                        whose absolute convergence delta is larger than
+                        `convergence_tolerance`. The attributions of all other
+                        examples are kept from the coarser approximation.
+                        Each refinement doubles the number of steps, or the
+                        number of intervals for `riemann_trapezoid` and
+                        `clenshawcurtis`. For the nested approximation methods
+                        `riemann_left`, `riemann_right`, `riemann_trapezoid` and
+                        `clenshawcurtis`, the gradients evaluated for coarser
+                        approximations are reused and only the new steps are
+                        evaluated. If None, all examples are computed with
+                        exactly `n_steps` steps.
+                        Default: None
+            max_n_steps (int, optional): The maximum number of steps used for
+                        any example when `convergence_tolerance` is provided.
+                        The nested approximation methods stop at the last
+                        refinement not exceeding `max_n_steps` steps, while
+                        the steps of the other methods are clipped to it.
+                        It is ignored if `convergence_tolerance` is None.
+                        Default: 512
+            memory_budget (int, optional): If provided, `internal_batch_size` is
+                        ignored and instead chosen automatically as the largest
+                        multiple of #examples whose forward and backward passes
+                        stay within memory_budget bytes of peak memory. This is
+                        determined by probing gradient computations for
+                        increasing numbers of steps, and the choice is cached
+                        for subsequent calls with the same model and input
+                        shapes. Peak memory is measured exactly on CUDA devices
+                        and estimated otherwise from the size of the module
+                        outputs, the tensors saved for the backward pass and
+                        the gradients of the module outputs.
+                        Default: None
+            autocast_dtype (torch.dtype, optional): If provided, the forward and
+                        backward passes at the scaled inputs are run in mixed
+                        precision under `torch.autocast` with the given dtype,
+                        i.e. torch.bfloat16 on CPU and torch.float16 or
+                        torch.bfloat16 on CUDA devices. Gradients, their
+                        weighting by the step sizes and their accumulation
+                        across steps, as well as the convergence delta, are
+                        computed in float32, so that the returned delta shows
+                        the error due to the reduced precision.
+                        Default: None
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
             - **attributions** (*tensor* or tuple of *tensors*):
@@ -249,10 +319,278 @@ class IntegratedGradients(GradientAttribution):
 
         _validate_input(inputs, baselines, n_steps, method)
 
-        # retrieve step size and scaling factor for specified approximation method
-        step_sizes_func, alphas_func = approximation_parameters(method)
-        step_sizes, alphas = step_sizes_func(n_steps), alphas_func(n_steps)
+        if memory_budget is not None:
+            internal_batch_size = self._tune_internal_batch_size(
+                inputs,
+                baselines,
+                target,
+                additional_forward_args,
+                max_n_steps if convergence_tolerance is not None else n_steps,
+                memory_budget,
+            )
+
+        if convergence_tolerance is not None:
+            # gradients evaluated at each alpha are cached across refinements
+            # so that nested approximation methods only evaluate new alphas
+            grad_cache = (
+                _AlphaGradientCache(method, max_n_steps)
+                if method in NESTED_METHODS
+                else None
+            )
+            endpoint_outputs: Dict[int, Tensor] = {}
+
+            def attribute_fn(
+                inputs, baselines, target, additional_forward_args, n_steps, indices
+            ):
+                if grad_cache is not None:
+                    grad_cache.select(indices)
+                return self._attribute_in_batches(
+                    inputs,
+                    baselines,
+                    target,
+                    additional_forward_args,
+                    n_steps,
+                    method,
+                    internal_batch_size,
+                    grad_cache=grad_cache,
+                    # outputs evaluated in reduced precision are not reused for
+                    # the convergence delta
+                    endpoint_outputs=endpoint_outputs
+                    if indices is None and autocast_dtype is None
+                    else None,
+                    autocast_dtype=autocast_dtype,
+                )
+
+            attributions, delta = _refine_attributions_until_converged(
+                self,
+                attribute_fn,
+                inputs,
+                baselines,
+                target,
+                _format_additional_forward_args(additional_forward_args),
+                n_steps,
+                method,
+                max_n_steps,
+                convergence_tolerance,
+                endpoint_outputs=endpoint_outputs,
+            )
+            if return_convergence_delta:
+                return _format_attributions(is_inputs_tuple, attributions), delta
+            return _format_attributions(is_inputs_tuple, attributions)
+
+        # outputs at alpha 0 and 1 evaluated by the approximation method are
+        # reused for the convergence delta, unless they are in reduced precision
+        endpoint_outputs = {}
+        attributions = self._attribute_in_batches(
+            inputs,
+            baselines,
+            target,
+            additional_forward_args,
+            n_steps,
+            method,
+            internal_batch_size,
+            endpoint_outputs=endpoint_outputs
+            if return_convergence_delta and autocast_dtype is None
+            else None,
+            autocast_dtype=autocast_dtype,
+        )
+        if return_convergence_delta:
+            start_point, end_point = baselines, inputs
+            # computes approximation error based on the completeness axiom
+            delta = self.compute_convergence_delta(
+                attributions,
+                start_point,
+                end_point,
+                additional_forward_args=additional_forward_args,
+                target=target,
+                start_point_output=endpoint_outputs.get(0),
+                end_point_output=endpoint_outputs.get(1),
+            )
+            return _format_attributions(is_inputs_tuple, attributions), delta
+        return _format_attributions(is_inputs_tuple, attributions)
+
+    def _attribute_in_batches(
+        self,
+        inputs: Tuple[Tensor, ...],
+        baselines: Tuple[Union[Tensor, int, float], ...],
+        target: Optional[Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]],
+        additional_forward_args: Any,
+        n_steps: int,
+        method: str,
+        internal_batch_size: Optional[int] = None,
+        grad_cache: Optional["_AlphaGradientCache"] = None,
+        endpoint_outputs: Optional[Dict[int, Tensor]] = None,
+        autocast_dtype: Optional[torch.dtype] = None,
+    ) -> Tuple[Tensor, ...]:
+        r"""
+        Computes integrated gradients for `n_steps` steps, in chunks of steps if
+        `internal_batch_size` is provided. If `grad_cache` is provided, only
+        the alphas which it does not contain are evaluated, and the cached
+        gradients of the other alphas are added to the attributions.
+        """
+        grad_sums = grad_cache.advance(n_steps) if grad_cache is not None else None
+        if internal_batch_size is not None:
+            num_examples = inputs[0].shape[0]
+            attributions = _batch_attribution(
+                self,
+                num_examples,
+                internal_batch_size,
+                n_steps,
+                inputs=inputs,
+                baselines=baselines,
+                target=target,
+                additional_forward_args=additional_forward_args,
+                method=method,
+                grad_cache=grad_cache,
+                endpoint_outputs=endpoint_outputs,
+                autocast_dtype=autocast_dtype,
+            )
+        else:
+            attributions = self._attribute(
+                inputs=inputs,
+                baselines=baselines,
+                target=target,
+                additional_forward_args=additional_forward_args,
+                n_steps=n_steps,
+                method=method,
+                grad_cache=grad_cache,
+                endpoint_outputs=endpoint_outputs,
+                autocast_dtype=autocast_dtype,
+            )
+        if grad_sums is not None:
+            attributions = tuple(
+                attribution + grad_sum * (input - baseline)
+                for attribution, grad_sum, input, baseline in zip(
+                    attributions, grad_sums, inputs, baselines
+                )
+            )
+        return attributions
+
+    def _attribute(
+        self,
+        inputs: Tuple[Tensor, ...],
+        baselines: Tuple[Union[Tensor, int, float], ...],
+        target: Optional[
+            Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]
+        ] = None,
+        additional_forward_args: Any = None,
+        n_steps: int = 50,
+        method: str = "gausslegendre",
+        step_sizes_and_alphas: Optional[Tuple[List[float], List[float]]] = None,
+        grad_cache: Optional["_AlphaGradientCache"] = None,
+        endpoint_outputs: Optional[Dict[int, Tensor]] = None,
+        autocast_dtype: Optional[torch.dtype] = None,
+    ) -> Tuple[Tensor, ...]:
+        r"""
+        Computes integrated gradients for `n_steps` points of the integral
+        approximation in a single batch. If `step_sizes_and_alphas` is provided,
+        only the given subset of step sizes and alphas of the approximation
+        `method` is evaluated, which allows the integral to be computed in
+        chunks of steps and accumulated by the caller.
+        If `grad_cache` is provided, only the alphas which are not contained in
+        the cache are evaluated and attributed, and their gradients are added
+        to the cache.
+        If `endpoint_outputs` is provided, the outputs of the forward function
+        for the given `target` at alpha 0 and 1 are stored in it with keys 0
+        and 1 respectively, if these alphas are evaluated.
+        If `autocast_dtype` is provided, gradients are computed in mixed
+        precision, and returned in float32.
+        """
+        if step_sizes_and_alphas is None:
+            # retrieve step size and scaling factor for specified
+            # approximation method
+            step_sizes_func, alphas_func = approximation_parameters(method)
+            step_sizes, alphas = step_sizes_func(n_steps), alphas_func(n_steps)
+        else:
+            step_sizes, alphas = step_sizes_and_alphas
+
+        if grad_cache is not None:
+            new_steps = [
+                (step_size, alpha)
+                for step_size, alpha in zip(step_sizes, alphas)
+                if alpha not in grad_cache
+            ]
+            if len(new_steps) == 0:
+                return tuple(torch.zeros_like(input) for input in inputs)
+            step_sizes, alphas = (list(values) for values in zip(*new_steps))
+            n_steps = len(alphas)
+
+        grads = self._compute_scaled_gradients(
+            inputs,
+            baselines,
+            target,
+            additional_forward_args,
+            alphas,
+            endpoint_outputs,
+            autocast_dtype,
+        )
+        if grad_cache is not None:
+            grad_cache.update(alphas, grads)
+
+        # flattening grads so that we can multilpy it with step-size
+        # calling contiguous to avoid `memory whole` problems
+        scaled_grads = [
+            grad.contiguous().view(n_steps, -1)
+            * torch.tensor(step_sizes).view(n_steps, 1).to(grad.device)
+            for grad in grads
+        ]
+
+        # aggregates across all steps for each tensor in the input tuple
+        # total_grads has the same dimensionality as inputs
+        total_grads = [
+            _reshape_and_sum(
+                scaled_grad, n_steps, grad.shape[0] // n_steps, grad.shape[1:]
+            )
+            for (scaled_grad, grad) in zip(scaled_grads, grads)
+        ]
+
+        # computes attribution for each tensor in input tuple
+        # attributions has the same dimensionality as inputs
+        attributions = tuple(
+            total_grad * (input - baseline)
+            for total_grad, input, baseline in zip(total_grads, inputs, baselines)
+        )
+        return attributions
+
+    def _tune_internal_batch_size(
+        self,
+        inputs: Tuple[Tensor, ...],
+        baselines: Tuple[Union[Tensor, int, float], ...],
+        target: Optional[Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]],
+        additional_forward_args: Any,
+        n_steps: int,
+        memory_budget: int,
+    ) -> int:
+        num_examples = inputs[0].shape[0]
+
+        # evaluates gradients for the given number of steps, all of which are
+        # placed at the midpoint since only the memory footprint matters
+        def probe(step_count: int) -> None:
+            self._compute_scaled_gradients(
+                inputs, baselines, target, additional_forward_args, [0.5] * step_count,
+            )
+
+        step_count = _tune_batch_size(
+            self.forward_func,
+            (type(self).__name__,) + tuple(input.shape for input in inputs),
+            probe,
+            n_steps,
+            memory_budget,
+            inputs[0].device,
+        )
+        return step_count * num_examples
 
+    def _compute_scaled_gradients(
+        self,
+        inputs: Tuple[Tensor, ...],
+        baselines: Tuple[Union[Tensor, int, float], ...],
+        target: Optional[Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]],
+        additional_forward_args: Any,
+        alphas: List[float],
+        endpoint_outputs: Optional[Dict[int, Tensor]] = None,
+        autocast_dtype: Optional[torch.dtype] = None,
+    ) -> Tuple[Tensor, ...]:
+        n_steps = len(alphas)
         # scale features and compute gradients. (batch size is abbreviated as bsz)
         # scaled_features' dim -> (bsz * #steps x inputs[0].shape[1:], ...)
         scaled_features_tpl = tuple(
@@ -277,51 +615,170 @@ class IntegratedGradients(GradientAttribution):
         )
         expanded_target = _expand_target(target, n_steps)
 
+        forward_fn = _autocast_forward_func(
+            self.forward_func, autocast_dtype, inputs[0].device.type
+        )
+        if endpoint_outputs is not None:
+            forward_fn = self._endpoint_capturing_forward_func(
+                forward_fn, inputs[0].shape[0], target, alphas, endpoint_outputs
+            )
+
         # grads: dim -> (bsz * #steps x inputs[0].shape[1:], ...)
-        grads = _batched_operator(
-            self.gradient_func,
-            scaled_features_tpl,
-            input_additional_args,
-            internal_batch_size=internal_batch_size,
-            forward_fn=self.forward_func,
+        grads = self.gradient_func(
+            forward_fn=forward_fn,
+            inputs=scaled_features_tpl,
             target_ind=expanded_target,
+            additional_forward_args=input_additional_args,
         )
+        return grads
 
-        # flattening grads so that we can multilpy it with step-size
-        # calling contiguous to avoid `memory whole` problems
-        scaled_grads = [
-            grad.contiguous().view(n_steps, -1)
-            * torch.tensor(step_sizes).view(n_steps, 1).to(grad.device)
-            for grad in grads
+    def _endpoint_capturing_forward_func(
+        self,
+        forward_func: Callable,
+        num_examples: int,
+        target: Optional[Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]],
+        alphas: List[float],
+        endpoint_outputs: Dict[int, Tensor],
+    ) -> Callable:
+        r"""
+        Wraps `forward_func` such that the outputs of the steps at
+        alpha 0 and 1, for the given `target`, are stored in `endpoint_outputs`.
+        """
+        endpoint_steps = [
+            (step, round(alpha))
+            for step, alpha in enumerate(alphas)
+            if abs(alpha - round(alpha)) < 1e-10 and round(alpha) in (0, 1)
         ]
 
-        # aggregates across all steps for each tensor in the input tuple
-        # total_grads has the same dimensionality as inputs
-        total_grads = [
-            _reshape_and_sum(
-                scaled_grad, n_steps, grad.shape[0] // n_steps, grad.shape[1:]
-            )
-            for (scaled_grad, grad) in zip(scaled_grads, grads)
-        ]
-
-        # computes attribution for each tensor in input tuple
-        # attributions has the same dimensionality as inputs
-        attributions = tuple(
-            total_grad * (input - baseline)
-            for total_grad, input, baseline in zip(total_grads, inputs, baselines)
-        )
-        if return_convergence_delta:
-            start_point, end_point = baselines, inputs
-            # computes approximation error based on the completeness axiom
-            delta = self.compute_convergence_delta(
-                attributions,
-                start_point,
-                end_point,
-                additional_forward_args=additional_forward_args,
-                target=target,
-            )
-            return _format_attributions(is_inputs_tuple, attributions), delta
-        return _format_attributions(is_inputs_tuple, attributions)
+        def forward_fn(*args, **kwargs):
+            output = forward_func(*args, **kwargs)
+            if (
+                isinstance(output, Tensor)
+                and output.dim() > 0
+                and output.shape[0] == len(alphas) * num_examples
+            ):
+                for step, alpha in endpoint_steps:
+                    endpoint_outputs[alpha] = _select_targets(
+                        output[step * num_examples : (step + 1) * num_examples], target,
+                    ).detach()
+            return output
+
+        return forward_fn
 
     def has_convergence_delta(self) -> bool:
         return True
+
+
+class _AlphaGradientCache:
+    r"""
+    Accumulates the gradients of the scaled inputs evaluated at the alphas of
+    a nested integral approximation (see `NESTED_METHODS`) for a set of
+    examples, such that refining the approximation only requires evaluating
+    the gradients at the new alphas.
+
+    The refinement levels of the approximation, i.e. its numbers of steps, are
+    known in advance. Instead of the gradients of each alpha, the cache holds
+    the sum of the evaluated gradients weighted by the step sizes of each
+    refinement level which has not been reached yet, so that its memory only
+    grows with the number of remaining levels rather than the number of steps.
+    """
+
+    def __init__(self, method: str, max_n_steps: int) -> None:
+        self.method = method
+        self.max_n_steps = max_n_steps
+        self.alphas: Set[float] = set()
+        # maps each remaining refinement level to its step size per alpha and
+        # the weighted sums of the gradients of the alphas evaluated so far
+        self.step_sizes: Dict[int, Dict[float, float]] = {}
+        self.grad_sums: Dict[int, Optional[List[Tensor]]] = {}
+        self.indices: Optional[Tensor] = None
+
+    @staticmethod
+    def _key(alpha: float) -> float:
+        # alphas of different refinement levels can differ in the last digits
+        return round(float(alpha), 10)
+
+    def __contains__(self, alpha: float) -> bool:
+        return self._key(alpha) in self.alphas
+
+    def advance(self, n_steps: int) -> Optional[List[Tensor]]:
+        r"""
+        Starts the refinement level with `n_steps` steps, and returns the sums
+        of the gradients evaluated so far weighted by the step sizes of this
+        level, or None if no gradients have been evaluated yet.
+        """
+        grad_sums = self.grad_sums.get(n_steps)
+        step_sizes_func, alphas_func = approximation_parameters(self.method)
+        levels = []
+        level = refined_n_steps(self.method, n_steps)
+        while level <= self.max_n_steps:
+            levels.append(level)
+            level = refined_n_steps(self.method, level)
+        self.step_sizes = {
+            level: self.step_sizes.get(level)
+            or {
+                self._key(alpha): step_size
+                for alpha, step_size in zip(alphas_func(level), step_sizes_func(level))
+            }
+            for level in levels
+        }
+        self.grad_sums = {level: self.grad_sums.get(level) for level in levels}
+        return grad_sums
+
+    def select(self, indices: Optional[Tensor]) -> None:
+        r"""
+        Restricts the cached gradients to the examples at `indices`, which are
+        positions in the original batch. `indices` must be a sorted subset of the
+        currently cached examples. If `indices` is None, all cached examples are
+        kept.
+        """
+        if indices is None or len(self.alphas) == 0:
+            self.indices = indices
+            return
+        if self.indices is None:
+            positions = indices
+        else:
+            lookup = torch.full(
+                (int(self.indices.max().item()) + 1,),
+                -1,
+                dtype=torch.long,
+                device=self.indices.device,
+            )
+            lookup[self.indices] = torch.arange(
+                len(self.indices), device=self.indices.device
+            )
+            positions = lookup[indices.to(lookup.device)]
+        self.grad_sums = {
+            level: None
+            if grad_sums is None
+            else [grad_sum[positions.to(grad_sum.device)] for grad_sum in grad_sums]
+            for level, grad_sums in self.grad_sums.items()
+        }
+        self.indices = indices
+
+    def update(self, alphas: List[float], grads: Tuple[Tensor, ...]) -> None:
+        r"""
+        Adds the gradients `grads`, which are evaluated for all `alphas` and
+        concatenated along the first dimension in the order of `alphas`, to the
+        weighted sums of the remaining refinement levels.
+        """
+        n_steps = len(alphas)
+        for level, step_sizes in self.step_sizes.items():
+            weights = [step_sizes[self._key(alpha)] for alpha in alphas]
+            weighted_grads = [
+                _reshape_and_sum(
+                    grad.contiguous().view(n_steps, -1)
+                    * torch.tensor(weights).view(n_steps, 1).to(grad.device),
+                    n_steps,
+                    grad.shape[0] // n_steps,
+                    grad.shape[1:],
+                )
+                for grad in grads
+            ]
+            grad_sums = self.grad_sums[level]
+            if grad_sums is None:
+                self.grad_sums[level] = weighted_grads
+            else:
+                for grad_sum, weighted_grad in zip(grad_sums, weighted_grads):
+                    grad_sum += weighted_grad
+        self.alphas.update(self._key(alpha) for alpha in alphas)
@@ -199,6 +199,7 @@ class LayerGradCam(LayerAttribution, GradientAttribution):
             additional_forward_args,
             device_ids=self.device_ids,
             attribute_to_layer_input=attribute_to_layer_input,
+            check_batch_independence=self.check_batch_independence,
         )
         undo_gradient_requirements(inputs, gradient_mask)
 
@@ -6,6 +6,7 @@ from torch import Tensor
 from torch.nn import Module
 
 from ..._utils.approximation_methods import approximation_parameters
+from ..._utils.activation_cache import ActivationCache
 from ..._utils.attribution import LayerAttribution, GradientAttribution
 from ..._utils.batching import _batched_operator
 from ..._utils.common import (
@@ -26,6 +27,7 @@ class InternalInfluence(LayerAttribution, GradientAttribution):
         forward_func: Callable,
         layer: Module,
         device_ids: Optional[List[int]] = None,
+        activation_cache: Optional[ActivationCache] = None,
     ) -> None:
         r"""
         Args:
@@ -43,8 +45,16 @@ class InternalInfluence(LayerAttribution, GradientAttribution):
                           intermediate outputs from batched results across devices.
                           If forward_func is given as the DataParallel model itself,
                           then it is not necessary to provide this argument.
+            activation_cache (ActivationCache, optional): Cache of layer
+                          evaluations, which may be shared with other attribution
+                          objects. If provided, the forward pass is run only once
+                          for repeated calls on the same inputs and additional
+                          forward arguments, e.g. to attribute different targets,
+                          as long as its results are cached.
+                          Default: None
         """
         LayerAttribution.__init__(self, forward_func, layer, device_ids)
+        self.activation_cache = activation_cache
         GradientAttribution.__init__(self, forward_func)
 
     def attribute(
@@ -157,7 +167,7 @@ class InternalInfluence(LayerAttribution, GradientAttribution):
                             method. Default: 50.
                 method (string, optional): Method for approximating the integral,
                             one of `riemann_right`, `riemann_left`, `riemann_middle`,
-                            `riemann_trapezoid` or `gausslegendre`.
+                            `riemann_trapezoid`, `gausslegendre` or `clenshawcurtis`.
                             Default: `gausslegendre` if no method is provided.
                 internal_batch_size (int, optional): Divides total #steps * #examples
                             data points into chunks of size internal_batch_size,
@@ -215,27 +225,47 @@ class InternalInfluence(LayerAttribution, GradientAttribution):
         step_sizes_func, alphas_func = approximation_parameters(method)
         step_sizes, alphas = step_sizes_func(n_steps), alphas_func(n_steps)
 
-        # Compute scaled inputs from baseline to final input.
-        scaled_features_tpl = tuple(
-            torch.cat(
-                [baseline + alpha * (input - baseline) for alpha in alphas], dim=0
-            ).requires_grad_()
-            for input, baseline in zip(inputs, baselines)
-        )
-
         additional_forward_args = _format_additional_forward_args(
             additional_forward_args
         )
-        # apply number of steps to additional forward args
-        # currently, number of steps is applied only to additional forward arguments
-        # that are nd-tensors. It is assumed that the first dimension is
-        # the number of batches.
-        # dim -> (bsz * #steps x additional_forward_args[0].shape[1:], ...)
-        input_additional_args = (
-            _expand_additional_forward_args(additional_forward_args, n_steps)
-            if additional_forward_args is not None
-            else None
-        )
+
+        def scale_inputs():
+            # Compute scaled inputs from baseline to final input.
+            scaled_features_tpl = tuple(
+                torch.cat(
+                    [baseline + alpha * (input - baseline) for alpha in alphas], dim=0
+                ).requires_grad_()
+                for input, baseline in zip(inputs, baselines)
+            )
+            # apply number of steps to additional forward args
+            # currently, number of steps is applied only to additional forward
+            # arguments that are nd-tensors. It is assumed that the first
+            # dimension is the number of batches.
+            # dim -> (bsz * #steps x additional_forward_args[0].shape[1:], ...)
+            input_additional_args = (
+                _expand_additional_forward_args(additional_forward_args, n_steps)
+                if additional_forward_args is not None
+                else None
+            )
+            return scaled_features_tpl, input_additional_args
+
+        if self.activation_cache is None:
+            scaled_inputs = scale_inputs()
+        else:
+            # the scaled inputs are cached as well, such that the layer
+            # evaluations at them are found in the cache by later calls
+            scaled_inputs = self.activation_cache._get_or_compute(
+                (
+                    "internal_influence_inputs",
+                    inputs,
+                    baselines,
+                    additional_forward_args,
+                    n_steps,
+                    method,
+                ),
+                scale_inputs,
+            )
+        scaled_features_tpl, input_additional_args = scaled_inputs
         expanded_target = _expand_target(target, n_steps)
 
         # Returns gradient of output with respect to hidden layer.
@@ -249,6 +279,8 @@ class InternalInfluence(LayerAttribution, GradientAttribution):
             target_ind=expanded_target,
             device_ids=self.device_ids,
             attribute_to_layer_input=attribute_to_layer_input,
+            check_batch_independence=self.check_batch_independence,
+            activation_cache=self.activation_cache,
         )
         # flattening grads so that we can multiply it with step-size
         # calling contiguous to avoid `memory whole` problems
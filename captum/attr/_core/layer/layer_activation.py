@@ -5,6 +5,7 @@ import torch
 from torch import Tensor
 from torch.nn import Module
 
+from ..._utils.activation_cache import ActivationCache
 from ..._utils.attribution import LayerAttribution
 from ..._utils.common import _format_attributions
 from ..._utils.gradient import _forward_layer_eval
@@ -16,6 +17,7 @@ class LayerActivation(LayerAttribution):
         forward_func: Callable,
         layer: Module,
         device_ids: Optional[List[int]] = None,
+        activation_cache: Optional[ActivationCache] = None,
     ) -> None:
         r"""
         Args:
@@ -33,8 +35,16 @@ class LayerActivation(LayerAttribution):
                           intermediate outputs from batched results across devices.
                           If forward_func is given as the DataParallel model itself,
                           then it is not necessary to provide this argument.
+            activation_cache (ActivationCache, optional): Cache of layer
+                          evaluations, which may be shared with other attribution
+                          objects. If provided, the forward pass is run only once
+                          for repeated calls on the same inputs and additional
+                          forward arguments, e.g. by other attribution objects
+                          for the same layer, as long as its results are cached.
+                          Default: None
         """
         LayerAttribution.__init__(self, forward_func, layer, device_ids)
+        self.activation_cache = activation_cache
 
     def attribute(
         self,
@@ -114,5 +124,6 @@ class LayerActivation(LayerAttribution):
                 additional_forward_args,
                 device_ids=self.device_ids,
                 attribute_to_layer_input=attribute_to_layer_input,
+                activation_cache=self.activation_cache,
             )
         return _format_attributions(is_layer_tuple, layer_eval)
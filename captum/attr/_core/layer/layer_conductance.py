@@ -2,8 +2,9 @@
 import torch
 from ..._utils.approximation_methods import approximation_parameters
 from ..._utils.attribution import LayerAttribution, GradientAttribution
-from ..._utils.batching import _batched_operator
+from ..._utils.batching import _batched_operator, _tune_batch_size
 from ..._utils.common import (
+    _autocast_forward_func,
     _reshape_and_sum,
     _format_input_baseline,
     _format_additional_forward_args,
@@ -51,6 +52,8 @@ class LayerConductance(LayerAttribution, GradientAttribution):
         internal_batch_size=None,
         return_convergence_delta=False,
         attribute_to_layer_input=False,
+        memory_budget=None,
+        autocast_dtype=None,
     ):
         r"""
             Computes conductance with respect to the given layer. The
@@ -149,7 +152,7 @@ class LayerConductance(LayerAttribution, GradientAttribution):
                             method. Default: 50.
                 method (string, optional): Method for approximating the integral,
                             one of `riemann_right`, `riemann_left`, `riemann_middle`,
-                            `riemann_trapezoid` or `gausslegendre`.
+                            `riemann_trapezoid`, `gausslegendre` or `clenshawcurtis`.
                             Default: `gausslegendre` if no method is provided.
                 internal_batch_size (int, optional): Divides total #steps * #examples
                             data points into chunks of size internal_batch_size,
@@ -177,6 +180,21 @@ class LayerConductance(LayerAttribution, GradientAttribution):
                             attribute to the input or output, is a single tensor.
                             Support for multiple tensors will be added later.
                             Default: False
+                memory_budget (int, optional): If provided, internal_batch_size
+                            is ignored and instead chosen automatically as the
+                            largest multiple of #examples whose forward and
+                            backward passes stay within memory_budget bytes of
+                            peak memory. The choice is cached for subsequent
+                            calls with the same model, layer and input shapes.
+                            Default: None
+                autocast_dtype (torch.dtype, optional): If provided, the forward
+                            and backward passes at the scaled inputs are run in
+                            mixed precision under `torch.autocast` with the given
+                            dtype, i.e. torch.bfloat16 on CPU and torch.float16 or
+                            torch.bfloat16 on CUDA devices. Layer gradients and
+                            evaluations are accumulated across steps in float32,
+                            and the convergence delta is computed in float32.
+                            Default: None
 
             Returns:
                 **attributions** or 2-element tuple of **attributions**, **delta**:
@@ -220,6 +238,19 @@ class LayerConductance(LayerAttribution, GradientAttribution):
 
         num_examples = inputs[0].shape[0]
 
+        additional_forward_args = _format_additional_forward_args(
+            additional_forward_args
+        )
+        if memory_budget is not None:
+            internal_batch_size = num_examples * self._tune_step_count(
+                inputs,
+                target,
+                additional_forward_args,
+                n_steps + 1,
+                attribute_to_layer_input,
+                memory_budget,
+            )
+
         # Retrieve scaling factors for specified approximation method
         step_sizes_func, alphas_func = approximation_parameters(method)
         alphas = alphas_func(n_steps + 1)
@@ -232,9 +263,6 @@ class LayerConductance(LayerAttribution, GradientAttribution):
             for input, baseline in zip(inputs, baselines)
         )
 
-        additional_forward_args = _format_additional_forward_args(
-            additional_forward_args
-        )
         # apply number of steps to additional forward args
         # currently, number of steps is applied only to additional forward arguments
         # that are nd-tensors. It is assumed that the first dimension is
@@ -254,12 +282,22 @@ class LayerConductance(LayerAttribution, GradientAttribution):
             scaled_features_tpl,
             input_additional_args,
             internal_batch_size=internal_batch_size,
-            forward_fn=self.forward_func,
+            forward_fn=_autocast_forward_func(
+                self.forward_func, autocast_dtype, inputs[0].device.type
+            ),
             layer=self.layer,
             target_ind=expanded_target,
             device_ids=self.device_ids,
             attribute_to_layer_input=attribute_to_layer_input,
+            check_batch_independence=self.check_batch_independence,
         )
+        if autocast_dtype is not None:
+            # accumulates reduced precision layer gradients and evaluations in
+            # float32
+            layer_gradients = tuple(
+                layer_gradient.float() for layer_gradient in layer_gradients
+            )
+            layer_evals = tuple(layer_eval.float() for layer_eval in layer_evals)
 
         # Compute differences between consecutive evaluations of layer_eval.
         # This approximates the total input gradient of each step multiplied
@@ -295,3 +333,42 @@ class LayerConductance(LayerAttribution, GradientAttribution):
             )
             return _format_attributions(is_layer_tuple, attributions), delta
         return _format_attributions(is_layer_tuple, attributions)
+
+    def _tune_step_count(
+        self,
+        inputs,
+        target,
+        additional_forward_args,
+        n_steps,
+        attribute_to_layer_input,
+        memory_budget,
+    ):
+        # evaluates layer gradients for the inputs repeated for the given number
+        # of steps, since only the memory footprint of each chunk matters
+        def probe(step_count):
+            compute_layer_gradients_and_eval(
+                forward_fn=self.forward_func,
+                layer=self.layer,
+                inputs=tuple(
+                    torch.cat([input] * step_count, dim=0).requires_grad_()
+                    for input in inputs
+                ),
+                target_ind=_expand_target(target, step_count),
+                additional_forward_args=_expand_additional_forward_args(
+                    additional_forward_args, step_count
+                )
+                if additional_forward_args is not None
+                else None,
+                device_ids=self.device_ids,
+                attribute_to_layer_input=attribute_to_layer_input,
+            )
+
+        return _tune_batch_size(
+            self.forward_func,
+            (type(self).__name__, self.layer, attribute_to_layer_input)
+            + tuple(input.shape for input in inputs),
+            probe,
+            n_steps,
+            memory_budget,
+            inputs[0].device,
+        )
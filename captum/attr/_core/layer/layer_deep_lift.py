@@ -228,10 +228,6 @@ class LayerDeepLift(LayerAttribution, DeepLift):
 
         baselines = _tensorize_baseline(inputs, baselines)
 
-        main_model_pre_hook = self._pre_hook_main_model()
-
-        self.model.apply(self._register_hooks)
-
         additional_forward_args = _format_additional_forward_args(
             additional_forward_args
         )
@@ -241,11 +237,13 @@ class LayerDeepLift(LayerAttribution, DeepLift):
         expanded_target = _expand_target(
             target, 2, expansion_type=ExpansionTypes.repeat
         )
+        forward_outputs = []
         wrapped_forward_func = self._construct_forward_func(
             self.model,
             (inputs, baselines),
             expanded_target,
             input_base_additional_args,
+            forward_outputs,
         )
 
         def chunk_output_fn(out):
@@ -253,13 +251,15 @@ class LayerDeepLift(LayerAttribution, DeepLift):
                 return out.chunk(2)
             return tuple(out_sub.chunk(2) for out_sub in out)
 
-        (gradients, attrs, is_layer_tuple) = compute_layer_gradients_and_eval(
-            wrapped_forward_func,
-            self.layer,
-            inputs,
-            attribute_to_layer_input=attribute_to_layer_input,
-            output_fn=lambda out: chunk_output_fn(out),
-        )
+        with self._hooks_enabled(wrapped_forward_func):
+            (gradients, attrs, is_layer_tuple) = compute_layer_gradients_and_eval(
+                wrapped_forward_func,
+                self.layer,
+                inputs,
+                attribute_to_layer_input=attribute_to_layer_input,
+                check_batch_independence=self.check_batch_independence,
+                output_fn=lambda out: chunk_output_fn(out),
+            )
 
         attr_inputs = tuple(map(lambda attr: attr[0], attrs))
         attr_baselines = tuple(map(lambda attr: attr[1], attrs))
@@ -276,11 +276,10 @@ class LayerDeepLift(LayerAttribution, DeepLift):
             attributions = _call_custom_attribution_func(
                 custom_attribution_func, gradients, attr_inputs, attr_baselines
             )
-        # remove hooks from all activations
-        main_model_pre_hook.remove()
-        self._remove_hooks()
-
         undo_gradient_requirements(inputs, gradient_mask)
+        start_point_output, end_point_output = self._endpoint_outputs(
+            forward_outputs, inputs[0].shape[0]
+        )
         return _compute_conv_delta_and_format_attrs(
             self,
             return_convergence_delta,
@@ -290,6 +289,8 @@ class LayerDeepLift(LayerAttribution, DeepLift):
             additional_forward_args,
             target,
             is_layer_tuple,
+            start_point_output,
+            end_point_output,
         )
 
 
@@ -317,6 +318,7 @@ class LayerDeepLiftShap(LayerDeepLift, DeepLiftShap):
         return_convergence_delta=False,
         attribute_to_layer_input=False,
         custom_attribution_func=None,
+        internal_batch_size=None,
     ):
         r"""
         Extends LayerDeepLift and DeepLiftShap algorithms and approximates SHAP
@@ -439,6 +441,15 @@ class LayerDeepLiftShap(LayerDeepLift, DeepLiftShap):
                         attribution tensors that have the same length as the
                         `inputs`.
                         Default: None
+            internal_batch_size (int, optional): Maximum number of input and
+                        baseline pairs evaluated in a single forward and
+                        backward pass. If provided, the baselines are evaluated
+                        in chunks, and the mean of the attributions across
+                        baselines is accumulated incrementally, see
+                        `DeepLiftShap.attribute`.
+                        If internal_batch_size is None, all pairs are evaluated
+                        at once.
+                        Default: None
 
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
@@ -493,41 +504,28 @@ class LayerDeepLiftShap(LayerDeepLift, DeepLiftShap):
             " approach can be used instead.".format(baselines[0])
         )
 
-        # batch sizes
-        inp_bsz = inputs[0].shape[0]
-        base_bsz = baselines[0].shape[0]
-
-        (
-            exp_inp,
-            exp_base,
-            exp_target,
-            exp_addit_args,
-        ) = DeepLiftShap._expand_inputs_baselines_targets(
-            self, baselines, inputs, target, additional_forward_args
-        )
-        attributions = LayerDeepLift.attribute(
+        def attribute_pairs(exp_inp, exp_base, exp_target, exp_addit_args):
+            return LayerDeepLift.attribute(
+                self,
+                exp_inp,
+                exp_base,
+                target=exp_target,
+                additional_forward_args=exp_addit_args,
+                return_convergence_delta=return_convergence_delta,
+                attribute_to_layer_input=attribute_to_layer_input,
+                custom_attribution_func=custom_attribution_func,
+            )
+
+        attributions, delta = DeepLiftShap._attribute_in_baseline_chunks(
             self,
-            exp_inp,
-            exp_base,
-            target=exp_target,
-            additional_forward_args=exp_addit_args,
-            return_convergence_delta=return_convergence_delta,
-            attribute_to_layer_input=attribute_to_layer_input,
-            custom_attribution_func=custom_attribution_func,
+            attribute_pairs,
+            inputs,
+            baselines,
+            target,
+            additional_forward_args,
+            return_convergence_delta,
+            internal_batch_size,
         )
-        if return_convergence_delta:
-            attributions, delta = attributions
-        if isinstance(attributions, tuple):
-            attributions = tuple(
-                DeepLiftShap._compute_mean_across_baselines(
-                    self, inp_bsz, base_bsz, attrib
-                )
-                for attrib in attributions
-            )
-        else:
-            attributions = DeepLiftShap._compute_mean_across_baselines(
-                self, inp_bsz, base_bsz, attributions
-            )
         if return_convergence_delta:
             return attributions, delta
         else:
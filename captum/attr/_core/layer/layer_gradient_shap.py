@@ -7,8 +7,6 @@ from torch.nn import Module
 import typing
 from typing import Callable, List, Optional, Tuple, Union, Any
 
-import numpy as np
-
 from ..._utils.attribution import LayerAttribution
 from ..._utils.gradient import compute_layer_gradients_and_eval, _forward_layer_eval
 
@@ -62,6 +60,8 @@ class LayerGradientShap(LayerAttribution, GradientShap):
         ] = None,
         additional_forward_args: Any = None,
         attribute_to_layer_input: bool = False,
+        sampling: str = "random",
+        generator: Optional[torch.Generator] = None,
     ) -> TensorOrTupleOfTensors:
         ...
 
@@ -78,6 +78,8 @@ class LayerGradientShap(LayerAttribution, GradientShap):
         additional_forward_args: Any = None,
         return_convergence_delta: bool = False,
         attribute_to_layer_input: bool = False,
+        sampling: str = "random",
+        generator: Optional[torch.Generator] = None,
     ) -> Union[TensorOrTupleOfTensors, Tuple[TensorOrTupleOfTensors, Tensor]]:
         ...
 
@@ -91,6 +93,8 @@ class LayerGradientShap(LayerAttribution, GradientShap):
         additional_forward_args=None,
         return_convergence_delta=False,
         attribute_to_layer_input=False,
+        sampling="random",
+        generator=None,
     ):
         r"""
         Implements gradient SHAP for layer based on the implementation from SHAP's
@@ -227,6 +231,22 @@ class LayerGradientShap(LayerAttribution, GradientShap):
                         attribute to the input or output, is a single tensor.
                         Support for multiple tensors will be added later.
                         Default: False
+            sampling (string, optional): How the baselines and the random
+                        points between each input and its baseline are
+                        sampled, as well as the noise if `stdevs` is nonzero:
+                        `random` draws independent samples, while `sobol`
+                        draws scrambled Sobol (quasi-random) points, which
+                        cover the distributions more evenly and reduce the
+                        variance of the attributions for a given `n_samples`,
+                        especially if it is a power of 2.
+                        Default: `random`
+            generator (torch.Generator, optional): If provided, the baselines,
+                        the random points and the noise are drawn from this
+                        generator directly on its device, which must be the
+                        device of the inputs, rather than from the global
+                        random state. Calls with generators seeded alike
+                        return the same attributions.
+                        Default: None
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
             - **attributions** (*tensor* or tuple of *tensors*):
@@ -279,6 +299,9 @@ class LayerGradientShap(LayerAttribution, GradientShap):
         input_min_baseline_x_grad = LayerInputBaselineXGradient(
             self.forward_func, self.layer, device_ids=self.device_ids
         )
+        input_min_baseline_x_grad.check_batch_independence = (
+            self.check_batch_independence
+        )
 
         nt = NoiseTunnel(input_min_baseline_x_grad)
 
@@ -293,6 +316,10 @@ class LayerGradientShap(LayerAttribution, GradientShap):
             additional_forward_args=additional_forward_args,
             return_convergence_delta=return_convergence_delta,
             attribute_to_layer_input=attribute_to_layer_input,
+            sampling=sampling,
+            coefficient_sampling=sampling,
+            generator=generator,
+            coefficient_generator=generator,
         )
 
         return attributions
@@ -337,6 +364,8 @@ class LayerInputBaselineXGradient(LayerAttribution, InputBaselineXGradient):
         ] = None,
         additional_forward_args: Any = None,
         attribute_to_layer_input: bool = False,
+        coefficient_sampling: str = "random",
+        coefficient_generator: Optional[torch.Generator] = None,
     ) -> TensorOrTupleOfTensors:
         ...
 
@@ -353,6 +382,8 @@ class LayerInputBaselineXGradient(LayerAttribution, InputBaselineXGradient):
         additional_forward_args: Any = None,
         return_convergence_delta: bool = False,
         attribute_to_layer_input: bool = False,
+        coefficient_sampling: str = "random",
+        coefficient_generator: Optional[torch.Generator] = None,
     ) -> Union[TensorOrTupleOfTensors, Tuple[TensorOrTupleOfTensors, Tensor]]:
         ...
 
@@ -364,12 +395,12 @@ class LayerInputBaselineXGradient(LayerAttribution, InputBaselineXGradient):
         additional_forward_args=None,
         return_convergence_delta=False,
         attribute_to_layer_input=False,
+        coefficient_sampling="random",
+        coefficient_generator=None,
     ):
         inputs, baselines = _format_input_baseline(inputs, baselines)
-        rand_coefficient = torch.tensor(
-            np.random.uniform(0.0, 1.0, inputs[0].shape[0]),
-            device=inputs[0].device,
-            dtype=inputs[0].dtype,
+        rand_coefficient = self._rand_coefficient(
+            inputs, coefficient_sampling, coefficient_generator
         )
 
         input_baseline_scaled = tuple(
@@ -384,6 +415,7 @@ class LayerInputBaselineXGradient(LayerAttribution, InputBaselineXGradient):
             additional_forward_args,
             device_ids=self.device_ids,
             attribute_to_layer_input=attribute_to_layer_input,
+            check_batch_independence=self.check_batch_independence,
         )
 
         attr_baselines, _ = _forward_layer_eval(
@@ -4,6 +4,7 @@ from typing import Any, Callable, List, Optional, Tuple, Union
 from torch import Tensor
 from torch.nn import Module
 
+from ..._utils.activation_cache import ActivationCache
 from ..._utils.attribution import GradientAttribution, LayerAttribution
 from ..._utils.common import (
     _format_additional_forward_args,
@@ -23,6 +24,7 @@ class LayerGradientXActivation(LayerAttribution, GradientAttribution):
         forward_func: Callable,
         layer: Module,
         device_ids: Optional[List[int]] = None,
+        activation_cache: Optional[ActivationCache] = None,
     ) -> None:
         r"""
         Args:
@@ -40,8 +42,16 @@ class LayerGradientXActivation(LayerAttribution, GradientAttribution):
                           intermediate outputs from batched results across devices.
                           If forward_func is given as the DataParallel model itself,
                           then it is not necessary to provide this argument.
+            activation_cache (ActivationCache, optional): Cache of layer
+                          evaluations, which may be shared with other attribution
+                          objects. If provided, the forward pass is run only once
+                          for repeated calls on the same inputs and additional
+                          forward arguments, e.g. to attribute different targets,
+                          as long as its results are cached.
+                          Default: None
         """
         LayerAttribution.__init__(self, forward_func, layer, device_ids)
+        self.activation_cache = activation_cache
         GradientAttribution.__init__(self, forward_func)
 
     def attribute(
@@ -153,6 +163,8 @@ class LayerGradientXActivation(LayerAttribution, GradientAttribution):
             additional_forward_args,
             device_ids=self.device_ids,
             attribute_to_layer_input=attribute_to_layer_input,
+            check_batch_independence=self.check_batch_independence,
+            activation_cache=self.activation_cache,
         )
         undo_gradient_requirements(inputs, gradient_mask)
         return _format_attributions(
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import copy
 from typing import Callable, List, Optional, Tuple, Union, Any
 import torch
 from torch import Tensor
@@ -6,6 +7,7 @@ from torch import Tensor
 from torch.nn import Module
 from torch.nn.parallel.scatter_gather import scatter
 
+from captum.attr._utils.approximation_methods import NESTED_METHODS
 from captum.attr._utils.common import (
     _tensorize_baseline,
     _validate_input,
@@ -13,13 +15,18 @@ from captum.attr._utils.common import (
     _format_attributions,
     _format_input_baseline,
     _extract_device,
+    _refine_attributions_until_converged,
 )
 
-from captum.attr._utils.gradient import _forward_layer_eval
+from captum.attr._utils.gradient import _forward_layer_eval, _sum_gradients
 
 from captum.attr._utils.attribution import LayerAttribution, GradientAttribution
-from captum.attr._core.integrated_gradients import IntegratedGradients
+from captum.attr._core.integrated_gradients import (
+    IntegratedGradients,
+    _AlphaGradientCache,
+)
 from captum.attr._utils.gradient import _run_forward
+from captum.attr._utils.hooks import _attribution_call, _call_scoped
 
 
 class LayerIntegratedGradients(LayerAttribution, GradientAttribution):
@@ -85,6 +92,8 @@ class LayerIntegratedGradients(LayerAttribution, GradientAttribution):
         internal_batch_size: Optional[int] = None,
         return_convergence_delta: bool = False,
         attribute_to_layer_input: bool = False,
+        convergence_tolerance: Optional[float] = None,
+        max_n_steps: int = 512,
     ) -> Union[
         Tensor, Tuple[Tensor, ...], Tuple[Union[Tensor, Tuple[Tensor, ...]], Tensor]
     ]:
@@ -182,7 +191,7 @@ class LayerIntegratedGradients(LayerAttribution, GradientAttribution):
                         method. Default: 50.
             method (string, optional): Method for approximating the integral,
                         one of `riemann_right`, `riemann_left`, `riemann_middle`,
-                        `riemann_trapezoid` or `gausslegendre`.
+                        `riemann_trapezoid`, `gausslegendre` or `clenshawcurtis`.
                         Default: `gausslegendre` if no method is provided.
             internal_batch_size (int, optional): Divides total #steps * #examples
                         data points into chunks of size internal_batch_size,
@@ -210,6 +219,28 @@ class LayerIntegratedGradients(LayerAttribution, GradientAttribution):
                         attribute to the input or output, is a single tensor.
                         Support for multiple tensors will be added later.
                         Default: False
+            convergence_tolerance (float, optional): If provided, `n_steps` is
+                        used as the initial number of steps and the approximation
+                        is refined, up to `max_n_steps`, only for the examples
+                        whose absolute convergence delta is larger than
+                        `convergence_tolerance`. The attributions of all other
+                        examples are kept from the coarser approximation.
+                        Each refinement doubles the number of steps, or the
+                        number of intervals for `riemann_trapezoid` and
+                        `clenshawcurtis`. For the nested approximation methods
+                        `riemann_left`, `riemann_right`, `riemann_trapezoid` and
+                        `clenshawcurtis`, the gradients evaluated for coarser
+                        approximations are reused and only the new steps are
+                        evaluated. If None, all examples are computed with
+                        exactly `n_steps` steps.
+                        Default: None
+            max_n_steps (int, optional): The maximum number of steps used for
+                        any example when `convergence_tolerance` is provided.
+                        The nested approximation methods stop at the last
+                        refinement not exceeding `max_n_steps` steps, while
+                        the steps of the other methods are clipped to it.
+                        It is ignored if `convergence_tolerance` is None.
+                        Default: 512
             Returns:
                 **attributions** or 2-element tuple of **attributions**, **delta**:
                 - **attributions** (*tensor* or tuple of *tensors*):
@@ -252,6 +283,89 @@ class LayerIntegratedGradients(LayerAttribution, GradientAttribution):
 
         if self.device_ids is None:
             self.device_ids = getattr(self.forward_func, "device_ids", None)
+
+        is_layer_tuple = False
+
+        if convergence_tolerance is not None:
+            # gradients evaluated at each alpha are cached across refinements
+            # so that nested approximation methods only evaluate new alphas
+            grad_cache = (
+                _AlphaGradientCache(method, max_n_steps)
+                if method in NESTED_METHODS
+                else None
+            )
+
+            def attribute_fn(
+                inps, baselines, target, additional_forward_args, n_steps, indices
+            ):
+                nonlocal is_layer_tuple
+                if grad_cache is not None:
+                    grad_cache.select(indices)
+                attributions, is_layer_tuple = self._attribute(
+                    inps,
+                    baselines,
+                    target,
+                    additional_forward_args,
+                    n_steps,
+                    method,
+                    internal_batch_size,
+                    attribute_to_layer_input,
+                    grad_cache=grad_cache,
+                )
+                return attributions
+
+            attributions, delta = _refine_attributions_until_converged(
+                self,
+                attribute_fn,
+                inps,
+                baselines,
+                target,
+                additional_forward_args,
+                n_steps,
+                method,
+                max_n_steps,
+                convergence_tolerance,
+            )
+            if return_convergence_delta:
+                return _format_attributions(is_layer_tuple, attributions), delta
+            return _format_attributions(is_layer_tuple, attributions)
+
+        attributions, is_layer_tuple = self._attribute(
+            inps,
+            baselines,
+            target,
+            additional_forward_args,
+            n_steps,
+            method,
+            internal_batch_size,
+            attribute_to_layer_input,
+        )
+
+        if return_convergence_delta:
+            start_point, end_point = baselines, inps
+            # computes approximation error based on the completeness axiom
+            delta = self.compute_convergence_delta(
+                attributions,
+                start_point,
+                end_point,
+                additional_forward_args=additional_forward_args,
+                target=target,
+            )
+            return _format_attributions(is_layer_tuple, attributions), delta
+        return _format_attributions(is_layer_tuple, attributions)
+
+    def _attribute(
+        self,
+        inps: Tuple[Tensor, ...],
+        baselines: Tuple[Tensor, ...],
+        target: Optional[Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]],
+        additional_forward_args: Any,
+        n_steps: int,
+        method: str,
+        internal_batch_size: Optional[int],
+        attribute_to_layer_input: bool,
+        grad_cache: Optional[_AlphaGradientCache] = None,
+    ) -> Tuple[Tuple[Tensor, ...], bool]:
         inputs_layer, is_layer_tuple = _forward_layer_eval(
             self.forward_func,
             inps,
@@ -301,53 +415,49 @@ class LayerIntegratedGradients(LayerAttribution, GradientAttribution):
                         return scattered_inputs_dict[device]
                     return scattered_inputs_dict[device][0]
 
-                if attribute_to_layer_input:
-                    hook = self.layer.register_forward_pre_hook(layer_forward_hook)
-                else:
-                    hook = self.layer.register_forward_hook(layer_forward_hook)
-
-                output = _run_forward(
-                    self.forward_func, additional_forward_args, target_ind,
-                )
-                hook.remove()
+                # the hook only replaces the layer of forward passes run by
+                # this call, not those of concurrent calls on other threads
+                with _attribution_call():
+                    layer_forward_hook = _call_scoped(layer_forward_hook, self.layer)
+                    if attribute_to_layer_input:
+                        hook = self.layer.register_forward_pre_hook(layer_forward_hook)
+                    else:
+                        hook = self.layer.register_forward_hook(layer_forward_hook)
+                    try:
+                        output = _run_forward(
+                            self.forward_func, additional_forward_args, target_ind,
+                        )
+                    finally:
+                        hook.remove()
                 assert output[0].numel() == 1, (
                     "Target not provided when necessary, cannot"
                     " take gradient with respect to multiple outputs."
                 )
-                # torch.unbind(forward_out) is a list of scalar tensor tuples and
-                # contains batch_size * #steps elements
-                grads = torch.autograd.grad(torch.unbind(output), inputs)
+                # output contains batch_size * #steps scalars, whose gradients
+                # are computed at once by differentiating their sum
+                grads = _sum_gradients(output, inputs, self.check_batch_independence)
             return grads
 
-        self.ig.gradient_func = gradient_func
+        # uses a copy of `self.ig` for this call instead of setting its
+        # gradient function, which may be used by concurrent calls
+        ig = copy.copy(self.ig)
+        ig.gradient_func = gradient_func
         all_inputs = (
             (inps + additional_forward_args)
             if additional_forward_args is not None
             else inps
         )
-        attributions = self.ig.attribute(
+        attributions = ig._attribute_in_batches(
             inputs_layer,
-            baselines=baselines_layer,
-            target=target,
-            additional_forward_args=all_inputs,
-            n_steps=n_steps,
-            method=method,
-            internal_batch_size=internal_batch_size,
-            return_convergence_delta=False,
+            baselines_layer,
+            target,
+            all_inputs,
+            n_steps,
+            method,
+            internal_batch_size,
+            grad_cache=grad_cache,
         )
-
-        if return_convergence_delta:
-            start_point, end_point = baselines, inps
-            # computes approximation error based on the completeness axiom
-            delta = self.compute_convergence_delta(
-                attributions,
-                start_point,
-                end_point,
-                additional_forward_args=additional_forward_args,
-                target=target,
-            )
-            return _format_attributions(is_layer_tuple, attributions), delta
-        return _format_attributions(is_layer_tuple, attributions)
+        return attributions, is_layer_tuple
 
     def has_convergence_delta(self) -> bool:
         return True
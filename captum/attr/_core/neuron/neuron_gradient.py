@@ -2,6 +2,7 @@
 from torch.nn import Module
 from typing import Callable, List, Optional, Tuple, Union, Any
 
+from ..._utils.activation_cache import ActivationCache
 from ..._utils.attribution import NeuronAttribution, GradientAttribution
 from ..._utils.common import (
     _format_input,
@@ -22,6 +23,7 @@ class NeuronGradient(NeuronAttribution, GradientAttribution):
         forward_func: Callable,
         layer: Module,
         device_ids: Optional[List[int]] = None,
+        activation_cache: Optional[ActivationCache] = None,
     ) -> None:
         r"""
         Args:
@@ -42,8 +44,16 @@ class NeuronGradient(NeuronAttribution, GradientAttribution):
                           intermediate outputs from batched results across devices.
                           If forward_func is given as the DataParallel model itself,
                           then it is not necessary to provide this argument.
+            activation_cache (ActivationCache, optional): Cache of layer
+                          evaluations, which may be shared with other attribution
+                          objects. If provided, the forward pass is run only once
+                          for repeated calls on the same inputs and additional
+                          forward arguments, e.g. to attribute different neurons,
+                          as long as its results are cached.
+                          Default: None
         """
         NeuronAttribution.__init__(self, forward_func, layer, device_ids)
+        self.activation_cache = activation_cache
         GradientAttribution.__init__(self, forward_func)
 
     def attribute(
@@ -142,6 +152,7 @@ class NeuronGradient(NeuronAttribution, GradientAttribution):
             neuron_index,
             device_ids=self.device_ids,
             attribute_to_layer_input=attribute_to_neuron_input,
+            activation_cache=self.activation_cache,
         )
 
         undo_gradient_requirements(inputs, gradient_mask)
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 from typing import Callable, List, Optional, Tuple, Union, Any
+
+import torch
 from torch import Tensor
 from torch.nn import Module
 
@@ -47,6 +49,7 @@ class NeuronGradientShap(NeuronAttribution, GradientAttribution):
         stdevs: float = 0.0,
         additional_forward_args: Any = None,
         attribute_to_neuron_input: bool = False,
+        generator: Optional[torch.Generator] = None,
     ) -> TensorOrTupleOfTensors:
         r"""
         Implements gradient SHAP for a neuron in a hidden layer based on the
@@ -159,6 +162,13 @@ class NeuronGradientShap(NeuronAttribution, GradientAttribution):
                         attribute to the input or output, is a single tensor.
                         Support for multiple tensors will be added later.
                         Default: False
+            generator (torch.Generator, optional): If provided, the baselines,
+                        the random points and the noise are drawn from this
+                        generator directly on its device, which must be the
+                        device of the inputs, rather than from the global
+                        random state. Calls with generators seeded alike
+                        return the same attributions.
+                        Default: None
 
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
@@ -201,4 +211,5 @@ class NeuronGradientShap(NeuronAttribution, GradientAttribution):
             n_samples=n_samples,
             stdevs=stdevs,
             additional_forward_args=additional_forward_args,
+            generator=generator,
         )
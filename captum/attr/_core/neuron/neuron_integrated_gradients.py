@@ -129,7 +129,7 @@ class NeuronIntegratedGradients(NeuronAttribution, GradientAttribution):
                             method. Default: 50.
                 method (string, optional): Method for approximating the integral,
                             one of `riemann_right`, `riemann_left`, `riemann_middle`,
-                            `riemann_trapezoid` or `gausslegendre`.
+                            `riemann_trapezoid`, `gausslegendre` or `clenshawcurtis`.
                             Default: `gausslegendre` if no method is provided.
                 internal_batch_size (int, optional): Divides total #steps * #examples
                             data points into chunks of size internal_batch_size,
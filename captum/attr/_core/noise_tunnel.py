@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-from typing import Optional, Tuple, Union, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import torch
 from torch import Tensor
@@ -18,8 +18,13 @@ from .._utils.common import (
     _format_tensor_into_tuples,
     _expand_additional_forward_args,
     _expand_target,
+    _select_examples,
+    _select_target,
     ExpansionTypes,
 )
+from .._utils.sampling import _Sampler
+from .._utils.stat import Mean, Var
+from .._utils.summarizer import Summarizer
 
 
 class NoiseTunnelType(Enum):
@@ -31,6 +36,21 @@ class NoiseTunnelType(Enum):
 SUPPORTED_NOISE_TUNNEL_TYPES = list(NoiseTunnelType.__members__.keys())
 
 
+def _merge_mean_and_m2(
+    mean: Tensor, m2: Tensor, n: int, other_mean: Tensor, other_m2: Tensor, other_n: int
+) -> Tuple[Tensor, Tensor]:
+    r"""
+    Combines the means and sums of squared deviations from the mean of two
+    disjoint sets of `n` and `other_n` samples into those of their union.
+    """
+    total = n + other_n
+    delta = other_mean - mean
+    return (
+        mean + delta * (other_n / total),
+        m2 + other_m2 + delta ** 2 * (n * other_n / total),
+    )
+
+
 class NoiseTunnel(Attribution):
     def __init__(self, attribution_method: Attribution) -> None:
         r"""
@@ -50,6 +70,12 @@ class NoiseTunnel(Attribution):
         n_samples: int = 5,
         stdevs: Union[float, Tuple[float, ...]] = 1.0,
         draw_baseline_from_distrib: bool = False,
+        n_samples_batch_size: Optional[int] = None,
+        convergence_tolerance: Optional[float] = None,
+        return_n_samples: bool = False,
+        sampling: str = "random",
+        antithetic: bool = False,
+        generator: Optional[torch.Generator] = None,
         **kwargs: Any
     ):
         r"""
@@ -105,12 +131,79 @@ class NoiseTunnel(Attribution):
                         randomly draw baseline samples from the `baselines`
                         distribution provided as an input tensor.
                         Default: False
+            n_samples_batch_size (int, optional): The number of noisy samples
+                        per example which are drawn and attributed at once.
+                        If it is smaller than `n_samples`, the samples are
+                        processed in batches, whose attributions are folded into
+                        a running mean and variance, such that the memory usage
+                        is independent of `n_samples`. The results equal those
+                        of a single batch up to the randomness of the noise.
+                        If None, all `n_samples` samples are processed at once,
+                        or in batches of 8 samples if `convergence_tolerance`
+                        is provided.
+                        Default: None
+            convergence_tolerance (float, optional): If provided, batches of
+                        `n_samples_batch_size` noisy samples are drawn for
+                        each example until the standard error of its mean
+                        attribution is small compared to the mean, and
+                        `n_samples` is the maximum number of samples per
+                        example. Sampling stops for an example once the L2
+                        norm of the standard error is at most
+                        `convergence_tolerance` times the L2 norm of the mean
+                        attribution, both taken over all attribution tensors
+                        of the example. If None, exactly `n_samples` samples
+                        are drawn for every example.
+                        Default: None
+            return_n_samples (bool, optional): Indicates whether to return the
+                        number of noisy samples used for each example, as a
+                        1D long tensor following the attributions (and the
+                        convergence delta, if returned).
+                        Default: False
+            sampling (string, optional): How the noise, and the baselines if
+                        `draw_baseline_from_distrib` is True, are sampled:
+                        `random` draws independent samples, while `sobol`
+                        draws scrambled Sobol (quasi-random) points per input
+                        tensor, which are mapped through the inverse normal
+                        CDF for the noise. Quasi-random points cover the
+                        distribution more evenly, which reduces the variance
+                        of the averaged attributions for a given number of
+                        samples, especially when the number of samples per
+                        example (and per batch) is a power of 2. Inputs with
+                        more than 21201 features per example are split into
+                        blocks of features drawn from independently
+                        scrambled sequences.
+                        Default: `random`
+            antithetic (bool, optional): If True, only the noise of the first
+                        half of the samples of each example (and of each
+                        batch of samples) is drawn, and the second half uses
+                        the same noise with the opposite sign, which cancels
+                        the effect of the noise on linear parts of the
+                        attributions.
+                        Default: False
+            generator (torch.Generator, optional): If provided, all random
+                        numbers, i.e. the noise, the baselines drawn from the
+                        distribution and the scrambling of quasi-random
+                        points, are drawn from this generator directly on its
+                        device, which must be the device of the inputs. This
+                        makes the results independent of the global random
+                        state and of concurrent calls, and calls with
+                        generators seeded alike return the same attributions
+                        (for deterministic attribution methods).
+                        Default: None
             **kwargs (Any, optional): Contains a list of arguments that are passed
                         to `attribution_method` attribution algorithm.
                         Any additional arguments that should be used for the
                         chosen attribution method should be included here.
                         For instance, such arguments include
                         `additional_forward_args` and `baselines`.
+                        Batching arguments such as `internal_batch_size`,
+                        `ablations_per_eval` or `memory_budget` apply to the
+                        batch of all noisy samples, i.e. to
+                        #examples * n_samples examples, and batch sizes tuned
+                        from a `memory_budget` are cached for subsequent calls.
+                        For attribution methods supporting `autocast_dtype`,
+                        the attributions of the noisy samples are computed in
+                        mixed precision, and averaged in float32.
 
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
@@ -130,6 +223,10 @@ class NoiseTunnel(Attribution):
                         Delta is computed for each input in the batch
                         and represents the arithmetic mean
                         across all `n_sample` perturbed tensors for that input.
+                        With `convergence_tolerance`, the deltas of all
+                        samples used for each example are concatenated.
+            - **n_samples** (*tensor*, returned if return_n_samples=True):
+                        The number of noisy samples used for each example.
 
 
         Examples::
@@ -149,7 +246,9 @@ class NoiseTunnel(Attribution):
             >>>                            n_samples=10, target=3)
         """
 
-        def add_noise_to_inputs() -> Tuple[Tensor, ...]:
+        def add_noise_to_inputs(
+            inputs: Tuple[Tensor, ...], n: int
+        ) -> Tuple[Tensor, ...]:
             if isinstance(stdevs, tuple):
                 assert len(stdevs) == len(inputs), (
                     "The number of input tensors "
@@ -157,22 +256,41 @@ class NoiseTunnel(Attribution):
                         len(inputs), len(stdevs)
                     )
                 )
+                stdevs_ = stdevs
             else:
                 assert isinstance(
                     stdevs, float
                 ), "stdevs must be type float. " "Given: {}".format(type(stdevs))
                 stdevs_ = (stdevs,) * len(inputs)
             return tuple(
-                add_noise_to_input(input, stdev)
-                for (input, stdev) in zip(inputs, stdevs_)
+                add_noise_to_input(input, stdev, n, index)
+                for index, (input, stdev) in enumerate(zip(inputs, stdevs_))
             )
 
-        def add_noise_to_input(input: Tensor, stdev: float) -> Tensor:
+        def add_noise_to_input(
+            input: Tensor, stdev: float, n: int, index: int
+        ) -> Tensor:
             # batch size
             bsz = input.shape[0]
 
+            if sampling != "random" or antithetic or generator is not None:
+                # draws the noise of the first half of the samples of each
+                # example and negates it for the second half if antithetic
+                n_drawn = (n + 1) // 2 if antithetic else n
+                noise = sampler.normal(
+                    ("noise", index),
+                    bsz * n_drawn,
+                    input[0].numel(),
+                    input.device,
+                    input.dtype,
+                ).view((bsz, n_drawn) + input.shape[1:])
+                if antithetic:
+                    noise = torch.cat([noise, -noise], dim=1)[:, :n]
+                noise = stdev * noise.reshape((bsz * n,) + input.shape[1:])
+                return input.repeat_interleave(n, dim=0) + noise
+
             # expand input size by the number of drawn samples
-            input_expanded_size = (bsz * n_samples,) + input.shape[1:]
+            input_expanded_size = (bsz * n,) + input.shape[1:]
 
             # expand stdev for the shape of the input and number of drawn samples
             stdev_expanded = torch.tensor(stdev, device=input.device).repeat(
@@ -184,12 +302,18 @@ class NoiseTunnel(Attribution):
             # FIXME it look like it is very difficult to make torch.normal
             # deterministic this needs an investigation
             noise = torch.normal(0, stdev_expanded)
-            return input.repeat_interleave(n_samples, dim=0) + noise
+            return input.repeat_interleave(n, dim=0) + noise
 
-        def expand_and_update_baselines():
-            def get_random_baseline_indices(bsz, baseline):
+        def expand_baselines(
+            inputs: Tuple[Tensor, ...], n: int, kwargs: Dict[str, Any]
+        ) -> None:
+            def get_random_baseline_indices(bsz, baseline, index):
                 num_ref_samples = baseline.shape[0]
-                return np.random.choice(num_ref_samples, n_samples * bsz).tolist()
+                if sampling == "random" and generator is None:
+                    return np.random.choice(num_ref_samples, n * bsz).tolist()
+                return sampler.indices(
+                    ("baselines", index), n * bsz, num_ref_samples, baseline.device
+                )
 
             # TODO allow to add noise to baselines as well
             # expand baselines to match the sizes of input
@@ -205,14 +329,14 @@ class NoiseTunnel(Attribution):
             if draw_baseline_from_distrib:
                 bsz = inputs[0].shape[0]
                 baselines = tuple(
-                    baseline[get_random_baseline_indices(bsz, baseline)]
+                    baseline[get_random_baseline_indices(bsz, baseline, index)]
                     if isinstance(baseline, torch.Tensor)
                     else baseline
-                    for baseline in baselines
+                    for index, baseline in enumerate(baselines)
                 )
             else:
                 baselines = tuple(
-                    baseline.repeat_interleave(n_samples, dim=0)
+                    baseline.repeat_interleave(n, dim=0)
                     if isinstance(baseline, torch.Tensor)
                     and baseline.shape[0] == input.shape[0]
                     and baseline.shape[0] > 1
@@ -222,7 +346,7 @@ class NoiseTunnel(Attribution):
             # update kwargs with expanded baseline
             kwargs["baselines"] = baselines
 
-        def expand_and_update_additional_forward_args():
+        def expand_additional_forward_args(n: int, kwargs: Dict[str, Any]) -> None:
             if "additional_forward_args" not in kwargs:
                 return
             additional_forward_args = kwargs["additional_forward_args"]
@@ -233,29 +357,77 @@ class NoiseTunnel(Attribution):
                 return
             additional_forward_args = _expand_additional_forward_args(
                 additional_forward_args,
-                n_samples,
+                n,
                 expansion_type=ExpansionTypes.repeat_interleave,
             )
             # update kwargs with expanded baseline
             kwargs["additional_forward_args"] = additional_forward_args
 
-        def expand_and_update_target():
+        def expand_target(n: int, kwargs: Dict[str, Any]) -> None:
             if "target" not in kwargs:
                 return
             target = kwargs["target"]
             target = _expand_target(
-                target, n_samples, expansion_type=ExpansionTypes.repeat_interleave
+                target, n, expansion_type=ExpansionTypes.repeat_interleave
             )
             # update kwargs with expanded baseline
             kwargs["target"] = target
 
-        def compute_expected_attribution_and_sq(attribution):
-            bsz = attribution.shape[0] // n_samples
-            attribution_shape = (bsz, n_samples)
-            if len(attribution.shape) > 1:
-                attribution_shape += attribution.shape[1:]
+        def select_examples(
+            indices: Tensor, kwargs: Dict[str, Any]
+        ) -> Tuple[Tensor, ...]:
+            bsz = inputs[0].shape[0]
+            if "baselines" in kwargs and not draw_baseline_from_distrib:
+                kwargs["baselines"] = _select_examples(
+                    _format_baseline(kwargs["baselines"], inputs), indices, bsz
+                )
+            if "additional_forward_args" in kwargs:
+                kwargs["additional_forward_args"] = _select_examples(
+                    _format_additional_forward_args(kwargs["additional_forward_args"]),
+                    indices,
+                    bsz,
+                )
+            if "target" in kwargs:
+                kwargs["target"] = _select_target(kwargs["target"], indices)
+            return _select_examples(inputs, indices, bsz)
+
+        def attribute_samples(
+            n: int, indices: Optional[Tensor] = None
+        ) -> Tuple[Tuple[Tensor, ...], Any, bool]:
+            r"""
+            Computes the attributions of `n` noisy samples of each example, or
+            only of the examples at `indices` if given, which are returned as
+            tensors of shape (#examples, n, ...).
+            """
+            samples_kwargs = dict(kwargs)
+            samples_inputs = inputs
+            if indices is not None:
+                samples_inputs = select_examples(indices, samples_kwargs)
+            inputs_with_noise = add_noise_to_inputs(samples_inputs, n)
+            # if the algorithm supports targets, baselines and/or
+            # additional_forward_args they will be expanded based on the number
+            # of samples and passed in a copy of kwargs
+            expand_baselines(samples_inputs, n, samples_kwargs)
+            expand_additional_forward_args(n, samples_kwargs)
+            expand_target(n, samples_kwargs)
+            # smoothgrad_Attr(x) = 1 / n * sum(Attr(x + N(0, sigma^2))
+            attributions = self.attribution_method.attribute(
+                inputs_with_noise if is_inputs_tuple else inputs_with_noise[0],
+                **samples_kwargs
+            )
+
+            delta = None
+            if self.is_delta_supported and return_convergence_delta:
+                attributions, delta = attributions
 
-            attribution = attribution.view(attribution_shape)
+            is_attrib_tuple = isinstance(attributions, tuple)
+            attributions = tuple(
+                attribution.view((attribution.shape[0] // n, n) + attribution.shape[1:])
+                for attribution in _format_tensor_into_tuples(attributions)
+            )
+            return attributions, delta, is_attrib_tuple
+
+        def compute_expected_attribution_and_sq(attribution):
             expected_attribution = attribution.mean(dim=1, keepdim=False)
             expected_attribution_sq = torch.mean(attribution ** 2, dim=1, keepdim=False)
             return expected_attribution, expected_attribution_sq
@@ -267,38 +439,71 @@ class NoiseTunnel(Attribution):
         inputs = _format_input(inputs)
 
         _validate_noise_tunnel_type(nt_type, SUPPORTED_NOISE_TUNNEL_TYPES)
-
-        delta = None
-        inputs_with_noise = add_noise_to_inputs()
-        # if the algorithm supports targets, baselines and/or additional_forward_args
-        # they will be expanded based on the n_steps and corresponding kwargs
-        # variables will be updated accordingly
-        expand_and_update_baselines()
-        expand_and_update_additional_forward_args()
-        expand_and_update_target()
-        # smoothgrad_Attr(x) = 1 / n * sum(Attr(x + N(0, sigma^2))
-        attributions = self.attribution_method.attribute(
-            inputs_with_noise if is_inputs_tuple else inputs_with_noise[0], **kwargs
-        )
+        # draws quasi-random points of all batches of samples from the same
+        # sequences
+        sampler = _Sampler(sampling, generator)
 
         return_convergence_delta = (
             "return_convergence_delta" in kwargs and kwargs["return_convergence_delta"]
         )
 
-        if self.is_delta_supported and return_convergence_delta:
-            attributions, delta = attributions
-
-        is_attrib_tuple = isinstance(attributions, tuple)
-        attributions = _format_tensor_into_tuples(attributions)
+        n_samples_used = None
+        if convergence_tolerance is not None:
+            (
+                expected_attributions,
+                variances,
+                delta,
+                is_attrib_tuple,
+                n_samples_used,
+            ) = self._attribute_until_converged(
+                attribute_samples,
+                inputs[0].shape[0],
+                n_samples,
+                8 if n_samples_batch_size is None else n_samples_batch_size,
+                convergence_tolerance,
+            )
+            expected_attributions_sq = tuple(
+                variance + expected_attribution * expected_attribution
+                for expected_attribution, variance in zip(
+                    expected_attributions, variances
+                )
+            )
+        elif n_samples_batch_size is None or n_samples_batch_size >= n_samples:
+            attributions, delta, is_attrib_tuple = attribute_samples(n_samples)
+            expected_attributions, expected_attributions_sq = zip(
+                *(
+                    compute_expected_attribution_and_sq(attribution)
+                    for attribution in attributions
+                )
+            )
+            variances = tuple(
+                expected_attribution_sq - expected_attribution * expected_attribution
+                for expected_attribution, expected_attribution_sq in zip(
+                    expected_attributions, expected_attributions_sq
+                )
+            )
+        else:
+            (
+                expected_attributions,
+                variances,
+                delta,
+                is_attrib_tuple,
+            ) = self._attribute_in_sample_batches(
+                attribute_samples, n_samples, n_samples_batch_size
+            )
+            expected_attributions_sq = tuple(
+                variance + expected_attribution * expected_attribution
+                for expected_attribution, variance in zip(
+                    expected_attributions, variances
+                )
+            )
 
-        expected_attributions = []
-        expected_attributions_sq = []
-        for attribution in attributions:
-            expected_attr, expected_attr_sq = compute_expected_attribution_and_sq(
-                attribution
+        if return_n_samples and n_samples_used is None:
+            n_samples_used = torch.full(
+                (inputs[0].shape[0],), n_samples, dtype=torch.long
             )
-            expected_attributions.append(expected_attr)
-            expected_attributions_sq.append(expected_attr_sq)
+        if not return_n_samples:
+            n_samples_used = None
 
         if NoiseTunnelType[nt_type] == NoiseTunnelType.smoothgrad:
             return self._apply_checks_and_return_attributions(
@@ -306,6 +511,7 @@ class NoiseTunnel(Attribution):
                 is_attrib_tuple,
                 return_convergence_delta,
                 delta,
+                n_samples_used,
             )
 
         if NoiseTunnelType[nt_type] == NoiseTunnelType.smoothgrad_sq:
@@ -314,18 +520,146 @@ class NoiseTunnel(Attribution):
                 is_attrib_tuple,
                 return_convergence_delta,
                 delta,
+                n_samples_used,
             )
 
-        vargrad = tuple(
-            expected_attribution_sq - expected_attribution * expected_attribution
-            for expected_attribution, expected_attribution_sq in zip(
-                expected_attributions, expected_attributions_sq
-            )
+        return self._apply_checks_and_return_attributions(
+            tuple(variances),
+            is_attrib_tuple,
+            return_convergence_delta,
+            delta,
+            n_samples_used,
         )
 
-        return self._apply_checks_and_return_attributions(
-            vargrad, is_attrib_tuple, return_convergence_delta, delta
+    def _attribute_in_sample_batches(
+        self,
+        attribute_samples: Callable[[int], Tuple[Tuple[Tensor, ...], Any, bool]],
+        n_samples: int,
+        n_samples_batch_size: int,
+    ) -> Tuple[Tuple[Tensor, ...], Tuple[Tensor, ...], Optional[Tensor], bool]:
+        r"""
+        Computes the mean and variance of the attributions of `n_samples` noisy
+        samples of each example, drawing and attributing at most
+        `n_samples_batch_size` samples per example at a time. The attributions
+        of each batch are folded into running means and sums of squared
+        deviations (Welford's algorithm), so that the memory usage does not
+        depend on `n_samples`. The convergence deltas of all samples, if
+        returned by `attribute_samples`, are concatenated in the same order
+        as without batching.
+        """
+        assert n_samples_batch_size > 0, "n_samples_batch_size must be positive."
+        summarizer = Summarizer([Mean(), Var()])
+        deltas = []
+        is_attrib_tuple = False
+        for start in range(0, n_samples, n_samples_batch_size):
+            n = min(n_samples_batch_size, n_samples - start)
+            attributions, delta, is_attrib_tuple = attribute_samples(n)
+            for i in range(n):
+                summarizer.update(
+                    tuple(attribution[:, i].detach() for attribution in attributions)
+                )
+            if delta is not None:
+                deltas.append(delta.reshape(-1, n))
+
+        summaries = summarizer.summary
+        expected_attributions = tuple(summary["mean"] for summary in summaries)
+        variances = tuple(summary["variance"] for summary in summaries)
+        delta = torch.cat(deltas, dim=1).reshape(-1) if len(deltas) > 0 else None
+        return expected_attributions, variances, delta, is_attrib_tuple
+
+    def _attribute_until_converged(
+        self,
+        attribute_samples: Callable[..., Tuple[Tuple[Tensor, ...], Any, bool]],
+        num_examples: int,
+        n_samples: int,
+        n_samples_batch_size: int,
+        convergence_tolerance: float,
+    ) -> Tuple[Tuple[Tensor, ...], Tuple[Tensor, ...], Optional[Tensor], bool, Tensor]:
+        r"""
+        Computes the mean and variance of the attributions of noisy samples of
+        each example, drawing `n_samples_batch_size` samples at a time for
+        the examples which have not converged yet. An example has converged
+        once the L2 norm of the standard error of its mean attribution is at
+        most `convergence_tolerance` times the L2 norm of the mean attribution
+        (over all attribution tensors), or once `n_samples` samples were drawn
+        for it. The batches are combined with the parallel variant of
+        Welford's algorithm.
+
+        Returns the means, the variances, the convergence deltas of all
+        samples concatenated example by example (or None), whether the
+        attributions are a tuple, and the number of samples used per example.
+        """
+        assert n_samples_batch_size > 0, "n_samples_batch_size must be positive."
+        means: Tuple[Tensor, ...] = ()
+        m2s: Tuple[Tensor, ...] = ()
+        example_deltas: List[List[Tensor]] = [[] for _ in range(num_examples)]
+        n_samples_used = torch.zeros(num_examples, dtype=torch.long)
+        indices = torch.arange(num_examples)
+        n_done = 0
+        is_attrib_tuple = False
+        while n_done < n_samples and indices.numel() > 0:
+            n = min(n_samples_batch_size, n_samples - n_done)
+            attributions, delta, is_attrib_tuple = attribute_samples(
+                n, indices if indices.numel() < num_examples else None
+            )
+            attributions = tuple(attribution.detach() for attribution in attributions)
+            if n_done == 0:
+                means = tuple(
+                    torch.zeros_like(attribution[:, 0]) for attribution in attributions
+                )
+                m2s = tuple(torch.zeros_like(mean) for mean in means)
+
+            batch_means = tuple(attribution.mean(dim=1) for attribution in attributions)
+            updated = [
+                _merge_mean_and_m2(
+                    mean[indices.to(mean.device)],
+                    m2[indices.to(m2.device)],
+                    n_done,
+                    batch_mean,
+                    ((attribution - batch_mean.unsqueeze(1)) ** 2).sum(dim=1),
+                    n,
+                )
+                for mean, m2, batch_mean, attribution in zip(
+                    means, m2s, batch_means, attributions
+                )
+            ]
+            means = tuple(
+                mean.index_copy(0, indices.to(mean.device), updated_mean)
+                for mean, (updated_mean, _) in zip(means, updated)
+            )
+            m2s = tuple(
+                m2.index_copy(0, indices.to(m2.device), updated_m2)
+                for m2, (_, updated_m2) in zip(m2s, updated)
+            )
+            if delta is not None:
+                for index, example_delta in zip(indices.tolist(), delta.reshape(-1, n)):
+                    example_deltas[index].append(example_delta)
+            n_done += n
+            n_samples_used[indices] = n_done
+            if n_done < 2:
+                continue
+
+            # squared L2 norms of the mean attributions and of their standard
+            # errors, i.e. of the sample variances divided by n_done
+            mean_norm_sq = sum(
+                (updated_mean ** 2).reshape(len(indices), -1).sum(dim=1)
+                for updated_mean, _ in updated
+            )
+            sem_norm_sq = sum(
+                updated_m2.reshape(len(indices), -1).sum(dim=1)
+                for _, updated_m2 in updated
+            ) / (n_done * (n_done - 1))
+            converged = sem_norm_sq <= convergence_tolerance ** 2 * mean_norm_sq
+            indices = indices[~converged.cpu()]
+
+        counts = n_samples_used.to(means[0].device)
+        variances = tuple(
+            m2 / counts.view((-1,) + (1,) * (m2.dim() - 1)).to(m2.dtype) for m2 in m2s
         )
+        delta = None
+        if len(example_deltas[0]) > 0:
+            delta = torch.cat([torch.cat(deltas) for deltas in example_deltas])
+        return means, variances, delta, is_attrib_tuple, n_samples_used
 
     def _apply_checks_and_return_attributions(
         self,
@@ -333,14 +667,16 @@ class NoiseTunnel(Attribution):
         is_attrib_tuple: bool,
         return_convergence_delta: bool,
         delta: Optional[Tensor],
+        n_samples_used: Optional[Tensor] = None,
     ):
         attributions = _format_attributions(is_attrib_tuple, attributions)
 
-        return (
-            (attributions, delta)
-            if self.is_delta_supported and return_convergence_delta
-            else attributions
-        )
+        result: Tuple[Any, ...] = (attributions,)
+        if self.is_delta_supported and return_convergence_delta:
+            result += (delta,)
+        if n_samples_used is not None:
+            result += (n_samples_used,)
+        return result if len(result) > 1 else attributions
 
     def has_convergence_delta(self) -> bool:
         return self.is_delta_supported
@@ -41,6 +41,12 @@ class Occlusion(FeatureAblation):
         ] = None,
         additional_forward_args: Any = None,
         ablations_per_eval: int = 1,
+        memory_budget: Optional[int] = None,
+        num_workers: int = 0,
+        prefetch_batches: int = 0,
+        targets: Optional[
+            List[Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]]
+        ] = None,
     ) -> TensorOrTupleOfTensors:
         r""""
         A perturbation based approach to computing attribution, involving
@@ -173,6 +179,33 @@ class Occlusion(FeatureAblation):
                             (ablations_per_eval * #examples) / num_devices
                             samples.
                             Default: 1
+                memory_budget (int, optional): If provided, ablations_per_eval
+                            is ignored and instead chosen automatically as the
+                            largest number of occlusions per forward pass whose
+                            evaluation stays within memory_budget bytes of peak
+                            memory. The choice is cached for subsequent calls
+                            with the same model and input shapes.
+                            Default: None
+                num_workers (int, optional): If larger than 0, the occlusions
+                            of each input are split into contiguous ranges,
+                            which are evaluated in parallel by num_workers
+                            forked worker processes, each using an equal share
+                            of torch.get_num_threads() threads. Only supported
+                            for inputs on CPU.
+                            Default: 0
+                prefetch_batches (int, optional): If larger than 0, the occluded
+                            batches are constructed by a background thread up
+                            to prefetch_batches batches ahead of the evaluation
+                            of the forward function, so that constructing the
+                            next batch overlaps with evaluating the current one.
+                            Default: 0
+                targets (list, optional): List of targets, each given in any of
+                            the forms described for `target`, for which
+                            attributions are computed from the same forward
+                            evaluations. The attributions for all targets are
+                            stacked along a new first dimension. This cannot be
+                            combined with `target`.
+                            Default: None
 
         Returns:
                 *tensor* or tuple of *tensors* of **attributions**:
@@ -209,12 +242,6 @@ class Occlusion(FeatureAblation):
             sliding_window_shapes, formatted_inputs
         )
 
-        # Construct tensors from sliding window shapes
-        sliding_window_tensors = tuple(
-            torch.ones(window_shape, device=formatted_inputs[i].device)
-            for i, window_shape in enumerate(sliding_window_shapes)
-        )
-
         # Construct counts, defining number of steps to make of occlusion block in
         # each dimension.
         shift_counts = []
@@ -248,7 +275,11 @@ class Occlusion(FeatureAblation):
             target=target,
             additional_forward_args=additional_forward_args,
             ablations_per_eval=ablations_per_eval,
-            sliding_window_tensors=sliding_window_tensors,
+            memory_budget=memory_budget,
+            num_workers=num_workers,
+            prefetch_batches=prefetch_batches,
+            targets=targets,
+            sliding_window_shapes=sliding_window_shapes,
             shift_counts=tuple(shift_counts),
             strides=strides,
         )
@@ -261,98 +292,134 @@ class Occlusion(FeatureAblation):
         start_feature: int,
         end_feature: int,
         **kwargs: Any,
-    ) -> Tuple[Tensor, Tensor]:
+    ) -> Tuple[Tensor, List[Tuple[slice, ...]]]:
         r"""
-        Ablates given expanded_input tensor with given feature mask, feature range,
+        Ablates given expanded_input tensor with given feature range,
         and baselines, and any additional arguments.
         expanded_input shape is (num_features, num_examples, ...)
         with remaining dimensions corresponding to remaining original tensor
         dimensions and num_features = end_feature - start_feature.
 
-        input_mask is None for occlusion, and the mask is constructed
-        using sliding_window_tensors, strides, and shift counts, which are provided in
-        kwargs. baseline is expected to
+        input_mask is None for occlusion, and the sliding windows are
+        constructed using sliding_window_tensors, strides, and shift counts,
+        which are provided in kwargs. baseline is expected to
         be broadcastable to match expanded_input.
 
-        This method returns the ablated input tensor, which has the same
-        dimensionality as expanded_input as well as the corresponding mask with
-        either the same dimensionality as expanded_input or second dimension
-        being 1. This mask contains 1s in locations which have been ablated (and
-        thus counted towards ablations for that feature) and 0s otherwise.
+        The ablated input tensor is a copy of expanded_input, into which the
+        baseline is written with one slice assignment per sliding window, so
+        that no mask of the size of the input is constructed. This method
+        returns the ablated input tensor, which has the same dimensionality as
+        expanded_input, as well as the sliding window of each ablated feature
+        in place of a mask, see `_occlusion_windows`.
         """
-        input_mask = torch.stack(
-            [
-                self._occlusion_mask(
-                    expanded_input,
-                    j,
-                    kwargs["sliding_window_tensors"],
-                    kwargs["strides"],
-                    kwargs["shift_counts"],
-                )
-                for j in range(start_feature, end_feature)
-            ],
-            dim=0,
-        ).long()
-        ablated_tensor = (
-            expanded_input
-            * (
-                torch.ones(1, dtype=torch.long, device=expanded_input.device)
-                - input_mask
-            ).to(expanded_input.dtype)
-        ) + (baseline * input_mask.to(expanded_input.dtype))
-        return ablated_tensor, input_mask
-
-    def _occlusion_mask(
+        windows = self._occlusion_windows(
+            start_feature,
+            end_feature,
+            kwargs["sliding_window_shapes"],
+            kwargs["strides"],
+            kwargs["shift_counts"],
+        )
+        ablated_tensor = expanded_input.clone(memory_format=torch.contiguous_format)
+        if isinstance(baseline, torch.Tensor):
+            baseline = baseline.expand(expanded_input.shape)
+        for feature, window in enumerate(windows):
+            index = (feature, slice(None)) + window
+            ablated_tensor[index] = (
+                baseline[index] if isinstance(baseline, torch.Tensor) else baseline
+            )
+        return ablated_tensor, windows
+
+    def _occlusion_windows(
         self,
-        expanded_input: Tensor,
-        ablated_feature_num: int,
-        sliding_window_tsr: Tensor,
+        start_feature: int,
+        end_feature: int,
+        sliding_window_shape: Tuple[int, ...],
         strides: Union[int, Tuple[int, ...]],
         shift_counts: Tuple[int, ...],
-    ) -> Tensor:
+    ) -> List[Tuple[slice, ...]]:
         """
-        This constructs the current occlusion mask, which is the appropriate
-        shift of the sliding window tensor based on the ablated feature number.
+        This constructs the sliding windows for the ablated feature numbers in
+        the range start_feature to end_feature, which are the appropriate shifts
+        of the sliding window based on each ablated feature number.
         The feature number ranges between 0 and the product of the shift counts
         (# of times the sliding window should be shifted in each dimension).
 
-        First, the ablated feature number is converted to the number of steps in
+        The ablated feature number is converted to the number of steps in
         each dimension from the origin, based on shift counts. This procedure
         is similar to a base conversion, with the position values equal to shift
         counts. The feature number is first taken modulo shift_counts[0] to
         get the number of shifts in the first dimension (each shift
-        by shift_count[0]), and then divided by shift_count[0].
-        The procedure is then continued for each element of shift_count. This
-        computes the total shift in each direction for the sliding window.
-
-        We then need to compute the padding required after the window in each
-        dimension, which is equal to the total input dimension minus the sliding
-        window dimension minus the (left) shift amount. We construct the
-        array pad_values which contains the left and right pad values for each
-        dimension, in reverse order of dimensions, starting from the last one.
-
-        Once these padding values are computed, we pad the sliding window tensor
-        of 1s with 0s appropriately, which is the corresponding mask,
-        and the result will match the input shape.
+        by strides[0]), and then divided by shift_counts[0].
+        The procedure is then continued for each element of shift_counts.
+
+        Each window is returned as a tuple of one slice per dimension of an
+        input example, selecting the hyperrectangle covered by the window.
         """
-        remaining_total = ablated_feature_num
-        current_index = []
-        for i, shift_count in enumerate(shift_counts):
-            stride = strides[i] if isinstance(strides, tuple) else strides
-            current_index.append((remaining_total % shift_count) * stride)
-            remaining_total = remaining_total // shift_count
+        windows = []
+        for feature_num in range(start_feature, end_feature):
+            window = []
+            for i, (shift_count, window_size) in enumerate(
+                zip(shift_counts, sliding_window_shape)
+            ):
+                stride = strides[i] if isinstance(strides, tuple) else strides
+                window_start = (feature_num % shift_count) * stride
+                feature_num = feature_num // shift_count
+                window.append(slice(window_start, window_start + window_size))
+            windows.append(tuple(window))
+        return windows
+
+    def _add_ablation_attributions(
+        self,
+        total_attrib: Tensor,
+        eval_diff: Tensor,
+        current_mask: List[Tuple[slice, ...]],
+        input_dim: int,
+    ) -> None:
+        r"""
+        Adds the output difference of each ablated feature to `total_attrib`
+        within its sliding window, given by `current_mask` as returned from
+        `_construct_ablated_input`.
+        """
+        # dimension of the ablated features in eval_diff, which is followed by
+        # the dimensions of the input
+        feature_dim = -input_dim - 1
+        if eval_diff.dim() < -feature_dim:
+            # the forward function returns a scalar, for a single ablation
+            eval_diff = eval_diff.reshape((1,) * -feature_dim)
+        for feature, window in enumerate(current_mask):
+            total_attrib[(Ellipsis, slice(None)) + window] += eval_diff.select(
+                feature_dim, feature
+            )
 
-        remaining_padding = np.subtract(
-            expanded_input.shape[2:], np.add(current_index, sliding_window_tsr.shape)
-        )
-        pad_values = [
-            val for pair in zip(remaining_padding, current_index) for val in pair
-        ]
-        pad_values.reverse()
-        padded_tensor = torch.nn.functional.pad(
-            sliding_window_tsr, tuple(pad_values)  # type: ignore
-        )
-        return padded_tensor.reshape((1,) + padded_tensor.shape)
+    def _ablation_weights(
+        self,
+        input: Tensor,
+        sliding_window_shapes: Tuple[int, ...],
+        strides: Union[int, Tuple[int, ...]],
+        shift_counts: Tuple[int, ...],
+        **kwargs: Any,
+    ) -> Tensor:
+        r"""
+        Computes the number of sliding windows containing each input position,
+        with dimension (1, input.shape[1:]). Along each dimension, this count
+        only depends on the position within that dimension, so the total count
+        is the outer product of the per-dimension counts.
+        """
+        weights = torch.ones((1,) * input.dim(), device=input.device)
+        for i, (shift_count, window_size) in enumerate(
+            zip(shift_counts, sliding_window_shapes)
+        ):
+            stride = strides[i] if isinstance(strides, tuple) else strides
+            window_start = torch.arange(shift_count, device=input.device) * stride
+            positions = torch.arange(input.shape[1 + i], device=input.device)
+            counts = (
+                (positions >= window_start.unsqueeze(1))
+                & (positions < window_start.unsqueeze(1) + window_size)
+            ).sum(dim=0)
+            weights = weights * counts.reshape(
+                (1,) * (i + 1) + (len(positions),) + (input.dim() - i - 2) * (1,)
+            )
+        return weights
 
     def _get_feature_range_and_mask(
         self, input: Tensor, input_mask: Tensor, **kwargs: Any
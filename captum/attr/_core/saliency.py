@@ -7,7 +7,7 @@ from torch import Tensor
 from captum.attr._utils.typing import TensorOrTupleOfTensors
 
 from .._utils.attribution import GradientAttribution
-from .._utils.common import _format_attributions, _format_input
+from .._utils.common import _format_attributions, _format_input, _MultiTarget
 from .._utils.gradient import apply_gradient_requirements, undo_gradient_requirements
 
 
@@ -29,6 +29,9 @@ class Saliency(GradientAttribution):
         ] = None,
         abs: bool = True,
         additional_forward_args: Any = None,
+        targets: Optional[
+            List[Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]]
+        ] = None,
     ) -> TensorOrTupleOfTensors:
         r""""
         A baseline approach for computing input attribution. It returns
@@ -90,6 +93,13 @@ class Saliency(GradientAttribution):
                             Note that attributions are not computed with respect
                             to these arguments.
                             Default: None
+                targets (list, optional): List of targets, each given in any of
+                            the forms described for `target`, for which gradients
+                            are computed from a single forward pass, with one
+                            batched backward pass over all targets. The
+                            attributions for all targets are stacked along a new
+                            first dimension. This cannot be combined with `target`.
+                            Default: None
 
         Returns:
                 *tensor* or tuple of *tensors* of **attributions**:
@@ -124,6 +134,9 @@ class Saliency(GradientAttribution):
 
         # No need to format additional_forward_args here.
         # They are being formated in the `_run_forward` function in `common.py`
+        if targets is not None:
+            assert target is None, "Only one of target and targets can be provided."
+            target = _MultiTarget(targets)
         gradients = self.gradient_func(
             self.forward_func, inputs, target, additional_forward_args
         )
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+import inspect
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import Any, Callable, Hashable, Iterator, List, Tuple, TypeVar
+
+from torch import Tensor
+from torch.nn import Module
+
+T = TypeVar("T")
+
+
+class ActivationCache:
+    r"""
+    Least recently used cache of the layer evaluations of layer and neuron
+    attribution methods, which can be shared by several attribution objects in
+    order to run a single forward pass for repeated calls on the same inputs,
+    e.g. to attribute many neurons or targets of a layer:
+
+    >>> cache = ActivationCache()
+    >>> neuron_grad = NeuronGradient(net, net.conv1, activation_cache=cache)
+    >>> # runs the forward pass once, and a backward pass for each neuron
+    >>> attributions = [
+    >>>     neuron_grad.attribute(input, (i, 0, 0)) for i in range(12)
+    >>> ]
+
+    Evaluations are keyed by the forward function, the layer, the inputs and
+    the additional forward arguments. Tensors are identified by their memory
+    and their version, which is incremented by in-place modifications, and
+    modules by the versions of their parameters and buffers and their training
+    mode. Hence entries are not reused once the inputs or the model, if the
+    forward function is a module or one of its methods, are modified in place,
+    e.g. by an optimizer step. Calls with additional forward arguments which
+    are neither tensors nor hashable are not cached.
+
+    Entries keep the autograd graph of their forward pass if it was recorded,
+    so that gradients can be computed from them repeatedly. The byte budget
+    covers both the cached tensors, i.e. the layer evaluations, the model
+    outputs and, for some methods, the expanded inputs, and the intermediate
+    results saved by their graphs. Tensors which are alive anyway, i.e. the
+    parameters of the model and the inputs identifying the entries, are not
+    counted.
+    """
+
+    def __init__(self, max_bytes: int = 2 ** 30) -> None:
+        r"""
+        Args:
+
+            max_bytes (int, optional): Maximum total size in bytes of the cached
+                        tensors and the tensors saved by their autograd graphs.
+                        Once it is exceeded, the least recently used entries
+                        are evicted. Entries larger than `max_bytes` are not
+                        cached.
+                        Default: 2 ** 30 (1 GiB)
+        """
+        assert max_bytes >= 0, "The byte budget of the cache must be non-negative."
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, List[Any], int]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        r"""
+        Removes all entries from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.num_bytes = 0
+
+    def _get_or_compute(
+        self, key_parts: Tuple, compute: Callable[[], T], identify_tensors: bool = False
+    ) -> T:
+        r"""
+        Returns the cached value for `key_parts` if any, and otherwise computes
+        it with `compute` and caches it. If `identify_tensors` is True, tensors
+        only match themselves rather than any tensor with the same memory and
+        version, e.g. if gradients are taken with respect to them.
+        """
+        return self._get_or_compute_and_is_cached(key_parts, compute, identify_tensors)[
+            0
+        ]
+
+    def _get_or_compute_and_is_cached(
+        self, key_parts: Tuple, compute: Callable[[], T], identify_tensors: bool = False
+    ) -> Tuple[T, bool]:
+        r"""
+        Same as `_get_or_compute`, but additionally returns whether the value
+        is held by the cache, i.e. whether it was found or could be added.
+        Otherwise, e.g. if the key is not hashable or the value is larger
+        than `max_bytes`, callers need not retain its autograd graph.
+        """
+        refs: List[Any] = []
+        try:
+            key = _freeze(key_parts, refs, identify_tensors)
+        except TypeError:
+            return compute(), False
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0], True
+
+        value = compute()
+        num_bytes = _num_bytes(value) + _graph_num_bytes(value, refs)
+        with self._lock:
+            if num_bytes > self.max_bytes:
+                return value, False
+            if key in self._entries:
+                # added concurrently by another thread
+                return value, False
+            # the entry keeps the objects identified by the key alive, so that
+            # their ids and memory are not reused by other objects
+            self._entries[key] = (value, refs, num_bytes)
+            self.num_bytes += num_bytes
+            while self.num_bytes > self.max_bytes:
+                _, (_, _, evicted_num_bytes) = self._entries.popitem(last=False)
+                self.num_bytes -= evicted_num_bytes
+        return value, True
+
+
+def _freeze(value: Any, refs: List[Any], identify_tensors: bool) -> Hashable:
+    r"""
+    Returns a hashable key of `value` and appends the objects it refers to
+    to `refs`. Raises a TypeError for values which cannot be keyed.
+    """
+    if isinstance(value, Tensor):
+        refs.append(value)
+        return (
+            Tensor,
+            id(value) if identify_tensors else value.data_ptr(),
+            value.device,
+            value.dtype,
+            value.shape,
+            value.stride(),
+            value._version,
+            value.requires_grad,
+        )
+    if isinstance(value, Module):
+        refs.append(value)
+        return (
+            Module,
+            id(value),
+            value.training,
+            tuple(
+                (id(tensor), tensor._version)
+                for tensor in chain(value.parameters(), value.buffers())
+            ),
+        )
+    if isinstance(value, (tuple, list)):
+        return (type(value),) + tuple(
+            _freeze(elem, refs, identify_tensors) for elem in value
+        )
+    if inspect.ismethod(value):
+        # bound methods are created anew on each access of the attribute
+        return (
+            type(value),
+            _freeze(value.__self__, refs, identify_tensors),
+            _freeze(value.__func__, refs, identify_tensors),
+        )
+    hash(value)
+    refs.append(value)
+    return (type(value), value)
+
+
+def _tensors(value: Any) -> Iterator[Tensor]:
+    r"""
+    Iterates over the tensors in `value`, which may be nested in tuples, lists
+    and dicts.
+    """
+    if isinstance(value, Tensor):
+        yield value
+    elif isinstance(value, dict):
+        yield from _tensors(tuple(value.values()))
+    elif isinstance(value, (tuple, list)):
+        for elem in value:
+            yield from _tensors(elem)
+
+
+def _num_bytes(value: Any) -> int:
+    r"""
+    Returns the total size in bytes of the distinct tensors in `value`.
+    """
+    tensors = {id(tensor): tensor for tensor in _tensors(value)}
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors.values())
+
+
+def _storage_key_and_num_bytes(tensor: Tensor) -> Tuple[Hashable, int]:
+    if hasattr(tensor, "untyped_storage"):
+        storage = tensor.untyped_storage()
+        return (tensor.device, storage.data_ptr()), storage.nbytes()
+    storage = tensor.storage()
+    return (tensor.device, storage.data_ptr()), storage.size() * tensor.element_size()
+
+
+def _graph_num_bytes(value: Any, refs: List[Any]) -> int:
+    r"""
+    Returns the total size in bytes of the distinct storages saved by the
+    autograd graphs of the tensors in `value`, which stay alive as long as
+    `value` is cached. Storages of the tensors in `value`, which are counted
+    separately, and of the tensors in `refs` and the leaf tensors of the
+    graphs, e.g. parameters, which are alive anyway, are excluded.
+    """
+    excluded = {
+        _storage_key_and_num_bytes(tensor)[0]
+        for tensor in chain(_tensors(value), _tensors(refs))
+    }
+    nodes = [tensor.grad_fn for tensor in _tensors(value)]
+    visited = set()
+    saved_storages = {}
+    while nodes:
+        node = nodes.pop()
+        if node is None or node in visited:
+            continue
+        visited.add(node)
+        # leaf tensors are referenced by their gradient accumulation nodes
+        variable = getattr(node, "variable", None)
+        if isinstance(variable, Tensor):
+            excluded.add(_storage_key_and_num_bytes(variable)[0])
+        # tensors saved for the backward pass are exposed as `_saved_*`
+        # attributes of built-in nodes and `saved_tensors` of custom functions
+        for name in dir(node):
+            if not (name.startswith("_saved_") or name == "saved_tensors"):
+                continue
+            try:
+                saved = getattr(node, name)
+            except RuntimeError:
+                continue
+            for tensor in _tensors(saved):
+                key, num_bytes = _storage_key_and_num_bytes(tensor)
+                saved_storages[key] = num_bytes
+        nodes.extend(next_node for next_node, _ in node.next_functions)
+    return sum(
+        num_bytes for key, num_bytes in saved_storages.items() if key not in excluded
+    )
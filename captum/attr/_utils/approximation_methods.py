@@ -17,23 +17,56 @@ SUPPORTED_RIEMANN_METHODS = [
     "riemann_trapezoid",
 ]
 
-SUPPORTED_METHODS = SUPPORTED_RIEMANN_METHODS + ["gausslegendre"]
+SUPPORTED_METHODS = SUPPORTED_RIEMANN_METHODS + ["gausslegendre", "clenshawcurtis"]
+
+# Methods whose integration points for `n` steps are a subset of the integration
+# points for `refined_n_steps(method, n)` steps. Refining the approximation of
+# these methods only requires evaluating the integrand at the new points.
+NESTED_METHODS = [
+    "riemann_left",
+    "riemann_right",
+    "riemann_trapezoid",
+    "clenshawcurtis",
+]
 
 
 def approximation_parameters(method):
     r"""Retrieves parameters for the input approximation `method`
 
         Args:
-            method: The name of the approximation method. Currently only `riemann`
-                    and gauss legendre are
+            method: The name of the approximation method. Currently only `riemann`,
+                    gauss legendre and clenshaw curtis are supported.
     """
     if method in SUPPORTED_RIEMANN_METHODS:
         return riemann_builders(method=Riemann[method.split("_")[-1]])
     if method == "gausslegendre":
         return gauss_legendre_builders()
+    if method == "clenshawcurtis":
+        return clenshaw_curtis_builders()
     raise ValueError("Invalid integral approximation method name: {}".format(method))
 
 
+def refined_n_steps(method, n):
+    r"""Returns the number of steps of the next refinement level of the
+    approximation `method` with `n` steps.
+
+    For the methods in `NESTED_METHODS` the alphas of the refined approximation
+    contain all alphas for `n` steps, so that integrand evaluations can be reused
+    across refinement levels. Riemann left and right sums are nested when the
+    number of steps is doubled, while the trapezoid rule and Clenshaw-Curtis
+    quadrature, which include both end points, are nested when the number of
+    intervals `n - 1` is doubled. For all other methods the number of steps is
+    doubled.
+
+        Args:
+            method: The name of the approximation method.
+            n: The current number of integration steps.
+    """
+    if method in ["riemann_trapezoid", "clenshawcurtis"]:
+        return 2 * n - 1
+    return 2 * n
+
+
 def riemann_builders(method=Riemann.trapezoid):
     r"""Step sizes are identical and alphas are scaled in [0, 1]
 
@@ -123,3 +156,54 @@ def gauss_legendre_builders():
         return list(0.5 * (1 + np.polynomial.legendre.leggauss(n)[0]))
 
     return step_sizes, alphas
+
+
+def clenshaw_curtis_builders():
+    r"""Computes step sizes and alpha coefficients using the Clenshaw-Curtis
+    quadrature rule, with the integration points at the extrema of the Chebyshev
+    polynomials. Similar to gauss-legendre, the integration parameters are
+    rescaled from [-1, 1] to [0, 1].
+
+    Clenshaw-Curtis quadrature has a comparable accuracy to gauss-legendre for
+    smooth integrands, however, its integration points for `n` steps are
+    contained in the points for `2 * n - 1` steps. This allows refining the
+    approximation by reusing all previous evaluations of the integrand.
+
+    Args:
+
+        n (int): The number of integration steps
+
+    Returns:
+        2-element tuple of **step_sizes**, **alphas**:
+        - **step_sizes** (*callable*):
+                    `step_sizes` takes the number of steps as an
+                    input argument and returns an array of steps sizes which
+                    sum is equal to one.
+
+        - **alphas** (*callable*):
+                    `alphas` takes the number of steps as an input argument
+                    and returns the multipliers/coefficients for the inputs
+                    of integrand in the range of [0, 1]
+
+    """
+
+    def step_sizes(n):
+        assert n > 1, "The number of steps has to be larger than one"
+        num_intervals = n - 1
+        theta = np.pi * np.arange(n) / num_intervals
+        weights = np.ones(n)
+        for j in range(1, num_intervals // 2 + 1):
+            b = 1.0 if 2 * j == num_intervals else 2.0
+            weights -= b * np.cos(2 * j * theta) / (4 * j * j - 1)
+        weights *= 2.0 / num_intervals
+        weights[0] /= 2
+        weights[-1] /= 2
+        # Scaling from 2 to 1
+        return list(0.5 * weights)
+
+    def alphas(n):
+        assert n > 1, "The number of steps has to be larger than one"
+        # Scaling from [-1, 1] to [0, 1]
+        return list(0.5 * (1 - np.cos(np.pi * np.arange(n) / (n - 1))))
+
+    return step_sizes, alphas
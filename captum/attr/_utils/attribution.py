@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+from functools import partial
 from typing import Callable
 
 import torch
@@ -140,18 +141,56 @@ class GradientAttribution(Attribution):
     All gradient based attribution algorithms extend this class. It requires a
     forward function, which most commonly is the forward function of the model
     that we want to interpret or the model itself.
+
+    The gradients of all examples in a batch are computed with a single
+    backward pass of the summed outputs, which assumes that the output of an
+    example does not depend on the other examples. Models with interactions
+    between examples, such as BatchNorm in train mode, silently yield wrong
+    gradients then. Setting the `check_batch_independence` attribute of any
+    gradient based algorithm to True, e.g.
+    `IntegratedGradients(model).check_batch_independence = True`, verifies
+    this with an additional backward pass and raises an AssertionError
+    otherwise.
     """
 
-    def __init__(self, forward_func):
+    # class attribute, such that subclasses which do not call the constructor
+    # do not check the batch independence
+    check_batch_independence = False
+
+    def __init__(self, forward_func, check_batch_independence=False):
         r"""
         Args:
 
             forward_func (callable or torch.nn.Module): This can either be an instance
                         of pytorch model or any modification of model's forward
                         function.
+            check_batch_independence (bool, optional): If True, verifies that
+                        the output of each example does not depend on the
+                        other examples in the batch, e.g. through BatchNorm in
+                        train mode, whenever gradients of the model are computed
+                        by `gradient_func` or with respect to a layer, at the
+                        cost of an additional backward pass.
+                        Default: False
         """
         Attribution.__init__(self, forward_func)
         self.gradient_func = compute_gradients
+        self.check_batch_independence = check_batch_independence
+
+    @property
+    def gradient_func(self):
+        r"""
+        The function computing the gradients of the forward function with
+        respect to its inputs, `compute_gradients` unless it is replaced. The
+        default function checks the batch independence if
+        `check_batch_independence` is set.
+        """
+        if self._gradient_func is compute_gradients and self.check_batch_independence:
+            return partial(compute_gradients, check_batch_independence=True)
+        return self._gradient_func
+
+    @gradient_func.setter
+    def gradient_func(self, gradient_func):
+        self._gradient_func = gradient_func
 
     def compute_convergence_delta(
         self,
@@ -160,6 +199,8 @@ class GradientAttribution(Attribution):
         end_point,
         target=None,
         additional_forward_args=None,
+        start_point_output=None,
+        end_point_output=None,
     ):
         r"""
         Here we provide a specific implementation for `compute_convergence_delta`
@@ -235,6 +276,19 @@ class GradientAttribution(Attribution):
                             `additional_forward_args` is used both for `start_point`
                             and `end_point` when computing the forward pass.
                             Default: None
+                start_point_output (tensor, optional): The output of the
+                            forward function at `start_point` for the given
+                            `target`, if it has already been evaluated, e.g.
+                            during the computation of the attributions. If
+                            provided, the forward pass at `start_point` is
+                            skipped.
+                            Default: None
+                end_point_output (tensor, optional): The output of the
+                            forward function at `end_point` for the given
+                            `target`, if it has already been evaluated. If
+                            provided, the forward pass at `end_point` is
+                            skipped.
+                            Default: None
 
         Returns:
 
@@ -272,17 +326,16 @@ class GradientAttribution(Attribution):
             return input.view(input.shape[0], -1).sum(1)
 
         with torch.no_grad():
-            start_point = _sum_rows(
-                _run_forward(
+            if start_point_output is None:
+                start_point_output = _run_forward(
                     self.forward_func, start_point, target, additional_forward_args
                 )
-            )
-
-            end_point = _sum_rows(
-                _run_forward(
+            if end_point_output is None:
+                end_point_output = _run_forward(
                     self.forward_func, end_point, target, additional_forward_args
                 )
-            )
+            start_point = _sum_rows(start_point_output)
+            end_point = _sum_rows(end_point_output)
             row_sums = [_sum_rows(attribution) for attribution in attributions]
             attr_sum = torch.stack([sum(row_sum) for row_sum in zip(*row_sums)])
             return attr_sum - (end_point - start_point)
@@ -1,9 +1,254 @@
 #!/usr/bin/env python3
+import inspect
+import queue
+import threading
+import time
+import warnings
+import weakref
+from contextlib import contextmanager
+
 import torch
+from torch.nn import Module
+from torch.nn.modules.module import register_module_forward_hook
 
+from .activation_cache import _storage_key_and_num_bytes
+from .approximation_methods import approximation_parameters
 from .common import _format_input, _format_additional_forward_args
 
 
+def _batch_attribution(
+    attr_method, num_examples, internal_batch_size, n_steps, **kwargs
+):
+    """
+    This method applies internal batching to given attribution method, dividing
+    computation into batches of size internal_batch_size. It does so by
+    dividing the n_steps of the integral approximation into chunks of
+    internal_batch_size // num_examples steps. Scaled inputs are only
+    constructed for the steps in the current chunk, and the attributions of
+    each chunk are summed into a running total, so that at most
+    internal_batch_size evaluations are held in memory at any time.
+
+    This is only applicable for attribution methods whose attributions
+    are linear in the gradients evaluated at each step, such as integrated
+    gradients. The attribution method must implement `_attribute` which takes
+    `n_steps` and `step_sizes_and_alphas` in addition to `kwargs`.
+    """
+    if internal_batch_size < num_examples:
+        warnings.warn(
+            "Internal batch size cannot be less than the number of input examples. "
+            "Defaulting to internal batch size of %d equal to the number of examples."
+            % num_examples
+        )
+    # Number of steps for each batch
+    step_count = max(1, internal_batch_size // num_examples)
+
+    step_sizes_func, alphas_func = approximation_parameters(kwargs["method"])
+    full_step_sizes, full_alphas = step_sizes_func(n_steps), alphas_func(n_steps)
+
+    total_attr = None
+    cumulative_steps = 0
+    while cumulative_steps < n_steps:
+        start_step = cumulative_steps
+        end_step = min(start_step + step_count, n_steps)
+        batch_steps = end_step - start_step
+
+        step_sizes = full_step_sizes[start_step:end_step]
+        alphas = full_alphas[start_step:end_step]
+        current_attr = attr_method._attribute(
+            **kwargs, n_steps=batch_steps, step_sizes_and_alphas=(step_sizes, alphas)
+        )
+
+        if total_attr is None:
+            total_attr = current_attr
+        else:
+            total_attr = tuple(
+                current + prev_total
+                for current, prev_total in zip(current_attr, total_attr)
+            )
+        cumulative_steps = end_step
+    return total_attr
+
+
+# Hooks on the tensors saved for the backward pass, available since PyTorch 1.10
+_saved_tensors_hooks = getattr(
+    getattr(torch.autograd, "graph", None), "saved_tensors_hooks", None
+)
+if _saved_tensors_hooks is None:
+
+    @contextmanager
+    def _saved_tensors_hooks(pack_hook, unpack_hook):
+        yield
+
+
+# Batch sizes chosen by _tune_batch_size, cached per model.
+_tuned_batch_sizes = weakref.WeakKeyDictionary()  # type: ignore
+
+# Probing larger batch sizes stops once the throughput did not improve by at
+# least _MIN_THROUGHPUT_GAIN over the best throughput for _MAX_PROBES_WITHOUT_GAIN
+# consecutive batch sizes, so that a single noisy timing does not end probing.
+_MIN_THROUGHPUT_GAIN = 1.1
+_MAX_PROBES_WITHOUT_GAIN = 2
+
+
+def _probed_model(forward_func):
+    """
+    Returns the module evaluated by forward_func, if it is a module or a method
+    of a module, and None otherwise.
+    """
+    if isinstance(forward_func, Module):
+        return forward_func
+    if inspect.ismethod(forward_func) and isinstance(forward_func.__self__, Module):
+        return forward_func.__self__
+    return None
+
+
+def _peak_memory_and_time(probe, batch_size, device, model):
+    """
+    Calls probe(batch_size) and returns the peak memory in bytes allocated
+    during the call together with the elapsed time in seconds.
+    On CUDA devices, the peak is read from the statistics of the caching
+    allocator. Other devices expose no such statistics, so the peak is
+    estimated from the forward calls of model and its submodules made by the
+    calling thread during the probe, assuming that all of the following are
+    kept alive: the outputs of the calls, the tensors saved by autograd for
+    the backward pass, except for the parameters of model, and the gradients
+    of the outputs computed by backward passes. If model is None, all modules
+    called by the calling thread are counted instead. The peak memory is None
+    if no module was called, since it cannot be estimated then.
+    """
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+        torch.cuda.reset_peak_memory_stats(device)
+        start_memory = torch.cuda.memory_allocated(device)
+        start_time = time.perf_counter()
+        probe(batch_size)
+        torch.cuda.synchronize(device)
+        elapsed = time.perf_counter() - start_time
+        return torch.cuda.max_memory_allocated(device) - start_memory, elapsed
+
+    probing_thread = threading.get_ident()
+    # sizes of the counted storages, such that tensors sharing memory, e.g.
+    # module outputs saved for the backward pass, are only counted once
+    storage_bytes = {}
+    grad_bytes = [0]
+    num_calls = [0]
+    excluded = set()
+    if model is not None:
+        excluded.update(
+            _storage_key_and_num_bytes(param)[0] for param in model.parameters()
+        )
+
+    def count_storage(tensor):
+        key, num_bytes = _storage_key_and_num_bytes(tensor)
+        if key not in excluded:
+            storage_bytes[key] = num_bytes
+
+    def count_grad(grad):
+        grad_bytes[0] += grad.numel() * grad.element_size()
+
+    def count_activations(module, inp, out):
+        # other threads may evaluate the same modules concurrently
+        if threading.get_ident() != probing_thread:
+            return
+        num_calls[0] += 1
+        for tensor in out if isinstance(out, tuple) else (out,):
+            if isinstance(tensor, torch.Tensor):
+                count_storage(tensor)
+                if tensor.requires_grad:
+                    tensor.register_hook(count_grad)
+
+    def pack_saved_tensor(tensor):
+        # saved tensor hooks are local to the calling thread
+        count_storage(tensor)
+        return tensor
+
+    if model is not None:
+        handles = [
+            module.register_forward_hook(count_activations)
+            for module in model.modules()
+        ]
+    else:
+        handles = [register_module_forward_hook(count_activations)]
+    try:
+        with _saved_tensors_hooks(pack_saved_tensor, lambda tensor: tensor):
+            start_time = time.perf_counter()
+            probe(batch_size)
+            elapsed = time.perf_counter() - start_time
+    finally:
+        for handle in handles:
+            handle.remove()
+    if num_calls[0] == 0:
+        return None, elapsed
+    return sum(storage_bytes.values()) + grad_bytes[0], elapsed
+
+
+def _tune_batch_size(forward_func, key, probe, max_batch_size, memory_budget, device):
+    """
+    Returns the largest batch size, at most max_batch_size, for which running
+    probe(batch_size), which evaluates forward_func, stays within memory_budget
+    bytes of peak memory. Batch sizes are probed by doubling, starting from 1.
+    Probing stops early once the throughput (batch size per second) stopped
+    increasing noticeably for several consecutive batch sizes, since larger
+    batches then only take up more memory without keeping the device any
+    busier. If even a batch size of 1 exceeds the budget, or its peak memory
+    cannot be estimated, 1 is returned with a warning.
+
+    The chosen batch size is cached per model, i.e. forward_func or the object
+    it is a method of, and key, which should identify the attribution method
+    and the input shapes, so that only the first call for a given configuration
+    pays for probing, also across attribution instances.
+    """
+    assert memory_budget > 0, "Memory budget must be a positive number of bytes."
+    if inspect.ismethod(forward_func):
+        owner, key = forward_func.__self__, (forward_func.__func__,) + key
+    else:
+        owner = forward_func
+    key = key + (device, memory_budget, max_batch_size)
+    try:
+        cache = _tuned_batch_sizes.setdefault(owner, {})
+    except TypeError:
+        # forward functions which cannot be weakly referenced are not cached
+        cache = {}
+    if key in cache:
+        return cache[key]
+
+    model = _probed_model(forward_func)
+    chosen_batch_size, best_throughput, probes_without_gain = 1, 0.0, 0
+    batch_size = 1
+    while True:
+        peak_memory, elapsed = _peak_memory_and_time(probe, batch_size, device, model)
+        if peak_memory is None:
+            warnings.warn(
+                "The peak memory of the forward function cannot be estimated on "
+                "device %s, since it does not call any modules. Defaulting to a "
+                "batch size of 1." % device
+            )
+            chosen_batch_size = 1
+            break
+        if peak_memory > memory_budget:
+            if batch_size == 1:
+                warnings.warn(
+                    "A batch size of 1 requires %d bytes, which exceeds the memory "
+                    "budget of %d bytes. Defaulting to a batch size of 1."
+                    % (peak_memory, memory_budget)
+                )
+            break
+        chosen_batch_size = batch_size
+        throughput = batch_size / max(elapsed, 1e-9)
+        if throughput >= _MIN_THROUGHPUT_GAIN * best_throughput:
+            best_throughput, probes_without_gain = throughput, 0
+        else:
+            probes_without_gain += 1
+            if probes_without_gain >= _MAX_PROBES_WITHOUT_GAIN:
+                break
+        if batch_size >= max_batch_size:
+            break
+        batch_size = min(2 * batch_size, max_batch_size)
+
+    cache[key] = chosen_batch_size
+    return chosen_batch_size
+
+
 def _tuple_splice_range(inputs, start, end):
     """
     Splices each tensor element of given tuple (inputs) from range start
@@ -72,6 +317,57 @@ def _sort_key_list(keys, device_ids=None):
     return out_list
 
 
+def _prefetched(iterable, max_prefetch):
+    r"""
+    Iterates over `iterable`, whose items are produced by a background thread
+    up to `max_prefetch` items ahead of the consumer, so that e.g. constructing
+    the next batch overlaps with evaluating the current one. The items must not
+    be modified by `iterable` after they are produced. Gradients are enabled in
+    the background thread if and only if they are enabled in the calling
+    thread, and exceptions raised by `iterable` are re-raised in the calling
+    thread.
+    """
+    items: queue.Queue = queue.Queue(maxsize=max_prefetch)
+    stopped = threading.Event()
+    end = object()
+    grad_enabled = torch.is_grad_enabled()
+
+    def put(item):
+        # Waits for a free slot unless the consumer stopped iterating
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            with torch.autograd.set_grad_enabled(grad_enabled):
+                for item in iterable:
+                    if not put((item, None)):
+                        return
+        except BaseException as e:
+            put((end, e))
+            return
+        put((end, None))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is end:
+                return
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
+
+
 def _batched_generator(
     inputs, additional_forward_args=None, target_ind=None, internal_batch_size=None
 ):
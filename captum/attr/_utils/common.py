@@ -4,10 +4,11 @@ from typing import Optional, Tuple, Union, overload
 import torch
 from torch import Tensor
 
+import weakref
 from enum import Enum
-from inspect import signature
+from inspect import ismethod, signature
 
-from .approximation_methods import SUPPORTED_METHODS
+from .approximation_methods import NESTED_METHODS, SUPPORTED_METHODS, refined_n_steps
 
 
 class ExpansionTypes(Enum):
@@ -15,6 +16,25 @@ class ExpansionTypes(Enum):
     repeat_interleave = 2
 
 
+class _MultiTarget:
+    r"""
+    Multiple targets, each of which may be given in any of the forms supported
+    for a single target, which are selected from the same output of the forward
+    function. The selected outputs of all targets are stacked along a new first
+    dimension, see `_select_targets`.
+    """
+
+    def __init__(self, targets):
+        self.targets = list(targets)
+        assert len(self.targets) > 0, "At least one target must be provided."
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __iter__(self):
+        return iter(self.targets)
+
+
 def safe_div(denom, quotient, default_value=None):
     r"""
         A simple utility function to perform `denom / quotient`
@@ -247,6 +267,8 @@ def _compute_conv_delta_and_format_attrs(
     additional_forward_args,
     target,
     is_inputs_tuple=False,
+    start_point_output=None,
+    end_point_output=None,
 ):
     if return_convergence_delta:
         # computes convergence error
@@ -256,12 +278,170 @@ def _compute_conv_delta_and_format_attrs(
             end_point,
             additional_forward_args=additional_forward_args,
             target=target,
+            start_point_output=start_point_output,
+            end_point_output=end_point_output,
         )
         return _format_attributions(is_inputs_tuple, attributions), delta
     else:
         return _format_attributions(is_inputs_tuple, attributions)
 
 
+def _select_examples(values, indices, num_examples):
+    r"""
+    Selects the examples at `indices` (a 1D long tensor) from each element of
+    the tuple `values`. Only tensors whose first dimension matches
+    `num_examples` are indexed; scalars, single-example tensors and other
+    arbitrary python types are shared by all examples and left unchanged.
+    """
+    if values is None:
+        return None
+    return tuple(
+        value[indices.to(value.device)]
+        if isinstance(value, torch.Tensor)
+        and len(value.shape) > 0
+        and value.shape[0] == num_examples
+        else value
+        for value in values
+    )
+
+
+def _select_target(target, indices):
+    r"""
+    Selects the targets corresponding to the examples at `indices` (a 1D long
+    tensor). Targets that are shared by all examples are returned unchanged.
+    """
+    if isinstance(target, list):
+        return [target[i] for i in indices.tolist()]
+    if isinstance(target, torch.Tensor) and torch.numel(target) > 1:
+        return target[indices.to(target.device)]
+    return target
+
+
+def _refine_attributions_until_converged(
+    attr_algo,
+    attribute_fn,
+    inputs,
+    baselines,
+    target,
+    additional_forward_args,
+    n_steps,
+    method,
+    max_n_steps,
+    convergence_tolerance,
+    endpoint_outputs=None,
+):
+    r"""
+    Computes attributions with `attribute_fn` using `n_steps` and afterwards
+    repeatedly refines the approximation `method` (see `refined_n_steps`),
+    recomputing the attributions only for the examples whose absolute
+    convergence delta exceeds `convergence_tolerance`. This continues until
+    all examples converge or `max_n_steps` is reached. Nested methods (see
+    `NESTED_METHODS`) stop at the last refinement level not exceeding
+    `max_n_steps`, so that their alphas stay nested, while the number of steps
+    of all other methods is clipped to `max_n_steps`.
+
+    `attribute_fn` takes `inputs`, `baselines`, `target`,
+    `additional_forward_args`, `n_steps` and `indices` and returns a tuple of
+    attribution tensors, whose first dimension corresponds to the number of
+    examples. `indices` is None for the initial approximation, and a 1D long
+    tensor containing the positions of the refined examples in the original
+    batch otherwise. The set of refined examples only shrinks across
+    refinements, which allows `attribute_fn` to reuse integrand evaluations
+    of previous refinements of nested approximation methods.
+    `inputs` and `baselines` are expected to be formatted as tuples.
+
+    The outputs of the forward function at `baselines` and `inputs`, which are
+    needed for the convergence delta, are only evaluated once and reused for
+    all refinements. `endpoint_outputs` is an optional dict, which
+    `attribute_fn` can fill with the outputs at alpha 0 (`baselines`) and
+    alpha 1 (`inputs`) for the given `target` during the initial
+    approximation, if it evaluates them anyway. Missing outputs are computed
+    with an additional forward pass.
+
+    Returns a 2-element tuple of attributions and the convergence delta per
+    example.
+    """
+    assert max_n_steps >= n_steps, (
+        "The maximum number of steps must be at least equal to the initial "
+        "number of steps. Given n_steps: {} and max_n_steps: {}".format(
+            n_steps, max_n_steps
+        )
+    )
+    num_examples = inputs[0].shape[0]
+    if endpoint_outputs is None:
+        endpoint_outputs = {}
+
+    attributions = attribute_fn(
+        inputs, baselines, target, additional_forward_args, n_steps, None
+    )
+    with torch.no_grad():
+        for alpha, point in ((0, baselines), (1, inputs)):
+            if alpha not in endpoint_outputs:
+                endpoint_outputs[alpha] = _run_forward(
+                    attr_algo.forward_func,
+                    _tensorize_baseline(inputs, point),
+                    target,
+                    additional_forward_args,
+                )
+    start_output, end_output = endpoint_outputs[0], endpoint_outputs[1]
+    delta = attr_algo.compute_convergence_delta(
+        attributions,
+        baselines,
+        inputs,
+        target=target,
+        additional_forward_args=additional_forward_args,
+        start_point_output=start_output,
+        end_point_output=end_output,
+    )
+    while n_steps < max_n_steps:
+        indices = torch.nonzero(delta.abs() > convergence_tolerance).view(-1)
+        if indices.numel() == 0:
+            break
+        next_n_steps = refined_n_steps(method, n_steps)
+        if next_n_steps > max_n_steps:
+            if method in NESTED_METHODS:
+                break
+            next_n_steps = max_n_steps
+        n_steps = next_n_steps
+
+        refined_inputs = _select_examples(inputs, indices, num_examples)
+        refined_baselines = _select_examples(baselines, indices, num_examples)
+        refined_target = _select_target(target, indices)
+        refined_additional_args = _select_examples(
+            additional_forward_args, indices, num_examples
+        )
+        refined_attributions = attribute_fn(
+            refined_inputs,
+            refined_baselines,
+            refined_target,
+            refined_additional_args,
+            n_steps,
+            indices,
+        )
+        refined_start_output, refined_end_output = _select_examples(
+            (start_output, end_output), indices, num_examples
+        )
+        refined_delta = attr_algo.compute_convergence_delta(
+            refined_attributions,
+            refined_baselines,
+            refined_inputs,
+            target=refined_target,
+            additional_forward_args=refined_additional_args,
+            start_point_output=refined_start_output,
+            end_point_output=refined_end_output,
+        )
+        attributions = tuple(
+            attribution.index_copy(
+                0, indices.to(attribution.device), refined_attribution
+            )
+            for attribution, refined_attribution in zip(
+                attributions, refined_attributions
+            )
+        )
+        delta = delta.index_copy(0, indices.to(delta.device), refined_delta)
+    return attributions, delta
+
+
 def _zeros(inputs):
     r"""
     Takes a tuple of tensors as input and returns a tuple that has the same
@@ -314,7 +494,15 @@ def _select_targets(output, target):
 
     num_examples = output.shape[0]
     dims = len(output.shape)
-    if isinstance(target, (int, tuple)):
+    if isinstance(target, _MultiTarget):
+        selected = [_select_targets(output, single_target) for single_target in target]
+        assert all(
+            single_selected.numel() == num_examples for single_selected in selected
+        ), "Each of multiple targets must identify a single output per example."
+        return torch.stack(
+            [single_selected.reshape(num_examples) for single_selected in selected]
+        )
+    elif isinstance(target, (int, tuple)):
         return _verify_select_column(output, target)
     elif isinstance(target, torch.Tensor):
         if torch.numel(target) == 1 and isinstance(target.item(), int):
@@ -342,9 +530,33 @@ def _select_targets(output, target):
         raise AssertionError("Target type %r is not valid." % target)
 
 
+# Whether forward functions take any arguments, cached since inspecting their
+# signature on every forward call is comparatively slow. Bound methods are
+# created anew on each attribute access, so they are cached by their function.
+_forward_func_takes_args = weakref.WeakKeyDictionary()  # type: ignore
+_forward_method_takes_args = weakref.WeakKeyDictionary()  # type: ignore
+
+
+def _takes_args(forward_func):
+    if ismethod(forward_func):
+        cache, key = _forward_method_takes_args, forward_func.__func__
+    else:
+        cache, key = _forward_func_takes_args, forward_func
+    try:
+        return cache[key]
+    except (KeyError, TypeError):
+        pass
+    takes_args = len(signature(forward_func).parameters) > 0
+    try:
+        cache[key] = takes_args
+    except TypeError:
+        # forward functions which cannot be weakly referenced are not cached
+        pass
+    return takes_args
+
+
 def _run_forward(forward_func, inputs, target=None, additional_forward_args=None):
-    forward_func_args = signature(forward_func).parameters
-    if len(forward_func_args) == 0:
+    if not _takes_args(forward_func):
         output = forward_func()
         return output if target is None else _select_targets(output, target)
 
@@ -361,6 +573,32 @@ def _run_forward(forward_func, inputs, target=None, additional_forward_args=None
     return _select_targets(output, target)
 
 
+def _autocast_forward_func(forward_func, autocast_dtype, device_type):
+    r"""
+    Returns `forward_func` if `autocast_dtype` is None, and otherwise a wrapper
+    which runs it under `torch.autocast` for `device_type` with the reduced
+    precision `autocast_dtype`, e.g. torch.bfloat16 on CPU. Floating point
+    outputs are cast back to float32, so that gradients with respect to float32
+    inputs, and everything computed from them, remain in float32.
+    """
+    if autocast_dtype is None:
+        return forward_func
+    assert hasattr(torch, "autocast"), "Autocast requires PyTorch 1.10 or later."
+
+    def forward_fn(*args):
+        with torch.autocast(device_type, dtype=autocast_dtype):
+            output = forward_func(*args)
+        if isinstance(output, Tensor) and output.is_floating_point():
+            return output.float()
+        return output
+
+    if not _takes_args(forward_func):
+        return lambda: forward_fn()
+    if hasattr(forward_func, "device_ids"):
+        forward_fn.device_ids = forward_func.device_ids
+    return forward_fn
+
+
 def _expand_additional_forward_args(
     additional_forward_args, n_steps, expansion_type=ExpansionTypes.repeat
 ):
@@ -391,7 +629,12 @@ def _expand_additional_forward_args(
 
 
 def _expand_target(target, n_steps, expansion_type=ExpansionTypes.repeat):
-    if isinstance(target, list):
+    if isinstance(target, _MultiTarget):
+        return _MultiTarget(
+            _expand_target(single_target, n_steps, expansion_type)
+            for single_target in target
+        )
+    elif isinstance(target, list):
         if expansion_type == ExpansionTypes.repeat:
             return target * n_steps
         elif expansion_type == ExpansionTypes.repeat_interleave:
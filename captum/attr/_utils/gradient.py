@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import inspect
 import threading
 import warnings
 from typing import Any, List, Optional, Tuple, Union
@@ -9,7 +10,8 @@ from torch.nn import Module
 from captum.attr._utils.typing import TensorOrTupleOfTensors
 
 from .batching import _reduce_list, _sort_key_list
-from .common import _run_forward, _verify_select_column
+from .common import _MultiTarget, _run_forward, _select_targets, _verify_select_column
+from .hooks import _attribution_call, _call_scoped
 
 
 def apply_gradient_requirements(inputs):
@@ -66,6 +68,89 @@ def undo_gradient_requirements(inputs, grad_required):
             input.requires_grad_(False)
 
 
+# torch.autograd.grad supports batched grad_outputs since PyTorch 1.11
+_supports_batched_grads = (
+    "is_grads_batched" in inspect.signature(torch.autograd.grad).parameters
+)
+
+
+def _check_batch_independence(outputs: Tensor, inputs: Tuple[Tensor, ...]) -> None:
+    r"""
+    Verifies that the output of the first example does not depend on the other
+    examples of the batch, i.e. that its gradient with respect to each of the
+    batched `inputs` is zero outside of the first example. This is not the case
+    for models with interactions between examples, such as BatchNorm in train
+    mode, for which the gradients of the summed outputs mix examples.
+    """
+    num_examples = outputs.numel()
+    first_example_grads = torch.autograd.grad(
+        outputs.reshape(-1)[0], inputs, retain_graph=True, allow_unused=True
+    )
+    for grad in first_example_grads:
+        if grad is None or grad.dim() == 0 or grad.shape[0] != num_examples:
+            continue
+        assert torch.all(grad[1:] == 0), (
+            "The output of an example depends on other examples in the batch, "
+            "so that per-example gradients cannot be computed in a batch. "
+            "Models with interactions between examples, such as BatchNorm, "
+            "should be put in eval mode."
+        )
+
+
+def _sum_gradients(
+    outputs: Tensor,
+    inputs: Tuple[Tensor, ...],
+    check_batch_independence: bool = False,
+    retain_graph: bool = False,
+) -> Tuple[Tensor, ...]:
+    r"""
+    Computes the gradients of the sum of `outputs` with respect to `inputs`
+    with a single backward pass. Since examples are independent, the gradients
+    with respect to each example's inputs are the gradients of its own output.
+    If `check_batch_independence` is True, this is verified with an additional
+    backward pass for the first example. The graph is kept for further backward
+    passes if `retain_graph` is True, e.g. if its evaluations are cached.
+    """
+    if check_batch_independence:
+        _check_batch_independence(outputs, inputs)
+    return torch.autograd.grad(torch.sum(outputs), inputs, retain_graph=retain_graph)
+
+
+def _multi_target_gradients(
+    outputs: Tensor, inputs: Tuple[Tensor, ...]
+) -> Tuple[Tensor, ...]:
+    r"""
+    Computes the gradients of each row of `outputs`, which contains the outputs
+    of one target for each example, with respect to `inputs`, stacked along a
+    new first dimension. All targets share the graph of a single forward pass,
+    and their gradients are computed by a single batched backward pass of
+    one-hot vectors, i.e. vector-Jacobian products, if supported by PyTorch.
+    """
+    num_targets = outputs.shape[0]
+    if not _supports_batched_grads:
+        return tuple(
+            torch.stack(grads)
+            for grads in zip(
+                *(
+                    torch.autograd.grad(
+                        torch.sum(outputs[t]), inputs, retain_graph=t < num_targets - 1,
+                    )
+                    for t in range(num_targets)
+                )
+            )
+        )
+    grad_outputs = (
+        torch.eye(num_targets, dtype=outputs.dtype, device=outputs.device)
+        .unsqueeze(-1)
+        .expand(num_targets, num_targets, outputs.shape[1])
+    )
+    with warnings.catch_warnings():
+        # vmap warns about operators without batching rules, whose gradients
+        # are computed in a loop instead
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.autograd.grad(outputs, inputs, grad_outputs, is_grads_batched=True)
+
+
 def compute_gradients(
     forward_fn: Module,
     inputs: TensorOrTupleOfTensors,
@@ -73,6 +158,7 @@ def compute_gradients(
         Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]
     ] = None,
     additional_forward_args: Any = None,
+    check_batch_independence: bool = False,
 ) -> Tuple[Tensor, ...]:
     r"""
         Computes gradients of the output with respect to inputs for an
@@ -89,21 +175,32 @@ def compute_gradients(
             additional_forward_args: Additional input arguments that forward
                         function requires. It takes an empty tuple (no additional
                         arguments) if no additional arguments are required
+            check_batch_independence: If True, verifies that the output of an
+                        example does not depend on other examples in the batch,
+                        e.g. through BatchNorm in train mode, at the cost of an
+                        additional backward pass. Gradient based attribution
+                        methods pass their `check_batch_independence`.
     """
     with torch.autograd.set_grad_enabled(True):
         # runs forward pass
         outputs = _run_forward(forward_fn, inputs, target_ind, additional_forward_args)
+        if isinstance(target_ind, _MultiTarget):
+            # outputs contain #targets x batch_size scalars, and the gradients
+            # of each target are stacked along the first dimension
+            return _multi_target_gradients(outputs, inputs)
         assert outputs[0].numel() == 1, (
             "Target not provided when necessary, cannot"
             " take gradient with respect to multiple outputs."
         )
-        # torch.unbind(forward_out) is a list of scalar tensor tuples and
-        # contains batch_size * #steps elements
-        grads = torch.autograd.grad(torch.unbind(outputs), inputs)
+        # outputs contain batch_size * #steps scalars, whose gradients are
+        # computed at once by differentiating their sum
+        grads = _sum_gradients(outputs, inputs, check_batch_independence)
     return grads
 
 
-def _neuron_gradients(inputs, saved_layer, key_list, gradient_neuron_index):
+def _neuron_gradients(
+    inputs, saved_layer, key_list, gradient_neuron_index, retain_graph=False
+):
     with torch.autograd.set_grad_enabled(True):
         gradient_tensors = []
         for key in key_list:
@@ -112,11 +209,10 @@ def _neuron_gradients(inputs, saved_layer, key_list, gradient_neuron_index):
             ), "Cannot compute neuron gradients for layer with multiple tensors."
             current_out_tensor = saved_layer[key][0]
             gradient_tensors.append(
-                torch.autograd.grad(
-                    torch.unbind(
-                        _verify_select_column(current_out_tensor, gradient_neuron_index)
-                    ),
+                _sum_gradients(
+                    _verify_select_column(current_out_tensor, gradient_neuron_index),
                     inputs,
+                    retain_graph=retain_graph,
                 )
             )
         return _reduce_list(gradient_tensors, sum)
@@ -129,6 +225,7 @@ def _forward_layer_eval(
     additional_forward_args=None,
     device_ids=None,
     attribute_to_layer_input=False,
+    activation_cache=None,
 ):
     return _forward_layer_eval_with_neuron_grads(
         forward_fn,
@@ -138,6 +235,7 @@ def _forward_layer_eval(
         gradient_neuron_index=None,
         device_ids=device_ids,
         attribute_to_layer_input=attribute_to_layer_input,
+        activation_cache=activation_cache,
     )
 
 
@@ -149,6 +247,9 @@ def _forward_layer_distributed_eval(
     additional_forward_args=None,
     attribute_to_layer_input=False,
     forward_hook_with_return=False,
+    activation_cache=None,
+    identify_inputs=False,
+    return_is_cached=False,
 ):
     r"""
     A helper function that allows to set a hook on model's `layer`, run the forward
@@ -159,7 +260,42 @@ def _forward_layer_distributed_eval(
     `attribute_to_layer_input` to True or False.
     This is especially useful when we execute forward pass in a distributed setting,
     using `DataParallel`s for example.
+
+    If `activation_cache` is given, the results are looked up in and added to it,
+    and the targets are selected from the cached output of the forward function.
+    `identify_inputs` must be True if gradients are taken with respect to the
+    inputs, which then only match cached results of the same tensors.
+    If `return_is_cached` is True, whether the results are held by
+    `activation_cache` is returned as well, in which case their graph must be
+    retained by backward passes through it.
     """
+    if activation_cache is not None:
+        evals, is_cached = activation_cache._get_or_compute_and_is_cached(
+            (
+                "layer_eval",
+                forward_fn,
+                layer,
+                inputs,
+                additional_forward_args,
+                attribute_to_layer_input,
+                forward_hook_with_return,
+                torch.is_grad_enabled(),
+            ),
+            lambda: _forward_layer_distributed_eval(
+                forward_fn,
+                inputs,
+                layer,
+                additional_forward_args=additional_forward_args,
+                attribute_to_layer_input=attribute_to_layer_input,
+                forward_hook_with_return=forward_hook_with_return,
+            ),
+            identify_tensors=identify_inputs,
+        )
+        if forward_hook_with_return:
+            saved_layer, output, is_eval_tuple = evals
+            evals = saved_layer, _select_targets(output, target_ind), is_eval_tuple
+        return (evals, is_cached) if return_is_cached else evals
+
     saved_layer = {}
     is_eval_tuple = None
     lock = threading.Lock()
@@ -190,24 +326,32 @@ def _forward_layer_distributed_eval(
                     eval_tsr.clone() for eval_tsr in eval_tsrs
                 )
 
-    if attribute_to_layer_input:
-        hook = layer.register_forward_pre_hook(forward_hook)
-    else:
-        hook = layer.register_forward_hook(forward_hook)
-    output = _run_forward(
-        forward_fn,
-        inputs,
-        target=target_ind,
-        additional_forward_args=additional_forward_args,
-    )
-    hook.remove()
+    # The hook is scoped to this call, such that layers evaluated concurrently
+    # by other threads are not saved.
+    with _attribution_call():
+        forward_hook = _call_scoped(forward_hook, layer)
+        if attribute_to_layer_input:
+            hook = layer.register_forward_pre_hook(forward_hook)
+        else:
+            hook = layer.register_forward_hook(forward_hook)
+        try:
+            output = _run_forward(
+                forward_fn,
+                inputs,
+                target=target_ind,
+                additional_forward_args=additional_forward_args,
+            )
+        finally:
+            hook.remove()
 
     if len(saved_layer) == 0:
         raise AssertionError("Forward hook did not obtain any outputs for given layer")
 
     if forward_hook_with_return:
-        return saved_layer, output, is_eval_tuple
-    return saved_layer, is_eval_tuple
+        evals = saved_layer, output, is_eval_tuple
+    else:
+        evals = saved_layer, is_eval_tuple
+    return (evals, False) if return_is_cached else evals
 
 
 def _gather_distributed_tensors(saved_layer, device_ids=None, key_list=None):
@@ -259,6 +403,7 @@ def _forward_layer_eval_with_neuron_grads(
     gradient_neuron_index=None,
     device_ids=None,
     attribute_to_layer_input=False,
+    activation_cache=None,
 ):
     """
     This method computes forward evaluation for a particular layer using a
@@ -275,13 +420,20 @@ def _forward_layer_eval_with_neuron_grads(
     can be found in the PyTorch data parallel documentation. We maintain the separate
     evals in a dictionary protected by a lock, analogous to the gather implementation
     for the core PyTorch DataParallel implementation.
+
+    If `activation_cache` is given, the layer evaluation is looked up in and
+    added to it, and its graph is retained for further gradient computations
+    if it is held by the cache.
     """
-    saved_layer, is_layer_tuple = _forward_layer_distributed_eval(
+    (saved_layer, is_layer_tuple), is_cached = _forward_layer_distributed_eval(
         forward_fn,
         inputs,
         layer,
         additional_forward_args=additional_forward_args,
         attribute_to_layer_input=attribute_to_layer_input,
+        activation_cache=activation_cache,
+        identify_inputs=gradient_neuron_index is not None,
+        return_is_cached=True,
     )
     device_ids = _extract_device_ids(forward_fn, saved_layer, device_ids)
     # Identifies correct device ordering based on device ids.
@@ -290,7 +442,11 @@ def _forward_layer_eval_with_neuron_grads(
     key_list = _sort_key_list(list(saved_layer.keys()), device_ids)
     if gradient_neuron_index is not None:
         inp_grads = _neuron_gradients(
-            inputs, saved_layer, key_list, gradient_neuron_index
+            inputs,
+            saved_layer,
+            key_list,
+            gradient_neuron_index,
+            retain_graph=is_cached,
         )
         return (
             _gather_distributed_tensors(saved_layer, key_list=key_list),
@@ -314,6 +470,8 @@ def compute_layer_gradients_and_eval(
     device_ids=None,
     attribute_to_layer_input=False,
     output_fn=None,
+    check_batch_independence=False,
+    activation_cache=None,
 ):
     r"""
         Computes gradients of the output with respect to a given layer as well
@@ -354,6 +512,14 @@ def compute_layer_gradients_and_eval(
             args:       Additional input arguments that forward function requires.
                         It takes an empty tuple (no additional arguments) if no
                         additional arguments are required
+            check_batch_independence: If True, verifies that the output of an
+                        example does not depend on other examples in the batch,
+                        at the cost of an additional backward pass.
+            activation_cache: An optional `ActivationCache` in which the layer
+                        evaluation and the output of the forward function
+                        are looked up and added to. Their graph is retained
+                        for further gradient computations if they are held
+                        by the cache.
 
 
         Returns:
@@ -366,7 +532,10 @@ def compute_layer_gradients_and_eval(
     with torch.autograd.set_grad_enabled(True):
         # saved_layer is a dictionary mapping device to a tuple of
         # layer evaluations on that device.
-        saved_layer, output, is_layer_tuple = _forward_layer_distributed_eval(
+        (
+            (saved_layer, output, is_layer_tuple),
+            is_cached,
+        ) = _forward_layer_distributed_eval(
             forward_fn,
             inputs,
             layer,
@@ -374,6 +543,9 @@ def compute_layer_gradients_and_eval(
             additional_forward_args=additional_forward_args,
             attribute_to_layer_input=attribute_to_layer_input,
             forward_hook_with_return=True,
+            activation_cache=activation_cache,
+            identify_inputs=gradient_neuron_index is not None,
+            return_is_cached=True,
         )
         assert output[0].numel() == 1, (
             "Target not provided when necessary, cannot"
@@ -401,7 +573,9 @@ def compute_layer_gradients_and_eval(
             for device_id in key_list
             for layer_tensor in saved_layer[device_id]
         )
-        saved_grads = torch.autograd.grad(torch.unbind(output), grad_inputs)
+        saved_grads = _sum_gradients(
+            output, grad_inputs, check_batch_independence, retain_graph=is_cached,
+        )
         saved_grads = tuple(
             saved_grads[i : i + num_tensors]
             for i in range(0, len(saved_grads), num_tensors)
@@ -412,7 +586,11 @@ def compute_layer_gradients_and_eval(
         all_grads = _reduce_list(saved_grads)
         if gradient_neuron_index is not None:
             inp_grads = _neuron_gradients(
-                inputs, saved_layer, key_list, gradient_neuron_index
+                inputs,
+                saved_layer,
+                key_list,
+                gradient_neuron_index,
+                retain_graph=is_cached,
             )
             return all_grads, all_outputs, inp_grads, is_layer_tuple
         else:
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Callable
+
+from torch.nn import Module
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # Python 3.6
+
+    class ContextVar:  # type: ignore
+        r"""
+        Thread-local replacement of `contextvars.ContextVar`, supporting the
+        subset of its interface used here.
+        """
+
+        def __init__(self, name, default):
+            self._local = threading.local()
+            self._default = default
+
+        def get(self):
+            return getattr(self._local, "value", self._default)
+
+        def set(self, value):
+            token = self.get()
+            self._local.value = value
+            return token
+
+        def reset(self, token):
+            self._local.value = token
+
+
+# Ids of the attribution calls which are being executed in the current context,
+# from the outermost to the innermost call. Threads do not inherit the context
+# of the thread which started them, so each thread only sees its own calls.
+_call_ids = ContextVar("captum_attribution_call_ids", default=())
+
+
+@contextmanager
+def _attribution_call():
+    r"""
+    Executes the enclosed code as a new attribution call, whose id is yielded
+    and added to the ids of the calls of the current context until exit. Hooks
+    registered with `_call_scoped` during the call only act on the forward
+    passes run by this call (or by calls nested in it), so that concurrent
+    attributions on the same model from different threads do not interfere.
+    """
+    call_id = object()
+    token = _call_ids.set(_call_ids.get() + (call_id,))
+    try:
+        yield call_id
+    finally:
+        _call_ids.reset(token)
+
+
+def _is_foreign_replica(module: Module, hooked_module: Module) -> bool:
+    r"""
+    Returns whether a hook registered on `hooked_module` was called for another
+    module without any attribution call in the current context. This is the
+    case for the replicas of the module which `DataParallel` runs on worker
+    threads, which share the hooks of the module but not the context of the
+    thread calling it.
+    """
+    return module is not hooked_module and not _call_ids.get()
+
+
+def _call_scoped(hook: Callable, hooked_module: Module) -> Callable:
+    r"""
+    Wraps a forward (pre-)hook, which is to be registered on `hooked_module`
+    during the current attribution call, so that it is only applied in
+    forward passes run by this call and ignored in those run concurrently by
+    other calls or by plain model evaluations. Since worker threads of
+    `DataParallel` do not share the context of the call, the hook is applied
+    to the replicas of `hooked_module` in threads without any attribution call.
+    Outside of attribution calls the hook is returned as is.
+    """
+    call_ids = _call_ids.get()
+    if not call_ids:
+        return hook
+    call_id = call_ids[-1]
+
+    @functools.wraps(hook)
+    def scoped_hook(module, *args):
+        if call_id in _call_ids.get() or _is_foreign_replica(module, hooked_module):
+            return hook(module, *args)
+        return None
+
+    return scoped_hook
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import math
+from typing import Dict, Hashable, List, Optional
+
+import torch
+from torch import Tensor
+from torch.quasirandom import SobolEngine
+
+SUPPORTED_SAMPLING_TYPES = ["random", "sobol"]
+
+
+def _validate_sampling_type(sampling: str) -> None:
+    assert (
+        sampling in SUPPORTED_SAMPLING_TYPES
+    ), "Sampling must be either `random` or `sobol`. Given {}".format(sampling)
+
+
+class _Sampler:
+    r"""
+    Draws the random numbers of a single attribution call, either independently
+    (`random`) or from scrambled Sobol sequences (`sobol`).
+
+    Quasi-random points are drawn from one Sobol sequence per `key`, which is
+    continued by subsequent draws with the same key, and are returned in rows
+    of `dimension` coordinates. Since any block of 2^m consecutive points
+    which starts at a multiple of 2^m is evenly spread over the unit cube,
+    drawing a power of 2 of points per example gives the most uniform
+    coverage. Sobol sequences support at most `SobolEngine.MAXDIM` dimensions,
+    so larger dimensions, e.g. of images, are split into equally sized blocks
+    of coordinates, each drawn from an independently scrambled sequence.
+
+    Random numbers, including the seeds of the scrambling, are drawn from
+    `generator` if given, which must be on the device of the drawn samples
+    (except for quasi-random points, which are always drawn on the CPU), and
+    from the global torch RNG otherwise.
+    """
+
+    def __init__(
+        self, sampling: str = "random", generator: Optional[torch.Generator] = None
+    ) -> None:
+        _validate_sampling_type(sampling)
+        self.sampling = sampling
+        self.generator = generator
+        self._engines: Dict[Hashable, List[SobolEngine]] = {}
+
+    def _sobol(self, key: Hashable, num_points: int, dimension: int) -> Tensor:
+        engines = self._engines.get(key)
+        if engines is None:
+            num_blocks = math.ceil(dimension / SobolEngine.MAXDIM)
+            block_sizes = [
+                dimension // num_blocks + (block < dimension % num_blocks)
+                for block in range(num_blocks)
+            ]
+            device = None if self.generator is None else self.generator.device
+            seeds = torch.randint(
+                2 ** 31 - 1, (num_blocks,), generator=self.generator, device=device
+            ).tolist()
+            engines = [
+                SobolEngine(block_size, scramble=True, seed=seed)
+                for block_size, seed in zip(block_sizes, seeds)
+            ]
+            self._engines[key] = engines
+        if len(engines) == 1:
+            return engines[0].draw(num_points)
+        return torch.cat([engine.draw(num_points) for engine in engines], dim=1)
+
+    def uniform(
+        self,
+        key: Hashable,
+        num_points: int,
+        dimension: int,
+        device: torch.device,
+        dtype: torch.dtype = torch.float32,
+    ) -> Tensor:
+        r"""
+        Returns `num_points` x `dimension` samples of the uniform distribution
+        on [0, 1).
+        """
+        if self.sampling == "random":
+            return torch.rand(
+                num_points,
+                dimension,
+                generator=self.generator,
+                device=device,
+                dtype=dtype,
+            )
+        return self._sobol(key, num_points, dimension).to(device=device, dtype=dtype)
+
+    def normal(
+        self,
+        key: Hashable,
+        num_points: int,
+        dimension: int,
+        device: torch.device,
+        dtype: torch.dtype = torch.float32,
+    ) -> Tensor:
+        r"""
+        Returns `num_points` x `dimension` samples of the standard normal
+        distribution. Quasi-random points are mapped through the inverse
+        normal CDF.
+        """
+        if self.sampling == "random":
+            return torch.randn(
+                num_points,
+                dimension,
+                generator=self.generator,
+                device=device,
+                dtype=dtype,
+            )
+        # the scrambled points may lie on the boundary of the unit cube, whose
+        # inverse CDF is infinite
+        eps = torch.finfo(torch.float32).eps
+        uniform = self._sobol(key, num_points, dimension).clamp(eps, 1 - eps)
+        normal = torch.erfinv(2 * uniform - 1) * math.sqrt(2)
+        return normal.to(device=device, dtype=dtype)
+
+    def indices(
+        self, key: Hashable, num_points: int, high: int, device: torch.device
+    ) -> Tensor:
+        r"""
+        Returns `num_points` integers drawn uniformly from [0, high).
+        """
+        if self.sampling == "random":
+            return torch.randint(
+                high, (num_points,), generator=self.generator, device=device
+            )
+        uniform = self._sobol(key, num_points, 1).view(-1)
+        # uniform is in [0, 1), up to rounding errors of the scrambling
+        indices = (uniform * high).long().clamp(max=high - 1)
+        return indices.to(device)
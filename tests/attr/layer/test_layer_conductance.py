@@ -13,6 +13,7 @@ from ..helpers.basic_models import (
 from ..helpers.conductance_reference import ConductanceReference
 from ..helpers.utils import (
     assertArraysAlmostEqual,
+    assertTensorAlmostEqual,
     assertTensorTuplesAlmostEqual,
     BaseTest,
 )
@@ -97,6 +98,49 @@ class Test(BaseTest):
             additional_args=(inp3, 5),
         )
 
+    def test_multi_input_conductance_with_memory_budget(self):
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[0.0, 10.0, 1.0], [0.0, 0.0, 10.0]])
+        inp2 = torch.tensor([[0.0, 4.0, 5.0], [0.0, 0.0, 10.0]])
+        inp3 = torch.tensor([[0.0, 0.0, 0.0], [0.0, 0.0, 5.0]])
+        cond = LayerConductance(net, net.model.relu)
+        attributions = cond.attribute(
+            (inp1, inp2), additional_forward_args=(inp3, 5), target=0
+        )
+        for memory_budget in [1, 2000, 10 ** 6]:
+            budgeted_attributions = cond.attribute(
+                (inp1, inp2),
+                additional_forward_args=(inp3, 5),
+                target=0,
+                memory_budget=memory_budget,
+            )
+            assertTensorTuplesAlmostEqual(
+                self, budgeted_attributions, attributions, delta=1e-5
+            )
+
+    def test_multi_input_conductance_autocast(self):
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[0.0, 10.0, 1.0], [0.0, 0.0, 10.0]])
+        inp2 = torch.tensor([[0.0, 4.0, 5.0], [0.0, 0.0, 10.0]])
+        inp3 = torch.tensor([[0.0, 0.0, 0.0], [0.0, 0.0, 5.0]])
+        cond = LayerConductance(net, net.model.relu)
+        attributions = cond.attribute(
+            (inp1, inp2), additional_forward_args=(inp3, 5), target=0
+        )
+        autocast_attributions, delta = cond.attribute(
+            (inp1, inp2),
+            additional_forward_args=(inp3, 5),
+            target=0,
+            return_convergence_delta=True,
+            autocast_dtype=torch.bfloat16,
+        )
+        self.assertEqual(autocast_attributions.dtype, torch.float32)
+        assertTensorAlmostEqual(
+            self, autocast_attributions, attributions, delta=1.0, mode="max"
+        )
+        self.assertEqual(delta.dtype, torch.float32)
+        assertTensorAlmostEqual(self, delta, torch.zeros(2), delta=1.0, mode="max")
+
     def test_matching_conv1_conductance(self):
         net = BasicModel_ConvNet()
         inp = 100 * torch.randn(1, 1, 10, 10, requires_grad=True)
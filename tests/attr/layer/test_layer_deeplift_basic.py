@@ -154,6 +154,20 @@ class TestDeepLift(BaseTest):
         )
         assert_delta(self, delta)
 
+        attributions, delta = layer_dl.attribute(
+            inputs[0],
+            baselines[0],
+            target=0,
+            attribute_to_layer_input=False,
+            return_convergence_delta=True,
+            internal_batch_size=1,
+        )
+        assertTensorTuplesAlmostEqual(
+            self, attributions, ([[0.0, -1.0, -1.0, -1.0]], [[0.0, -1.0, -1.0, -1.0]])
+        )
+        self.assertEqual(delta.numel(), baselines[0].shape[0])
+        assert_delta(self, delta)
+
     def test_linear_layer_deepliftshap(self):
         model = ReLULinearDeepLiftModel(inplace=True)
         (
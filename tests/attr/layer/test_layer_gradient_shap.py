@@ -84,6 +84,35 @@ class Test(BaseTest):
             attribute_to_layer_input=True,
         )
 
+    def test_basic_multilayer_compare_w_inp_features_generator(self) -> None:
+        model = BasicModel_MultiLayer()
+        model.eval()
+
+        inputs = torch.tensor([[10.0, 20.0, 10.0], [1.0, -2.0, 3.0]])
+        baselines = torch.randn(30, 3)
+
+        # the same draws are replayed from generators seeded alike
+        gs = GradientShap(model)
+        expected = gs.attribute(
+            inputs,
+            baselines,
+            target=0,
+            n_samples=7,
+            stdevs=0.1,
+            generator=torch.Generator().manual_seed(3),
+        )
+        lgs = LayerGradientShap(model, model.linear0)
+        attrs = lgs.attribute(
+            inputs,
+            baselines,
+            target=0,
+            n_samples=7,
+            stdevs=0.1,
+            attribute_to_layer_input=True,
+            generator=torch.Generator().manual_seed(3),
+        )
+        assertTensorTuplesAlmostEqual(self, attrs, (expected,), delta=1e-5)
+
     def test_classification(self) -> None:
         def custom_baseline_fn(inputs):
             num_in = inputs.shape[1]
@@ -74,6 +74,25 @@ class Test(BaseTest):
             ([[90.0, 100.0, 100.0, 100.0]], [[90.0, 100.0, 100.0, 100.0]]),
         )
 
+    def test_adaptive_steps(self) -> None:
+        model = BasicModel_MultiLayer()
+        input = torch.tensor([[1.0, 1.0, 1.0], [5.0, 5.0, 5.0], [4.0, 4.0, 4.0]])
+        lig = LayerIntegratedGradients(model, model.linear1)
+        attributions, delta = lig.attribute(
+            input,
+            target=0,
+            n_steps=4,
+            method="riemann_right",
+            convergence_tolerance=0.1,
+            max_n_steps=256,
+            return_convergence_delta=True,
+        )
+        self.assertTrue(all(abs(delta.numpy().flatten()) <= 0.1))
+        expected_attributions = lig.attribute(
+            input[1:2], target=0, n_steps=128, method="riemann_right"
+        )
+        assertTensorTuplesAlmostEqual(self, attributions[1:2], expected_attributions)
+
     def _assert_compare_with_layer_conductance(
         self, model: Module, input: Tensor, attribute_to_layer_input: bool = False
     ):
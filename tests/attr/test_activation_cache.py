@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+from unittest.mock import patch
+
+import torch
+
+from captum.attr._core.layer.internal_influence import InternalInfluence
+from captum.attr._core.layer.layer_activation import LayerActivation
+from captum.attr._core.layer.layer_gradient_x_activation import LayerGradientXActivation
+from captum.attr._core.neuron.neuron_gradient import NeuronGradient
+from captum.attr._utils.activation_cache import ActivationCache, _num_bytes
+
+from .helpers.basic_models import BasicModel_ConvNet, BasicModel_MultiLayer
+from .helpers.utils import BaseTest, assertTensorAlmostEqual
+
+
+class Test(BaseTest):
+    def _count_forward_passes(self, net):
+        forward_passes = []
+        net.register_forward_hook(lambda *args: forward_passes.append(1))
+        return forward_passes
+
+    def test_neuron_gradients_share_forward_pass(self) -> None:
+        torch.manual_seed(0)
+        net = BasicModel_ConvNet()
+        forward_passes = self._count_forward_passes(net)
+        inp = torch.randn(3, 1, 10, 10)
+        cache = ActivationCache()
+        cached = NeuronGradient(net, net.conv2, activation_cache=cache)
+        uncached = NeuronGradient(net, net.conv2)
+        neurons = [(i, j, k) for i in range(4) for j in range(2) for k in range(2)]
+
+        attributions = [cached.attribute(inp, neuron) for neuron in neurons]
+        self.assertEqual(len(forward_passes), 1)
+        self.assertEqual(len(cache), 1)
+        # another attribution object shares the cached evaluation
+        NeuronGradient(net, net.conv2, activation_cache=cache).attribute(
+            inp, neurons[0]
+        )
+        self.assertEqual(len(forward_passes), 1)
+
+        for neuron, attribution in zip(neurons, attributions):
+            expected = uncached.attribute(inp, neuron)
+            assertTensorAlmostEqual(
+                self, attribution, expected.squeeze(), delta=0.0, mode="max"
+            )
+
+    def test_layer_attributions_with_cache(self) -> None:
+        torch.manual_seed(0)
+        net = BasicModel_MultiLayer()
+        forward_passes = self._count_forward_passes(net)
+        inp = torch.randn(4, 3)
+        add_input = torch.randn(4, 3)
+        cache = ActivationCache()
+        layer_act = LayerActivation(net, net.relu, activation_cache=cache)
+        layer_ga = LayerGradientXActivation(net, net.relu, activation_cache=cache)
+        int_inf = InternalInfluence(net, net.linear1, activation_cache=cache)
+
+        for target in [0, 1, 0]:
+            for algorithm, kwargs in [
+                (layer_act, {}),
+                (layer_ga, {"target": target}),
+                (int_inf, {"target": target, "internal_batch_size": 20}),
+            ]:
+                attributions = algorithm.attribute(
+                    inp, additional_forward_args=(add_input,), **kwargs
+                )
+                algorithm.activation_cache = None
+                expected = algorithm.attribute(
+                    inp, additional_forward_args=(add_input,), **kwargs
+                )
+                algorithm.activation_cache = cache
+                assertTensorAlmostEqual(
+                    self, attributions, expected, delta=1e-6, mode="max"
+                )
+        # internal influence evaluates 4 x 50 scaled inputs in batches of 20,
+        # and only the first cached call of each method runs forward passes
+        self.assertEqual(len(forward_passes), (1 + 1 + 10) + 3 * (1 + 1 + 10))
+
+        # in-place modifications of the inputs or the model invalidate entries
+        forward_passes.clear()
+        layer_ga.attribute(inp, target=0, additional_forward_args=(add_input,))
+        self.assertEqual(len(forward_passes), 0)
+        add_input.add_(1.0)
+        layer_ga.attribute(inp, target=0, additional_forward_args=(add_input,))
+        self.assertEqual(len(forward_passes), 1)
+        with torch.no_grad():
+            net.linear2.bias.add_(1.0)
+        layer_ga.attribute(inp, target=0, additional_forward_args=(add_input,))
+        self.assertEqual(len(forward_passes), 2)
+
+    def test_lru_eviction_with_byte_budget(self) -> None:
+        net = BasicModel_MultiLayer()
+        forward_passes = self._count_forward_passes(net)
+        inputs = [torch.randn(10, 3) for _ in range(3)]
+        # each entry holds a layer evaluation of 10 x 4 floats
+        cache = ActivationCache(max_bytes=2 * 10 * 4 * 4)
+        layer_act = LayerActivation(net, net.linear1, activation_cache=cache)
+
+        for inp in inputs[:2] + inputs[:2]:
+            layer_act.attribute(inp)
+        self.assertEqual(len(forward_passes), 2)
+        self.assertEqual(cache.num_bytes, 2 * 10 * 4 * 4)
+        # evicts the least recently used entry, i.e. the first one
+        layer_act.attribute(inputs[2])
+        layer_act.attribute(inputs[1])
+        self.assertEqual(len(forward_passes), 3)
+        layer_act.attribute(inputs[0])
+        self.assertEqual(len(forward_passes), 4)
+        self.assertEqual(len(cache), 2)
+
+        # entries exceeding the budget are not cached
+        layer_act.attribute(torch.randn(30, 3))
+        self.assertEqual(len(cache), 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.num_bytes, 0)
+
+    def test_byte_budget_counts_retained_graphs(self) -> None:
+        torch.manual_seed(0)
+        net = BasicModel_ConvNet()
+        inp = torch.randn(3, 1, 10, 10)
+        cache = ActivationCache()
+        NeuronGradient(net, net.conv2, activation_cache=cache).attribute(inp, (0, 0, 0))
+        self.assertEqual(len(cache), 1)
+        (value, _, num_bytes) = next(iter(cache._entries.values()))
+        # the intermediate results saved by the retained graph are counted
+        value_bytes = _num_bytes(value)
+        self.assertGreater(num_bytes, value_bytes)
+        self.assertEqual(cache.num_bytes, num_bytes)
+
+        # an entry fitting the budget only without its graph is not cached
+        small_cache = ActivationCache(max_bytes=value_bytes)
+        NeuronGradient(net, net.conv2, activation_cache=small_cache).attribute(
+            inp, (0, 0, 0)
+        )
+        self.assertEqual(len(small_cache), 0)
+
+    def test_graph_retained_only_for_cached_entries(self) -> None:
+        net = BasicModel_MultiLayer()
+        inp = torch.randn(4, 3)
+        retain_graph_args = []
+        grad = torch.autograd.grad
+
+        def recording_grad(*args, retain_graph=None, **kwargs):
+            retain_graph_args.append(retain_graph)
+            return grad(*args, retain_graph=retain_graph, **kwargs)
+
+        with patch("torch.autograd.grad", recording_grad):
+            for cache, expected in [
+                (ActivationCache(), True),
+                # the evaluation exceeds the budget, and is not cached
+                (ActivationCache(max_bytes=0), False),
+            ]:
+                retain_graph_args.clear()
+                LayerGradientXActivation(
+                    net, net.relu, activation_cache=cache
+                ).attribute(inp, target=0)
+                self.assertEqual(retain_graph_args, [expected])
+
+            # unhashable additional forward arguments are not cached
+            def forward(x, options):
+                return net(x)
+
+            retain_graph_args.clear()
+            LayerGradientXActivation(
+                forward, net.relu, activation_cache=ActivationCache()
+            ).attribute(inp, target=0, additional_forward_args=({},))
+            self.assertEqual(retain_graph_args, [False])
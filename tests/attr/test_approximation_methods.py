@@ -2,7 +2,14 @@
 
 import unittest
 
-from captum.attr._utils.approximation_methods import riemann_builders, Riemann
+from captum.attr._utils.approximation_methods import (
+    approximation_parameters,
+    clenshaw_curtis_builders,
+    refined_n_steps,
+    riemann_builders,
+    NESTED_METHODS,
+    Riemann,
+)
 
 from .helpers.utils import assertArraysAlmostEqual
 
@@ -68,6 +75,31 @@ class Test(unittest.TestCase):
             expected_trapezoid,
         )
 
+    def test_clenshaw_curtis_3(self):
+        step_sizes, alphas = clenshaw_curtis_builders()
+        assertArraysAlmostEqual([1 / 6, 2 / 3, 1 / 6], step_sizes(3))
+        assertArraysAlmostEqual([0.0, 0.5, 1.0], alphas(3))
+
+    def test_clenshaw_curtis_exact_polynomial(self):
+        # Clenshaw-Curtis with n points integrates polynomials of degree n - 1
+        # exactly
+        step_sizes, alphas = clenshaw_curtis_builders()
+        approx = sum(
+            step_size * alpha ** 4 for step_size, alpha in zip(step_sizes(5), alphas(5))
+        )
+        self.assertAlmostEqual(approx, 0.2, delta=1e-10)
+
+    def test_nested_methods(self):
+        for method in NESTED_METHODS:
+            _, alphas = approximation_parameters(method)
+            n = 5
+            for _ in range(3):
+                refined_n = refined_n_steps(method, n)
+                refined_alphas = [round(alpha, 10) for alpha in alphas(refined_n)]
+                for alpha in alphas(n):
+                    self.assertIn(round(alpha, 10), refined_alphas)
+                n = refined_n
+
     def _assert_steps_and_alphas(
         self,
         n,
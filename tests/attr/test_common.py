@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+import gc
+import weakref
 
 import torch
 
@@ -6,10 +8,14 @@ from captum.attr._utils.common import (
     _validate_input,
     _validate_noise_tunnel_type,
     _select_targets,
+    _run_forward,
+    _forward_func_takes_args,
+    _forward_method_takes_args,
 )
 from captum.attr._utils.common import MaxList
 from captum.attr._core.noise_tunnel import SUPPORTED_NOISE_TUNNEL_TYPES
 
+from .helpers.basic_models import BasicModel_MultiLayer
 from .helpers.utils import assertTensorAlmostEqual, BaseTest
 
 
@@ -52,6 +58,26 @@ class Test(BaseTest):
         with self.assertRaises(AssertionError):
             _select_targets(output_tensor, (1, 2))
 
+    def test_run_forward_caches_signature(self):
+        model = BasicModel_MultiLayer()
+        inp = torch.tensor([[1.0, 2.0, 3.0]])
+        expected = model(inp)[:, 1]
+        assertTensorAlmostEqual(self, _run_forward(model, inp, target=1), expected)
+        assertTensorAlmostEqual(
+            self, _run_forward(model.forward, inp, target=1), expected
+        )
+        forward_func = lambda: torch.tensor([[0.0, 1.0]])  # noqa: E731
+        assertTensorAlmostEqual(self, _run_forward(forward_func, None, target=1), [1.0])
+        self.assertTrue(_forward_func_takes_args[model])
+        self.assertTrue(_forward_method_takes_args[type(model).forward])
+        self.assertFalse(_forward_func_takes_args[forward_func])
+
+        # cached forward functions can still be garbage collected
+        model_ref = weakref.ref(model)
+        del model, forward_func
+        gc.collect()
+        self.assertIsNone(model_ref())
+
     def test_select_target_3d(self):
         output_tensor = torch.tensor(
             [[[1, 2, 3], [4, 5, 6], [7, 8, 9]], [[9, 8, 7], [6, 5, 4], [3, 2, 1]]]
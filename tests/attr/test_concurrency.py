@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+from captum.attr._core.deep_lift import DeepLift
+from captum.attr._core.guided_backprop_deconvnet import Deconvolution, GuidedBackprop
+from captum.attr._core.layer.layer_integrated_gradients import LayerIntegratedGradients
+
+from .helpers.basic_models import BasicModel_ConvNet
+from .helpers.utils import BaseTest, assertTensorAlmostEqual
+
+
+class Test(BaseTest):
+    def test_concurrent_attributions_match_serial(self) -> None:
+        torch.manual_seed(0)
+        net = BasicModel_ConvNet()
+        net.eval()
+        # (algorithm constructor, kwargs of attribute given the inputs)
+        algorithms = {
+            "guided_backprop": (GuidedBackprop, lambda inp: {}),
+            "deconvolution": (Deconvolution, lambda inp: {}),
+            "deep_lift": (DeepLift, lambda inp: {"baselines": 0.1 * inp}),
+            "layer_ig": (
+                lambda net: LayerIntegratedGradients(net, net.conv2),
+                lambda inp: {"n_steps": 20},
+            ),
+        }
+        shared = {name: cls(net) for name, (cls, _) in algorithms.items()}
+
+        def attribute(call):
+            name, shared_instance, inp = call
+            # plain evaluations must not be affected by the hooks of
+            # concurrent attributions
+            if name == "forward":
+                return net(inp).detach()
+            cls, kwargs = algorithms[name]
+            algorithm = shared[name] if shared_instance else cls(net)
+            return algorithm.attribute(inp, target=1, **kwargs(inp))
+
+        calls = [
+            (name, shared_instance, torch.randn(2, 1, 10, 10))
+            for _ in range(4)
+            for name in sorted(algorithms) + ["forward"]
+            for shared_instance in [False, True]
+        ]
+        expected = [attribute(call) for call in calls]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            actual = list(executor.map(attribute, calls))
+
+        for exp, act in zip(expected, actual):
+            assertTensorAlmostEqual(self, act, exp.squeeze(), delta=1e-6, mode="max")
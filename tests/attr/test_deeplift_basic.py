@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import io
+
 import torch
 
 from inspect import signature
@@ -11,6 +13,7 @@ from .helpers.utils import (
     assertAttributionComparision,
     assertArraysAlmostEqual,
     assertTensorAlmostEqual,
+    assertTensorTuplesAlmostEqual,
     BaseTest,
 )
 from .helpers.basic_models import (
@@ -54,6 +57,50 @@ class Test(BaseTest):
         self.assertEqual(attributions[1][0], 1.0)
         self.assertEqual(delta[0], 0.0)
 
+    def test_relu_deeplift_delta_reuses_forward_pass(self):
+        model = ReLULinearDeepLiftModel()
+        x1 = torch.tensor([[-10.0, 1.0, -5.0], [2.0, 3.0, 4.0]], requires_grad=True)
+        x2 = torch.tensor([[3.0, 3.0, 1.0], [2.3, 5.0, 4.0]], requires_grad=True)
+        inputs = (x1, x2)
+        baselines = (0.5, torch.tensor([[1.0, 0.0, 1.0]]))
+        num_forward_calls = 0
+
+        def count_forward_calls(module, input, output):
+            nonlocal num_forward_calls
+            num_forward_calls += 1
+
+        handle = model.register_forward_hook(count_forward_calls)
+        dl = DeepLift(model)
+        attributions, delta = dl.attribute(
+            inputs, baselines, return_convergence_delta=True
+        )
+        handle.remove()
+        self.assertEqual(num_forward_calls, 1)
+        expected_delta = dl.compute_convergence_delta(attributions, baselines, inputs)
+        assertTensorAlmostEqual(self, delta, expected_delta)
+
+    def test_relu_deeplift_autocast(self):
+        model = ReLULinearDeepLiftModel()
+        x1 = torch.tensor([[-10.0, 1.0, -5.0], [2.0, 3.0, 4.0]], requires_grad=True)
+        x2 = torch.tensor([[3.0, 3.0, 1.0], [2.3, 5.0, 4.0]], requires_grad=True)
+        inputs = (x1, x2)
+        dl = DeepLift(model)
+        attributions = dl.attribute(inputs)
+        autocast_attributions, delta = dl.attribute(
+            inputs, return_convergence_delta=True, autocast_dtype=torch.bfloat16
+        )
+        for attribution, autocast_attribution in zip(
+            attributions, autocast_attributions
+        ):
+            self.assertEqual(autocast_attribution.dtype, torch.float32)
+            assertTensorAlmostEqual(
+                self, autocast_attribution, attribution, delta=0.1, mode="max"
+            )
+        expected_delta = dl.compute_convergence_delta(
+            autocast_attributions, (0, 0), inputs
+        )
+        assertTensorAlmostEqual(self, delta, expected_delta)
+
     def test_tanh_deeplift(self):
         x1 = torch.tensor([-1.0], requires_grad=True)
         x2 = torch.tensor([-2.0], requires_grad=True)
@@ -209,6 +256,25 @@ class Test(BaseTest):
         assertTensorAlmostEqual(self, attributions[0], attributions_with_func[0])
         assertTensorAlmostEqual(self, attributions[1], attributions_with_func[1])
 
+    def test_relu_deepliftshap_internal_batch_size(self):
+        model = ReLULinearDeepLiftModel()
+        inputs = (torch.randn(3, 3), torch.randn(3, 3))
+        baselines = (torch.randn(5, 3), torch.randn(5, 3))
+        dl_shap = DeepLiftShap(model)
+        expected, expected_delta = dl_shap.attribute(
+            inputs, baselines, return_convergence_delta=True
+        )
+        # chunks of 2, 2 and 1 baselines, and of a single baseline
+        for internal_batch_size in [6, 1]:
+            attributions, delta = dl_shap.attribute(
+                inputs,
+                baselines,
+                return_convergence_delta=True,
+                internal_batch_size=internal_batch_size,
+            )
+            assertTensorTuplesAlmostEqual(self, attributions, expected)
+            assertTensorAlmostEqual(self, delta, expected_delta)
+
     def test_relu_deepliftshap_with_custom_attr_func(self):
         def custom_attr_func(multipliers, inputs, baselines):
             return tuple(multiplier * 0.0 for multiplier in multipliers)
@@ -248,6 +314,55 @@ class Test(BaseTest):
         with self.assertRaises(RuntimeError):
             dl.attribute(input, target=0)
 
+    def test_hooks_removed_after_attribution(self):
+        model = ReLULinearDeepLiftModel()
+        inputs = (torch.randn(2, 3), torch.randn(2, 3))
+        baselines = (torch.zeros(1, 3), torch.zeros(1, 3))
+        expected = DeepLift(model).attribute(inputs, baselines)
+        for module in model.modules():
+            self.assertEqual(len(module._forward_pre_hooks), 0)
+            self.assertEqual(len(module._forward_hooks), 0)
+        self.assertEqual(model.relu.__dict__.keys() & {"input", "output"}, set())
+        # the attributed model can still be saved
+        buffer = io.BytesIO()
+        torch.save(model, buffer)
+        buffer.seek(0)
+        attributions = DeepLift(torch.load(buffer)).attribute(inputs, baselines)
+        assertTensorAlmostEqual(self, attributions[0], expected[0])
+        assertTensorAlmostEqual(self, attributions[1], expected[1])
+
+    def test_input_modified_after_module(self):
+        class SigmoidModel(torch.nn.Module):
+            def __init__(self, modify_input):
+                super().__init__()
+                self.lin = torch.nn.Linear(3, 3)
+                self.sigmoid = torch.nn.Sigmoid()
+                self.modify_input = modify_input
+                self.num_forwards = 0
+
+            def forward(self, x):
+                self.num_forwards += 1
+                h = self.lin(x)
+                out = self.sigmoid(h)
+                if self.modify_input:
+                    h.add_(1.0)
+                return out.sum(dim=1)
+
+        model = SigmoidModel(modify_input=True)
+        reference_model = SigmoidModel(modify_input=False)
+        reference_model.lin = model.lin
+        inputs = torch.randn(2, 3)
+        baselines = torch.randn(1, 3)
+        attributions, delta = DeepLift(model).attribute(
+            inputs, baselines, return_convergence_delta=True
+        )
+        # the forward pass is repeated with a copy of the modified input
+        self.assertEqual(model.num_forwards, 2)
+        expected = DeepLift(reference_model).attribute(inputs, baselines)
+        self.assertEqual(reference_model.num_forwards, 1)
+        assertTensorAlmostEqual(self, attributions, expected, delta=0.0, mode="max")
+        assertTensorAlmostEqual(self, delta, torch.zeros(2), delta=1e-5, mode="max")
+
     def test_lin_maxpool_lin_classification(self):
         inputs = torch.ones(2, 4)
         baselines = torch.tensor([[1, 2, 3, 9], [4, 8, 6, 7]]).float()
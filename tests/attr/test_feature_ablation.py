@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 import torch
 from torch import Tensor
@@ -77,6 +78,18 @@ class Test(BaseTest):
             ablations_per_eval=(1, 2, 3),
         )
 
+    def test_multi_sample_ablation_with_memory_budget(self) -> None:
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]], requires_grad=True)
+        ablation = FeatureAblation(net)
+        for memory_budget in [1, 250, 10 ** 6]:
+            attributions = ablation.attribute(
+                inp, target=0, memory_budget=memory_budget
+            )
+            assertTensorAlmostEqual(
+                self, attributions, [[8.0, 35.0, 12.0], [80.0, 200.0, 120.0]]
+            )
+
     def test_multi_sample_ablation_with_mask(self) -> None:
         net = BasicModel_MultiLayer()
         inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]], requires_grad=True)
@@ -132,6 +145,220 @@ class Test(BaseTest):
             ablations_per_eval=(1, 2, 3),
         )
 
+    def test_top_k_ablation(self) -> None:
+        weights = torch.arange(-15.0, 17.0) ** 3
+        inp = torch.ones(2, 32)
+        inp[1] = 2.0
+        num_evals = [0]
+
+        def forward_func(x):
+            num_evals[0] += 1
+            return torch.sum(x * weights, dim=1)
+
+        ablation = FeatureAblation(forward_func)
+        attributions = ablation.attribute(inp, top_k=3, hierarchy_branching=2)
+        # top 3 features, with weights -15 ** 3, 16 ** 3 and 15 ** 3, are exact
+        assertTensorAlmostEqual(
+            self,
+            attributions[:, [0, 30, 31]],
+            [[-3375, 3375, 4096], [-6750, 6750, 8192]],
+        )
+        # other features are attributed the output difference of the smallest
+        # evaluated range of ids containing them, e.g. the sum of k ** 3 for k
+        # from 1 to 8 for ids 16 to 23
+        assertTensorAlmostEqual(
+            self,
+            attributions[0, 16:30],
+            [1296] * 8 + [1729] * 2 + [3059] * 2 + [2197, 2744],
+        )
+        self.assertLess(num_evals[0], 32)
+
+        # exact for all features if top_k includes all of them
+        self._ablation_test_assert(
+            BasicModel_MultiLayer(),
+            torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]]),
+            [[8.0, 35.0, 12.0], [80.0, 200.0, 120.0]],
+            ablations_per_eval=(1, 2),
+            top_k=3,
+        )
+
+    def test_multi_input_ablation_reuses_buffers(self) -> None:
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 50.0, 30.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        expected = FeatureAblation(net).attribute(
+            (inp2, inp1), additional_forward_args=(inp3, 1), target=0
+        )
+        ablation = FeatureAblation(net)
+        ablation.attribute((inp1, inp2), additional_forward_args=(inp3, 1), target=0)
+        buffers = dict(ablation._ablation_buffers)
+        self.assertEqual(len(buffers), 2)
+        attributions = ablation.attribute(
+            (inp2, inp1), additional_forward_args=(inp3, 1), target=0
+        )
+        for key, buffer in buffers.items():
+            self.assertIs(ablation._ablation_buffers[key], buffer)
+        for attribution, expected_attribution in zip(attributions, expected):
+            assertTensorAlmostEqual(self, attribution, expected_attribution)
+
+    def test_ablation_buffers_bounded_for_varying_batch_sizes(self) -> None:
+        torch.manual_seed(0)
+        net = BasicModel_MultiLayer_MultiInput()
+        ablation = FeatureAblation(net)
+        for batch_size in list(range(2, 40)) + list(range(39, 1, -3)):
+            inp1, inp2, inp3 = (torch.randn(batch_size, 3) for _ in range(3))
+            attributions = ablation.attribute(
+                (inp1, inp2),
+                additional_forward_args=(inp3, 1),
+                target=0,
+                ablations_per_eval=2,
+            )
+            # one buffer per input, large enough for the largest call so far
+            self.assertEqual(len(ablation._ablation_buffers), 2)
+            expected = FeatureAblation(net).attribute(
+                (inp1, inp2), additional_forward_args=(inp3, 1), target=0
+            )
+            for attribution, expected_attribution in zip(attributions, expected):
+                assertTensorAlmostEqual(self, attribution, expected_attribution)
+        for buffer in ablation._ablation_buffers.values():
+            self.assertEqual(buffer.numel(), 2 * 39 * 3)
+
+    def test_concurrent_ablations_on_shared_instance(self) -> None:
+        torch.manual_seed(0)
+        net = BasicModel_MultiLayer_MultiInput()
+        calls = [
+            (torch.randn(4, 3), torch.randn(4, 3), torch.randn(4, 3)) for _ in range(20)
+        ]
+        ablation = FeatureAblation(net)
+
+        def attribute(call):
+            inp1, inp2, inp3 = call
+            return ablation.attribute(
+                (inp1, inp2), additional_forward_args=(inp3, 1), target=0
+            )
+
+        expected = [attribute(call) for call in calls]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            actual = list(executor.map(attribute, calls))
+        for attributions, expected_attributions in zip(actual, expected):
+            for attribution, expected_attribution in zip(
+                attributions, expected_attributions
+            ):
+                assertTensorAlmostEqual(self, attribution, expected_attribution)
+
+    def test_multi_input_ablation_parallel(self) -> None:
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 50.0, 30.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        baselines = (torch.tensor([[3.0, 0.0, 0.0]]), 1.0, 0.0)
+        for forward_func, target in [(net, 0), (lambda *x: net(*x).sum(), None)]:
+            ablation = FeatureAblation(forward_func)
+            expected = ablation.attribute(
+                (inp1, inp2, inp3),
+                baselines=baselines,
+                additional_forward_args=(1,),
+                target=target,
+            )
+            attributions = ablation.attribute(
+                (inp1, inp2, inp3),
+                baselines=baselines,
+                additional_forward_args=(1,),
+                target=target,
+                num_workers=2,
+            )
+            for attribution, expected_attribution in zip(attributions, expected):
+                assertTensorAlmostEqual(self, attribution, expected_attribution)
+
+    def test_concurrent_parallel_ablations(self) -> None:
+        torch.manual_seed(0)
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1, inp2, inp3 = (torch.randn(2, 3) for _ in range(3))
+        calls = [
+            (FeatureAblation(net), 0),
+            (FeatureAblation(lambda *x: -net(*x).sum()), None),
+        ] * 2
+
+        def attribute(call, num_workers=0):
+            ablation, target = call
+            return ablation.attribute(
+                (inp1, inp2),
+                additional_forward_args=(inp3, 1),
+                target=target,
+                num_workers=num_workers,
+            )
+
+        expected = [attribute(call) for call in calls]
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            actual = list(executor.map(lambda call: attribute(call, 2), calls))
+        for attributions, expected_attributions in zip(actual, expected):
+            for attribution, expected_attribution in zip(
+                attributions, expected_attributions
+            ):
+                assertTensorAlmostEqual(self, attribution, expected_attribution)
+
+    def test_multi_input_ablation_prefetch(self) -> None:
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 50.0, 30.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        ablation = FeatureAblation(net)
+        expected = ablation.attribute(
+            (inp1, inp2, inp3), additional_forward_args=(1,), target=0
+        )
+        for prefetch_batches in [1, 3]:
+            attributions = ablation.attribute(
+                (inp1, inp2, inp3),
+                additional_forward_args=(1,),
+                target=0,
+                prefetch_batches=prefetch_batches,
+            )
+            for attribution, expected_attribution in zip(attributions, expected):
+                assertTensorAlmostEqual(self, attribution, expected_attribution)
+
+    def test_ablation_prefetch_propagates_errors(self) -> None:
+        class AblationError(Exception):
+            pass
+
+        class FailingAblation(FeatureAblation):
+            def _construct_ablated_input(self, *args, **kwargs):
+                raise AblationError()
+
+        ablation = FailingAblation(BasicModel_MultiLayer())
+        with self.assertRaises(AblationError):
+            ablation.attribute(torch.randn(2, 3), target=0, prefetch_batches=2)
+
+    def test_multi_input_ablation_multi_target(self) -> None:
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 50.0, 30.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        num_calls = 0
+
+        def forward_func(*args):
+            nonlocal num_calls
+            num_calls += 1
+            return net(*args)
+
+        ablation = FeatureAblation(forward_func)
+        targets = [0, 1, torch.tensor([1, 0])]
+        for ablations_per_eval in [1, 2]:
+            num_calls = 0
+            attributions = ablation.attribute(
+                (inp1, inp2, inp3),
+                additional_forward_args=(1,),
+                targets=targets,
+                ablations_per_eval=ablations_per_eval,
+            )
+            self.assertEqual(num_calls, 1 + 3 * -(-3 // ablations_per_eval))
+            for t, target in enumerate(targets):
+                expected = ablation.attribute(
+                    (inp1, inp2, inp3), additional_forward_args=(1,), target=target
+                )
+                for attribution, expected_attribution in zip(attributions, expected):
+                    assertTensorAlmostEqual(self, attribution[t], expected_attribution)
+
     def test_multi_input_ablation(self) -> None:
         net = BasicModel_MultiLayer_MultiInput()
         inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
@@ -373,22 +600,28 @@ class Test(BaseTest):
         target: Optional[
             Union[int, Tuple[int, ...], Tensor, List[Tuple[int, ...]]]
         ] = 0,
+        top_k: Optional[int] = None,
     ) -> None:
         for batch_size in ablations_per_eval:
-            ablation = FeatureAblation(model)
-            attributions = ablation.attribute(
-                test_input,
-                target=target,
-                feature_mask=feature_mask,
-                additional_forward_args=additional_input,
-                baselines=baselines,
-                ablations_per_eval=batch_size,
-            )
-            if isinstance(expected_ablation, tuple):
-                for i in range(len(expected_ablation)):
-                    assertTensorAlmostEqual(self, attributions[i], expected_ablation[i])
-            else:
-                assertTensorAlmostEqual(self, attributions, expected_ablation)
+            for sparse_ablation in (False, True):
+                ablation = FeatureAblation(model)
+                attributions = ablation.attribute(
+                    test_input,
+                    target=target,
+                    feature_mask=feature_mask,
+                    additional_forward_args=additional_input,
+                    baselines=baselines,
+                    ablations_per_eval=batch_size,
+                    sparse_ablation=sparse_ablation,
+                    top_k=top_k,
+                )
+                if isinstance(expected_ablation, tuple):
+                    for i in range(len(expected_ablation)):
+                        assertTensorAlmostEqual(
+                            self, attributions[i], expected_ablation[i]
+                        )
+                else:
+                    assertTensorAlmostEqual(self, attributions, expected_ablation)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,15 @@
 #!/usr/bin/env python3
 
+from unittest.mock import patch
+
 import torch
 
+from captum.attr._core.gradient_shap import GradientShap
+from captum.attr._core.integrated_gradients import IntegratedGradients
+from captum.attr._core.layer.layer_gradient_x_activation import LayerGradientXActivation
+from captum.attr._core.layer.layer_integrated_gradients import LayerIntegratedGradients
+from captum.attr._core.saliency import Saliency
+from captum.attr._utils.common import _MultiTarget
 from captum.attr._utils.gradient import (
     compute_gradients,
     compute_layer_gradients_and_eval,
@@ -129,3 +137,62 @@ class Test(BaseTest):
         )
         assertArraysAlmostEqual(grads[0].squeeze(0).tolist(), [0.0, 1.0], delta=0.01)
         assertArraysAlmostEqual(eval[0].squeeze(0).tolist(), [26.0, 28.0], delta=0.01)
+
+    def test_gradient_batch_independence(self):
+        model = torch.nn.Sequential(torch.nn.Linear(3, 4), torch.nn.BatchNorm1d(4))
+        input = torch.tensor([[5.0, 2.0, 1.0], [-1.0, 3.0, 2.0]], requires_grad=True)
+        with self.assertRaises(AssertionError):
+            compute_gradients(model, input, target_ind=0, check_batch_independence=True)
+        with self.assertRaises(AssertionError):
+            compute_layer_gradients_and_eval(
+                model, model[0], input, target_ind=0, check_batch_independence=True
+            )
+        model.eval()
+        grads = compute_gradients(
+            model, input, target_ind=0, check_batch_independence=True
+        )
+        for i in range(input.shape[0]):
+            example_grads = compute_gradients(model, input[i : i + 1], target_ind=0)
+            assertArraysAlmostEqual(
+                grads[0][i].tolist(), example_grads[0][0].tolist(), delta=1e-5
+            )
+
+    def test_attribution_batch_independence(self):
+        model = torch.nn.Sequential(torch.nn.Linear(3, 4), torch.nn.BatchNorm1d(4))
+        input = torch.tensor([[5.0, 2.0, 1.0], [-1.0, 3.0, 2.0]])
+        baselines = torch.zeros(3, 3)
+        algorithms = [
+            (IntegratedGradients(model), {}),
+            (Saliency(model), {}),
+            (GradientShap(model), {"baselines": baselines}),
+            (LayerGradientXActivation(model, model[0]), {}),
+            (LayerIntegratedGradients(model, model[0]), {}),
+        ]
+        for algorithm, kwargs in algorithms:
+            # BatchNorm in train mode mixes the examples of a batch, which is
+            # only detected if requested
+            algorithm.check_batch_independence = False
+            algorithm.attribute(input, target=0, **kwargs)
+            algorithm.check_batch_independence = True
+            with self.assertRaises(AssertionError):
+                algorithm.attribute(input, target=0, **kwargs)
+            model.eval()
+            algorithm.attribute(input, target=0, **kwargs)
+            model.train()
+
+    def test_gradient_multi_target(self):
+        model = BasicModel_MultiLayer()
+        input = torch.tensor([[5.0, 2.0, 1.0], [-1.0, 3.0, 2.0]], requires_grad=True)
+        targets = [0, 1, torch.tensor([1, 0])]
+        expected = [compute_gradients(model, input, target)[0] for target in targets]
+        for supports_batched_grads in [True, False]:
+            with patch(
+                "captum.attr._utils.gradient._supports_batched_grads",
+                supports_batched_grads,
+            ):
+                grads = compute_gradients(model, input, _MultiTarget(targets))
+            self.assertEqual(grads[0].shape, (3, 2, 3))
+            for grad, expected_grad in zip(grads[0], expected):
+                assertArraysAlmostEqual(
+                    grad.reshape(-1).tolist(), expected_grad.reshape(-1).tolist()
+                )
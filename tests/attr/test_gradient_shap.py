@@ -55,6 +55,75 @@ class Test(BaseTest):
         ):
             assertTensorAlmostEqual(self, attribution, attribution_without_delta)
 
+    def test_basic_multi_input_autocast(self):
+        x1 = torch.ones(10, 3)
+        x2 = torch.ones(10, 4)
+        inputs = (x1, x2)
+        baselines = (torch.zeros(20, 3), torch.zeros(20, 4))
+        model = BasicLinearModel()
+        gradient_shap = GradientShap(model)
+        attributions, delta = gradient_shap.attribute(
+            inputs,
+            baselines,
+            n_samples=5,
+            return_convergence_delta=True,
+            autocast_dtype=torch.bfloat16,
+        )
+        for attribution in attributions:
+            self.assertEqual(attribution.dtype, torch.float32)
+        # the delta shows the error due to the reduced precision
+        self.assertEqual(delta.dtype, torch.float32)
+        assertTensorAlmostEqual(self, delta, torch.zeros(50), delta=0.01, mode="max")
+
+    def test_basic_multi_input_sobol(self):
+        torch.manual_seed(0)
+        inputs = (torch.randn(2, 3), torch.randn(2, 4))
+        baselines = (torch.randn(8, 3), torch.randn(8, 4))
+        model = BasicLinearModel()
+        gradient_shap = GradientShap(model)
+        attributions = gradient_shap.attribute(
+            inputs, baselines, n_samples=8, sampling="sobol"
+        )
+        # 8 quasi-random points draw each of the 8 baselines exactly once for
+        # each example, so that the attributions of the linear model are exact
+        weights = model.linear.weight.view(-1)
+        expected = (
+            (inputs[0] - baselines[0].mean(0)) * weights[:3],
+            (inputs[1] - baselines[1].mean(0)) * weights[3:],
+        )
+        for attribution, expected_attribution in zip(attributions, expected):
+            assertTensorAlmostEqual(
+                self, attribution, expected_attribution, delta=1e-5, mode="max"
+            )
+
+    def test_basic_multi_input_generator(self):
+        torch.manual_seed(0)
+        inputs = (torch.randn(3, 3), torch.randn(3, 4))
+        baselines = (torch.randn(10, 3), torch.randn(10, 4))
+        model = BasicLinearModel()
+        gradient_shap = GradientShap(model)
+
+        def attribute(seed):
+            generator = torch.Generator().manual_seed(seed)
+            return gradient_shap.attribute(
+                inputs, baselines, n_samples=6, stdevs=0.1, generator=generator
+            )
+
+        attributions = attribute(1)
+        # the draws do not depend on nor change the global random state
+        rng_state = torch.get_rng_state()
+        torch.manual_seed(1234)
+        np.random.seed(1234)
+        for attribution, replayed in zip(attributions, attribute(1)):
+            assertTensorAlmostEqual(self, replayed, attribution, delta=0.0)
+        torch.set_rng_state(rng_state)
+        self.assertTrue(torch.equal(torch.get_rng_state(), rng_state))
+        attribute(1)
+        self.assertTrue(torch.equal(torch.get_rng_state(), rng_state))
+
+        other_attributions = attribute(2)
+        self.assertFalse(torch.equal(attributions[0], other_attributions[0]))
+
     def test_classification_baselines_as_function(self):
         num_in = 40
         inputs = torch.arange(0.0, num_in * 2.0).reshape(2, num_in)
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
-from captum.attr._core.integrated_gradients import IntegratedGradients
+from captum.attr._core.integrated_gradients import (
+    IntegratedGradients,
+    _AlphaGradientCache,
+)
 from captum.attr._core.noise_tunnel import NoiseTunnel
+from captum.attr._utils.approximation_methods import approximation_parameters
 from captum.attr._utils.common import _zeros, _tensorize_baseline
 from captum.attr._utils.typing import Tensor, TensorOrTupleOfTensors
 
@@ -95,6 +99,257 @@ class Test(BaseTest):
     def test_batched_multi_input_vargrad(self) -> None:
         self._assert_batched_tensor_multi_input("vargrad", "riemann_trapezoid")
 
+    def test_batched_step_chunks(self) -> None:
+        model = BasicModel_MultiLayer()
+        input = torch.tensor(
+            [[1.5, 2.0, 1.3], [0.5, 0.1, 2.3], [1.5, 2.0, 1.3]], requires_grad=True
+        )
+        add_input = torch.tensor([[1.0, 0.0, 2.0], [0.0, 1.0, 0.0], [3.0, 1.0, 1.0]])
+        ig = IntegratedGradients(model)
+        for method in ["riemann_trapezoid", "gausslegendre"]:
+            attributions = ig.attribute(
+                input,
+                target=[0, 1, 1],
+                additional_forward_args=(add_input,),
+                n_steps=25,
+                method=method,
+            )
+            # 7 // 3 = 2 steps per chunk, with the last chunk containing 1 step
+            for internal_batch_size in [3, 7, 1000]:
+                batched_attributions = ig.attribute(
+                    input,
+                    target=[0, 1, 1],
+                    additional_forward_args=(add_input,),
+                    n_steps=25,
+                    method=method,
+                    internal_batch_size=internal_batch_size,
+                )
+                assertTensorAlmostEqual(
+                    self, batched_attributions, attributions, delta=1e-5, mode="max"
+                )
+
+    def test_memory_budget(self) -> None:
+        model = BasicModel_MultiLayer()
+        input = torch.tensor(
+            [[1.5, 2.0, 1.3], [0.5, 0.1, 2.3], [1.5, 2.0, 1.3]], requires_grad=True
+        )
+        ig = IntegratedGradients(model)
+        attributions = ig.attribute(input, target=[0, 1, 1], n_steps=25)
+        for memory_budget in [1, 2000, 10 ** 6]:
+            budgeted_attributions = ig.attribute(
+                input, target=[0, 1, 1], n_steps=25, memory_budget=memory_budget
+            )
+            assertTensorAlmostEqual(
+                self, budgeted_attributions, attributions, delta=1e-5, mode="max"
+            )
+
+    def test_adaptive_steps(self) -> None:
+        model = BasicModel_MultiLayer()
+        # The first example never crosses the ReLU threshold along the path and
+        # converges with the initial number of steps, the remaining ones require
+        # refinement.
+        input = torch.tensor([[1.0, 1.0, 1.0], [5.0, 5.0, 5.0], [4.0, 4.0, 4.0]])
+        ig = IntegratedGradients(model)
+        attributions, delta = ig.attribute(
+            input,
+            target=0,
+            n_steps=4,
+            method="riemann_right",
+            convergence_tolerance=0.1,
+            max_n_steps=256,
+            return_convergence_delta=True,
+        )
+        self.assertTrue(all(abs(delta.numpy().flatten()) <= 0.1))
+        for i, expected_n_steps in enumerate([4, 128, 64]):
+            expected_attributions = ig.attribute(
+                input[i : i + 1],
+                target=0,
+                n_steps=expected_n_steps,
+                method="riemann_right",
+            )
+            assertTensorAlmostEqual(
+                self, attributions[i : i + 1], expected_attributions, mode="max"
+            )
+        delta_external = ig.compute_convergence_delta(attributions, 0, input, target=0)
+        assertTensorAlmostEqual(self, delta, delta_external, mode="max")
+
+    def test_adaptive_steps_max_n_steps(self) -> None:
+        model = BasicModel_MultiLayer()
+        input = torch.tensor([[1.0, 1.0, 1.0], [5.0, 5.0, 5.0]])
+        ig = IntegratedGradients(model)
+        # nested methods stop at the last refinement within max_n_steps, i.e.
+        # 8 steps, while the steps of other methods are clipped to it
+        for method, expected_n_steps in [("riemann_right", 8), ("riemann_middle", 10)]:
+            attributions = ig.attribute(
+                input,
+                target=[0, 1],
+                n_steps=4,
+                method=method,
+                convergence_tolerance=0.0,
+                max_n_steps=10,
+                internal_batch_size=4,
+            )
+            expected_attributions = ig.attribute(
+                input[1:], target=[1], n_steps=expected_n_steps, method=method
+            )
+            assertTensorAlmostEqual(
+                self, attributions[1:], expected_attributions, mode="max"
+            )
+
+    def test_adaptive_steps_reuses_gradients(self) -> None:
+        model = BasicModel_MultiLayer()
+        num_evaluated = 0
+
+        def forward_func(input):
+            nonlocal num_evaluated
+            num_evaluated += input.shape[0]
+            return model(input)
+
+        input = torch.tensor([[1.0, 1.0, 1.0], [5.0, 5.0, 5.0]])
+        ig = IntegratedGradients(forward_func)
+        attributions, delta = ig.attribute(
+            input,
+            target=0,
+            n_steps=5,
+            method="clenshawcurtis",
+            convergence_tolerance=1e-6,
+            max_n_steps=17,
+            return_convergence_delta=True,
+        )
+        # 5 steps for both examples and 4 and 8 new steps for the second example,
+        # the outputs at both endpoints are reused for the convergence delta
+        self.assertEqual(num_evaluated, 2 * 5 + 4 + 8)
+        # refining to 33 steps would exceed max_n_steps, so the approximation
+        # stops at 17 steps instead of evaluating non-nested alphas
+        num_evaluated = 0
+        clipped_attributions = ig.attribute(
+            input,
+            target=0,
+            n_steps=5,
+            method="clenshawcurtis",
+            convergence_tolerance=1e-6,
+            max_n_steps=32,
+        )
+        self.assertEqual(num_evaluated, 2 * 5 + 4 + 8)
+        assertTensorAlmostEqual(
+            self, clipped_attributions, attributions, delta=0.0, mode="max"
+        )
+        expected_attributions = ig.attribute(
+            input, target=0, n_steps=17, method="clenshawcurtis"
+        )
+        assertTensorAlmostEqual(
+            self, attributions[1:], expected_attributions[1:], mode="max"
+        )
+        assertTensorAlmostEqual(
+            self, attributions[:1], expected_attributions[:1], mode="max"
+        )
+
+    def test_alpha_gradient_cache_holds_weighted_sums(self) -> None:
+        cache = _AlphaGradientCache("clenshawcurtis", 32)
+        self.assertIsNone(cache.advance(5))
+        step_sizes_func, alphas_func = approximation_parameters("clenshawcurtis")
+        alphas = alphas_func(5)
+        grads = torch.randn(5 * 2, 3)
+        # gradients are added in chunks of steps, as for internal batching
+        cache.update(alphas[:2], (grads[:4],))
+        cache.update(alphas[2:], (grads[4:],))
+        cache.select(torch.tensor([1]))
+        # a single sum per example and remaining refinement level, i.e. 9 and
+        # 17 steps, is kept rather than the gradients of each alpha
+        self.assertEqual(sorted(cache.grad_sums), [9, 17])
+        for grad_sums in cache.grad_sums.values():
+            self.assertEqual(grad_sums[0].shape, (1, 3))
+
+        (grad_sum,) = cache.advance(9)
+        self.assertEqual(sorted(cache.grad_sums), [17])
+        step_sizes = dict(zip(alphas_func(9), step_sizes_func(9)))
+        expected = sum(
+            step_sizes[alphas_func(9)[2 * i]] * grads[2 * i + 1] for i in range(5)
+        )
+        assertTensorAlmostEqual(self, grad_sum, expected.unsqueeze(0), mode="max")
+        self.assertTrue(all(alpha in cache for alpha in alphas_func(9)[::2]))
+        self.assertFalse(alphas_func(9)[1] in cache)
+
+    def test_adaptive_steps_in_step_chunks(self) -> None:
+        model = BasicModel_MultiLayer()
+        input = torch.tensor([[1.0, 1.0, 1.0], [5.0, 5.0, 5.0]])
+        ig = IntegratedGradients(model)
+        for method in ["riemann_left", "riemann_trapezoid", "clenshawcurtis"]:
+            attributions = ig.attribute(
+                input,
+                target=0,
+                n_steps=5,
+                method=method,
+                convergence_tolerance=0.0,
+                max_n_steps=20,
+                internal_batch_size=6,
+            )
+            expected_n_steps = 20 if method == "riemann_left" else 17
+            expected_attributions = ig.attribute(
+                input, target=0, n_steps=expected_n_steps, method=method
+            )
+            assertTensorAlmostEqual(
+                self, attributions, expected_attributions, mode="max"
+            )
+
+    def test_convergence_delta_reuses_endpoint_outputs(self) -> None:
+        model = BasicModel_MultiLayer()
+        num_evaluated = 0
+
+        def forward_func(input):
+            nonlocal num_evaluated
+            num_evaluated += input.shape[0]
+            return model(input)
+
+        input = torch.tensor([[1.0, 2.0, 3.0], [5.0, -5.0, 5.0]])
+        ig = IntegratedGradients(forward_func)
+        # number of extra evaluations for the endpoints not included in the
+        # approximation method
+        for method, extra_evaluations in [
+            ("riemann_trapezoid", 0),
+            ("riemann_right", 1),
+            ("gausslegendre", 2),
+        ]:
+            for internal_batch_size in [None, 4]:
+                num_evaluated = 0
+                attributions, delta = ig.attribute(
+                    input,
+                    target=[0, 1],
+                    n_steps=5,
+                    method=method,
+                    internal_batch_size=internal_batch_size,
+                    return_convergence_delta=True,
+                )
+                self.assertEqual(num_evaluated, 2 * (5 + extra_evaluations))
+                expected_delta = ig.compute_convergence_delta(
+                    attributions, 0, input, target=[0, 1]
+                )
+                assertTensorAlmostEqual(self, delta, expected_delta, mode="max")
+
+    def test_autocast(self) -> None:
+        model = BasicModel_MultiLayer()
+        input = torch.tensor([[1.0, 2.0, 3.0], [5.0, -5.0, 5.0]])
+        ig = IntegratedGradients(model)
+        for method in ["riemann_trapezoid", "gausslegendre"]:
+            attributions = ig.attribute(input, target=[0, 1], method=method)
+            autocast_attributions, delta = ig.attribute(
+                input,
+                target=[0, 1],
+                method=method,
+                internal_batch_size=10,
+                return_convergence_delta=True,
+                autocast_dtype=torch.bfloat16,
+            )
+            self.assertEqual(autocast_attributions.dtype, attributions.dtype)
+            assertTensorAlmostEqual(
+                self, autocast_attributions, attributions, delta=0.1, mode="max"
+            )
+            # the delta is computed with float32 forward passes
+            expected_delta = ig.compute_convergence_delta(
+                autocast_attributions, 0, input, target=[0, 1]
+            )
+            assertTensorAlmostEqual(self, delta, expected_delta, mode="max")
+
     def _assert_multi_variable(
         self, type: str, approximation_method: str = "gausslegendre"
     ) -> None:
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+import torch
+
+from captum.attr._core.input_x_gradient import InputXGradient
+from captum.attr._core.integrated_gradients import IntegratedGradients
+from captum.attr._core.noise_tunnel import NoiseTunnel
+from captum.attr._utils.sampling import _Sampler
+
+from .helpers.basic_models import BasicModel_MultiLayer
+from .helpers.utils import BaseTest, assertTensorAlmostEqual
+
+
+class Test(BaseTest):
+    def test_sample_batches_match_statistics_of_samples(self) -> None:
+        noisy_inputs = []
+
+        def forward_func(x, y):
+            noisy_inputs.append(x.detach())
+            return (x ** 2 * y).sum(1)
+
+        inp = torch.tensor([[1.0, -2.0, 3.0], [0.5, 0.0, -1.0]])
+        y = torch.tensor([[1.0, 2.0, 3.0], [-1.0, 1.0, 0.5]])
+        nt = NoiseTunnel(InputXGradient(forward_func))
+        for nt_type in ["smoothgrad", "smoothgrad_sq", "vargrad"]:
+            noisy_inputs.clear()
+            attributions = nt.attribute(
+                inp,
+                nt_type=nt_type,
+                n_samples=7,
+                stdevs=0.5,
+                n_samples_batch_size=3,
+                additional_forward_args=(y,),
+            )
+            self.assertEqual([len(x) for x in noisy_inputs], [6, 6, 2])
+            # 2 x 7 x 3 samples of each example, in the order they were drawn
+            samples = torch.cat([x.view(2, -1, 3) for x in noisy_inputs], dim=1)
+            sample_attributions = 2 * samples ** 2 * y.unsqueeze(1)
+            expected = {
+                "smoothgrad": sample_attributions.mean(1),
+                "smoothgrad_sq": (sample_attributions ** 2).mean(1),
+                "vargrad": sample_attributions.var(1, unbiased=False),
+            }[nt_type]
+            assertTensorAlmostEqual(
+                self, attributions, expected, delta=1e-4, mode="max"
+            )
+
+    def test_sample_batches_convergence_delta(self) -> None:
+        torch.manual_seed(0)
+        net = BasicModel_MultiLayer()
+        inp = torch.randn(3, 3)
+        nt = NoiseTunnel(IntegratedGradients(net))
+        attributions, delta = nt.attribute(
+            inp,
+            n_samples=5,
+            stdevs=0.1,
+            n_samples_batch_size=2,
+            target=0,
+            return_convergence_delta=True,
+        )
+        self.assertEqual(attributions.shape, inp.shape)
+        self.assertEqual(delta.shape, (15,))
+
+        # without noise, all samples of an example have the same attributions
+        # and convergence deltas
+        attributions, delta = nt.attribute(
+            inp,
+            n_samples=5,
+            stdevs=0.0,
+            n_samples_batch_size=2,
+            target=0,
+            return_convergence_delta=True,
+        )
+        ig_attributions, ig_delta = IntegratedGradients(net).attribute(
+            inp, target=0, return_convergence_delta=True
+        )
+        assertTensorAlmostEqual(self, attributions, ig_attributions, mode="max")
+        assertTensorAlmostEqual(
+            self, delta, ig_delta.repeat_interleave(5), delta=1e-6, mode="max"
+        )
+
+    def test_convergence_tolerance_stops_converged_examples(self) -> None:
+        torch.manual_seed(0)
+        noisy_inputs = []
+
+        def forward_func(x, y):
+            noisy_inputs.append(x.detach())
+            return (x * y).sum(1)
+
+        # the attributions of the first example hardly vary relative to their
+        # mean, while those of the second one are dominated by the noise
+        inp = torch.tensor([[100.0, -200.0, 300.0], [0.1, 0.0, -0.1]])
+        y = torch.tensor([[1.0, 2.0, 3.0], [-1.0, 1.0, 0.5]])
+        nt = NoiseTunnel(InputXGradient(forward_func))
+        attributions, n_samples = nt.attribute(
+            inp,
+            n_samples=20,
+            stdevs=1.0,
+            n_samples_batch_size=4,
+            convergence_tolerance=0.1,
+            return_n_samples=True,
+            additional_forward_args=(y,),
+        )
+        self.assertEqual(n_samples.tolist(), [4, 20])
+        self.assertEqual([len(x) for x in noisy_inputs], [8, 4, 4, 4, 4])
+        # samples of each example, the first batch contains both examples
+        samples = [
+            noisy_inputs[0][:4],
+            torch.cat([noisy_inputs[0][4:]] + noisy_inputs[1:]),
+        ]
+        expected = torch.stack([(x * y[i]).mean(0) for i, x in enumerate(samples)])
+        assertTensorAlmostEqual(self, attributions, expected, delta=1e-4, mode="max")
+
+        vargrad = nt.attribute(
+            inp,
+            nt_type="vargrad",
+            n_samples=20,
+            stdevs=1.0,
+            n_samples_batch_size=4,
+            convergence_tolerance=0.1,
+            additional_forward_args=(y,),
+        )
+        self.assertEqual(vargrad.shape, inp.shape)
+
+    def test_convergence_tolerance_convergence_delta(self) -> None:
+        torch.manual_seed(0)
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[10.0, 20.0, 30.0], [0.0, 0.1, 0.0]])
+        nt = NoiseTunnel(IntegratedGradients(net))
+        attributions, delta, n_samples = nt.attribute(
+            inp,
+            n_samples=12,
+            stdevs=0.1,
+            n_samples_batch_size=3,
+            convergence_tolerance=0.05,
+            target=torch.tensor([0, 1]),
+            return_convergence_delta=True,
+            return_n_samples=True,
+        )
+        self.assertEqual(attributions.shape, inp.shape)
+        self.assertEqual(n_samples.tolist(), [3, 12])
+        self.assertEqual(delta.shape, (15,))
+
+    def test_sobol_sampling_reduces_variance(self) -> None:
+        torch.manual_seed(0)
+        inp = torch.tensor([[1.0, -2.0, 0.5, 3.0]])
+        # the attributions (x + noise)^2 are non-linear in the noise
+        nt = NoiseTunnel(InputXGradient(lambda x: (x ** 2).sum(1) / 2))
+        results = {}
+        for sampling in ["random", "sobol"]:
+            results[sampling] = torch.stack(
+                [
+                    nt.attribute(inp, n_samples=16, stdevs=1.0, sampling=sampling)
+                    for _ in range(20)
+                ]
+            )
+        # E[(x + noise)^2] = x^2 + 1
+        for result in results.values():
+            assertTensorAlmostEqual(
+                self, result.mean(0), inp ** 2 + 1, delta=1.0, mode="max"
+            )
+        self.assertLess(
+            results["sobol"].var(0).sum().item(),
+            0.5 * results["random"].var(0).sum().item(),
+        )
+
+    def test_sobol_sampling_of_images(self) -> None:
+        # 3 x 90 x 90 exceeds the maximum dimension of Sobol sequences
+        inp = torch.randn(2, 3, 90, 90)
+        nt = NoiseTunnel(InputXGradient(lambda x: (x ** 2).sum((1, 2, 3)) / 2))
+        attributions = nt.attribute(
+            inp,
+            n_samples=4,
+            stdevs=1.0,
+            sampling="sobol",
+            generator=torch.Generator().manual_seed(0),
+        )
+        self.assertEqual(attributions.shape, inp.shape)
+        # E[(x + noise)^2] = x^2 + 1, each pixel averages only 4 samples
+        self.assertLess(abs((attributions - inp ** 2).mean().item() - 1.0), 0.1)
+        # each block of coordinates is drawn from an independent sequence
+        sampler = _Sampler("sobol", torch.Generator().manual_seed(0))
+        samples = sampler.uniform("image", 4, 3 * 90 * 90, torch.device("cpu"))
+        self.assertEqual(samples.shape, (4, 3 * 90 * 90))
+        half = 3 * 90 * 90 // 2
+        self.assertFalse(torch.equal(samples[:, :half], samples[:, half:]))
+
+    def test_antithetic_sampling_cancels_linear_noise(self) -> None:
+        inp = torch.tensor([[1.0, -2.0, 0.5], [0.0, 1.0, 2.0]])
+        weights = torch.tensor([2.0, -1.0, 3.0])
+        nt = NoiseTunnel(InputXGradient(lambda x: (x * weights).sum(1)))
+        for sampling in ["random", "sobol"]:
+            attributions = nt.attribute(
+                inp, n_samples=6, stdevs=1.0, sampling=sampling, antithetic=True
+            )
+            assertTensorAlmostEqual(
+                self, attributions, inp * weights, delta=1e-5, mode="max"
+            )
+
+    def test_generator_replays_samples(self) -> None:
+        inp = torch.tensor([[1.0, -2.0, 0.5], [0.0, 1.0, 2.0]])
+        baselines = torch.randn(5, 3)
+        nt = NoiseTunnel(IntegratedGradients(lambda x: (x ** 3).sum(1)))
+        for sampling in ["random", "sobol"]:
+            results = [
+                nt.attribute(
+                    inp,
+                    n_samples=4,
+                    stdevs=1.0,
+                    n_steps=5,
+                    baselines=baselines,
+                    draw_baseline_from_distrib=True,
+                    n_samples_batch_size=3,
+                    sampling=sampling,
+                    generator=torch.Generator().manual_seed(seed),
+                )
+                for seed in [0, 1, 0]
+            ]
+            assertTensorAlmostEqual(self, results[2], results[0], delta=0.0)
+            self.assertFalse(torch.equal(results[1], results[0]))
@@ -266,6 +266,112 @@ class Test(BaseTest):
             strides=((1, 2, 1), (1, 1, 2)),
         )
 
+    def test_overlapping_windows(self) -> None:
+        weights = torch.arange(35.0).view(5, 7)
+        inp = torch.arange(70.0).view(2, 5, 7) % 3
+
+        def forward_func(x):
+            return torch.sum(x * weights, dim=(1, 2))
+
+        # windows start at rows 0, 2, 4 and columns 0, 2, 4, where the last
+        # row of windows is cut off
+        expected = torch.zeros_like(inp)
+        counts = torch.zeros(5, 7)
+        for row in [0, 2, 4]:
+            for col in [0, 2, 4]:
+                window = (slice(row, row + 2), slice(col, col + 3))
+                counts[window] += 1
+                expected[(slice(None),) + window] += (
+                    (inp * weights)[(slice(None),) + window]
+                    .sum(dim=(1, 2))
+                    .view(2, 1, 1)
+                )
+
+        occ = Occlusion(forward_func)
+        assertTensorAlmostEqual(
+            self,
+            occ._ablation_weights(
+                inp, sliding_window_shapes=(2, 3), strides=(2, 2), shift_counts=(3, 3)
+            ),
+            counts,
+        )
+        self._occlusion_test_assert(
+            forward_func,
+            inp,
+            expected / counts,
+            ablations_per_eval=(1, 4, 9),
+            sliding_window_shapes=(2, 3),
+            strides=(2, 2),
+            target=None,
+        )
+
+    def test_overlapping_windows_parallel(self) -> None:
+        net = BasicModel_ConvNet_One_Conv()
+        inp = torch.arange(32.0).view(2, 1, 4, 4)
+        occ = Occlusion(net)
+        expected = occ.attribute(
+            inp,
+            sliding_window_shapes=(1, 2, 2),
+            strides=(1, 1, 1),
+            target=1,
+            ablations_per_eval=2,
+        )
+        attributions = occ.attribute(
+            inp,
+            sliding_window_shapes=(1, 2, 2),
+            strides=(1, 1, 1),
+            target=1,
+            ablations_per_eval=2,
+            num_workers=3,
+        )
+        assertTensorAlmostEqual(self, attributions, expected.squeeze())
+
+    def test_overlapping_windows_multi_target(self) -> None:
+        net = BasicModel_ConvNet_One_Conv()
+        inp = torch.arange(32.0).view(2, 1, 4, 4)
+        occ = Occlusion(net)
+        attributions = occ.attribute(
+            inp,
+            sliding_window_shapes=(1, 2, 2),
+            strides=(1, 1, 1),
+            targets=[0, 1],
+            ablations_per_eval=2,
+        )
+        self.assertEqual(attributions.shape, (2,) + inp.shape)
+        for target in [0, 1]:
+            expected = occ.attribute(
+                inp,
+                sliding_window_shapes=(1, 2, 2),
+                strides=(1, 1, 1),
+                target=target,
+                ablations_per_eval=2,
+            )
+            assertTensorAlmostEqual(self, attributions[target], expected.squeeze())
+
+    def test_ablated_input_by_window(self) -> None:
+        inp = torch.arange(70.0).view(2, 5, 7)
+        baseline = -torch.arange(70.0).view(1, 2, 5, 7)
+        occ = Occlusion(lambda x: x.sum(dim=(1, 2)))
+        # features 4 and 5 are the windows starting at (2, 2) and (4, 2)
+        ablated, windows = occ._construct_ablated_input(
+            inp.expand((2,) + inp.shape),
+            None,
+            baseline,
+            4,
+            6,
+            sliding_window_shapes=(2, 3),
+            strides=(2, 2),
+            shift_counts=(3, 3),
+        )
+        # the windows are given by slices rather than by masks of the input size
+        self.assertEqual(
+            windows, [(slice(2, 4), slice(2, 5)), (slice(4, 6), slice(2, 5))]
+        )
+        expected = inp.repeat(2, 1, 1, 1)
+        expected[0, :, 2:4, 2:5] = baseline[0, :, 2:4, 2:5]
+        expected[1, :, 4:5, 2:5] = baseline[0, :, 4:5, 2:5]
+        assertTensorAlmostEqual(self, ablated, expected, delta=0.0)
+
     def _occlusion_test_assert(
         self,
         model: Callable,
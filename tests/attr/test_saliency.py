@@ -37,6 +37,19 @@ def _get_multiargs_basic_config() -> Tuple[
 
 
 class Test(BaseTest):
+    def test_saliency_multi_target(self) -> None:
+        model = SoftmaxModel(5, 20, 10)
+        input = torch.randn(3, 5)
+        targets = [1, torch.tensor([4, 0, 9])]
+        saliency = Saliency(model)
+        attributions = saliency.attribute(input, targets=targets, abs=False)
+        self.assertEqual(attributions.shape, (2, 3, 5))
+        for attribution, target in zip(attributions, targets):
+            expected = saliency.attribute(input, target=target, abs=False)
+            assertArraysAlmostEqual(
+                attribution.reshape(-1).tolist(), expected.reshape(-1).tolist()
+            )
+
     def test_saliency_test_basic_vanilla(self) -> None:
         self._saliency_base_assert(*_get_basic_config())
 
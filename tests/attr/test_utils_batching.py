@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import time
+
 import torch
 
 from captum.attr._utils.batching import (
@@ -8,6 +10,7 @@ from captum.attr._utils.batching import (
     _sort_key_list,
     _batched_operator,
     _batched_generator,
+    _tune_batch_size,
 )
 
 from .helpers.utils import BaseTest, assertTensorAlmostEqual
@@ -121,3 +124,99 @@ class Test(BaseTest):
         assertTensorAlmostEqual(
             self, batched_result[1], [[0, 2, 4], [1, 1, 1], [2, 2, 2]]
         )
+
+    def test_tune_batch_size(self):
+        model = torch.nn.Linear(10, 10)
+        other_model = torch.nn.Linear(10, 1000)
+        probed_sizes = []
+
+        def probe(batch_size):
+            probed_sizes.append(batch_size)
+            # constant overhead per call, so that throughput grows with batch size
+            time.sleep(0.002)
+            with torch.no_grad():
+                model(torch.zeros(batch_size, 10))
+                # only the modules of the probed model are counted
+                other_model(torch.zeros(batch_size, 10))
+
+        # each example produces an activation of 40 bytes
+        key = ("test", (10,))
+        cpu = torch.device("cpu")
+        batch_size = _tune_batch_size(model, key, probe, 16, 170, cpu)
+        self.assertEqual(batch_size, 4)
+        self.assertEqual(probed_sizes, [1, 2, 4, 8])
+
+        # the decision is cached for the same model, key and budget
+        batch_size = _tune_batch_size(model, key, probe, 16, 170, cpu)
+        self.assertEqual(batch_size, 4)
+        self.assertEqual(len(probed_sizes), 4)
+
+        batch_size = _tune_batch_size(model, key, probe, 3, 1000, cpu)
+        self.assertEqual(batch_size, 3)
+        self.assertEqual(probed_sizes[4:], [1, 2, 3])
+
+        # other models are probed separately
+        batch_size = _tune_batch_size(other_model, key, probe, 16, 10 ** 6, cpu)
+        self.assertEqual(batch_size, 16)
+        self.assertEqual(probed_sizes[7:], [1, 2, 4, 8, 16])
+
+    def test_tune_batch_size_with_backward(self):
+        model = torch.nn.Linear(10, 10)
+        probed_sizes = []
+
+        def probe(batch_size):
+            probed_sizes.append(batch_size)
+            time.sleep(0.002)
+            inp = torch.zeros(batch_size, 10, requires_grad=True)
+            model(inp).sum().backward()
+
+        # each example produces an activation of 40 bytes, the input of 40 bytes
+        # is saved for the backward pass and the gradient of the activation
+        # takes another 40 bytes, while the saved weight is not counted
+        cpu = torch.device("cpu")
+        batch_size = _tune_batch_size(model, ("test", (10,)), probe, 16, 500, cpu)
+        self.assertEqual(batch_size, 4)
+        self.assertEqual(probed_sizes, [1, 2, 4, 8])
+
+    def test_tune_batch_size_throughput(self):
+        model = torch.nn.Linear(10, 10)
+        probed_sizes = []
+
+        def probe_with_slow_call(batch_size):
+            probed_sizes.append(batch_size)
+            # a single slow call does not stop probing
+            time.sleep(0.05 if batch_size == 2 else 0.002)
+            model(torch.zeros(batch_size, 10))
+
+        cpu = torch.device("cpu")
+        batch_size = _tune_batch_size(
+            model, ("slow",), probe_with_slow_call, 16, 10 ** 6, cpu
+        )
+        self.assertEqual(batch_size, 16)
+        self.assertEqual(probed_sizes, [1, 2, 4, 8, 16])
+
+        def probe_without_gain(batch_size):
+            probed_sizes.append(batch_size)
+            # the throughput does not increase with the batch size
+            time.sleep(0.01 * batch_size)
+            model(torch.zeros(batch_size, 10))
+
+        probed_sizes.clear()
+        batch_size = _tune_batch_size(
+            model, ("linear",), probe_without_gain, 64, 10 ** 6, cpu
+        )
+        self.assertEqual(batch_size, 4)
+        self.assertEqual(probed_sizes, [1, 2, 4])
+
+    def test_tune_batch_size_without_modules(self):
+        def forward_func(input):
+            return 2 * input
+
+        def probe(batch_size):
+            forward_func(torch.zeros(batch_size, 10))
+
+        with self.assertWarns(UserWarning):
+            batch_size = _tune_batch_size(
+                forward_func, ("test",), probe, 16, 10 ** 6, torch.device("cpu")
+            )
+        self.assertEqual(batch_size, 1)